@@ -74,26 +74,63 @@ SQLite Database Module: Comprehensive and powerful SQLite ORM and CRUD interface
 
 from __future__ import annotations
 
-# 核心引擎和会话管理 Core Engine and Session Management
-from .core import (
-    EngineManager,
-    EngineConfig,
-    SQLiteAdapter,
-    SessionManager,
-    create_sqlite_engine,
-    DatabaseError,
-    EngineAlreadyExistsError,
-    EngineNotInitializedError,
-    SessionError,
-)
-
-# CRUD 和查询接口 CRUD and Query Interface
-from .api import (
-    CRUDRepository,
-    SQLAlchemyCRUDRepository,
-    QuerySpec,
-    apply_query_spec,
-)
+import importlib
+from typing import TYPE_CHECKING, Any
+
+# 按需导入（PEP 562）：只在首次访问时加载 SQLAlchemy 等重量级依赖，
+# 仅使用 kernel.db.optimization 的调用方无需承担这部分导入开销
+# Lazy imports (PEP 562): SQLAlchemy-backed modules load on first access, so
+# callers that only use kernel.db.optimization do not pay for them
+_LAZY_IMPORTS = {
+    # 核心引擎和会话管理 Core Engine and Session Management
+    "EngineManager": ".core",
+    "EngineConfig": ".core",
+    "SQLiteAdapter": ".core",
+    "SessionManager": ".core",
+    "create_sqlite_engine": ".core",
+    "DatabaseError": ".core",
+    "EngineAlreadyExistsError": ".core",
+    "EngineNotInitializedError": ".core",
+    "SessionError": ".core",
+    # CRUD 和查询接口 CRUD and Query Interface
+    "CRUDRepository": ".api",
+    "SQLAlchemyCRUDRepository": ".api",
+    "QuerySpec": ".api",
+    "apply_query_spec": ".api",
+}
+
+if TYPE_CHECKING:
+    from .core import (
+        EngineManager,
+        EngineConfig,
+        SQLiteAdapter,
+        SessionManager,
+        create_sqlite_engine,
+        DatabaseError,
+        EngineAlreadyExistsError,
+        EngineNotInitializedError,
+        SessionError,
+    )
+    from .api import (
+        CRUDRepository,
+        SQLAlchemyCRUDRepository,
+        QuerySpec,
+        apply_query_spec,
+    )
+
+
+def __getattr__(name: str) -> Any:
+    module_path = _LAZY_IMPORTS.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_path, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
+
 
 __all__ = [
     # 核心引擎管理 / Core engine management
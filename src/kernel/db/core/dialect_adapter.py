@@ -23,6 +23,7 @@ class EngineConfig:
     dialect: str = "sqlite"
     echo: bool = False
     pool_size: int = 10
+    max_overflow: int = 0
     pool_timeout: int = 30
     connect_args: Dict[str, Any] = field(default_factory=dict)
     create_if_missing: bool = True
@@ -66,10 +67,12 @@ class SQLiteAdapter:
         if config.is_memory:
             pool_class = StaticPool
             pool_size = 1
+            max_overflow = 0
         else:
             from sqlalchemy.pool import QueuePool
             pool_class = QueuePool
             pool_size = config.pool_size
+            max_overflow = config.max_overflow
 
         engine = create_engine(
             url,
@@ -77,7 +80,7 @@ class SQLiteAdapter:
             poolclass=pool_class,
             pool_pre_ping=True,
             pool_size=pool_size,
-            max_overflow=0,
+            max_overflow=max_overflow,
             pool_timeout=config.pool_timeout,
             connect_args=connect_args,
             future=True,
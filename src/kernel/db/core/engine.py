@@ -70,6 +70,7 @@ def create_sqlite_engine(
     name: str = "default",
     echo: bool = False,
     pool_size: int = 10,
+    max_overflow: int = 0,
     pool_timeout: int = 30,
     enable_wal: bool = True,
     enable_foreign_keys: bool = True,
@@ -86,6 +87,7 @@ def create_sqlite_engine(
         name: 引擎注册名称 / Engine registration name
         echo: 是否启用 SQL 日志 / Enable SQL logging
         pool_size: 连接池大小 / Connection pool size
+        max_overflow: 超出连接池大小的额外连接数 / Extra connections allowed beyond pool_size
         pool_timeout: 连接池超时（秒） / Connection pool timeout (seconds)
         enable_wal: 启用 WAL 日志模式 / Enable WAL journal mode
         enable_foreign_keys: 启用外键约束 / Enable foreign key constraints
@@ -100,6 +102,7 @@ def create_sqlite_engine(
         database=database,
         echo=echo,
         pool_size=pool_size,
+        max_overflow=max_overflow,
         pool_timeout=pool_timeout,
         enable_wal=enable_wal,
         enable_foreign_keys=enable_foreign_keys,
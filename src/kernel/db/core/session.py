@@ -3,8 +3,9 @@ Session helpers built on top of SQLAlchemy."""
 
 from __future__ import annotations
 
-from contextlib import contextmanager
-from typing import Iterator
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from typing import AsyncIterator, Iterator
+import logging
 import time
 
 from sqlalchemy.orm import Session, sessionmaker
@@ -12,71 +13,178 @@ from sqlalchemy.orm import Session, sessionmaker
 from .exceptions import SessionError
 from kernel.logger import get_logger, MetadataContext
 
+# 异步支持依赖 greenlet，按需导入 / Async support requires greenlet, import conditionally
+try:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+    ASYNC_SESSION_AVAILABLE = True
+except ImportError:
+    ASYNC_SESSION_AVAILABLE = False
+    AsyncEngine = None
+    AsyncSession = None
+    async_sessionmaker = None
+
 logger = get_logger(__name__)
 
 
 class SessionManager:
     """为给定引擎创建和管理数据库会话
-    Creates and manages database sessions for a given engine."""
+    Creates and manages database sessions for a given engine.
+
+    传入 AsyncEngine 时使用 async_session_scope，否则使用 session_scope
+    Use async_session_scope for an AsyncEngine, session_scope otherwise."""
 
     def __init__(self, engine) -> None:
-        try:
+        self._is_async = ASYNC_SESSION_AVAILABLE and isinstance(engine, AsyncEngine)
+        if self._is_async:
+            self._session_factory = async_sessionmaker(
+                bind=engine,
+                autoflush=False,
+                expire_on_commit=False,
+            )
+        else:
             self._session_factory = sessionmaker(
                 bind=engine,
                 autoflush=False,
                 autocommit=False,
                 future=True,
             )
-        except Exception as exc:  # pragma: no cover - defensive
-            raise SessionError("Failed to initialize session factory") from exc
+
+    @property
+    def is_async(self) -> bool:
+        """是否绑定异步引擎
+        Whether the manager is bound to an async engine."""
+        return self._is_async
 
     @contextmanager
     def session_scope(self) -> Iterator[Session]:
         """为一系列操作提供事务作用域
-        Provide a transactional scope around a series of operations."""
+        Provide a transactional scope around a series of operations.
+
+        日志关闭时不会生成 session_id 和元数据上下文
+        session_id and the metadata context are skipped when logging is disabled."""
+
+        if self._is_async:
+            raise SessionError("Async engine bound; use async_session_scope() instead")
 
         session: Session = self._session_factory()
-        start_time = time.time()
-        session_id = f"session_{id(session)}"
-        
-        with MetadataContext(session_id=session_id):
-            logger.debug(
-                "数据库会话已创建",
-                extra={'session_id': session_id}
-            )
-            
+        scope = _ScopeLog(session)
+
+        with scope.context:
             try:
                 yield session
                 session.commit()
-                
-                duration = time.time() - start_time
-                logger.info(
-                    "数据库事务已提交",
-                    extra={
-                        'session_id': session_id,
-                        'duration': duration,
-                        'status': 'committed'
-                    }
-                )
+                scope.committed()
             except Exception as e:
                 session.rollback()
-                duration = time.time() - start_time
-                
-                logger.error(
-                    "数据库事务已回滚",
-                    extra={
-                        'session_id': session_id,
-                        'duration': duration,
-                        'status': 'rolled_back',
-                        'error_type': type(e).__name__,
-                        'error_message': str(e)
-                    },
-                    exc_info=True
-                )
+                scope.rolled_back(e)
                 raise
             finally:
+                # 释放身份映射中的对象引用 / Drop identity-map references
+                session.expunge_all()
                 session.close()
+                scope.closed()
+
+    @asynccontextmanager
+    async def async_session_scope(self) -> AsyncIterator["AsyncSession"]:
+        """为一系列异步操作提供事务作用域
+        Provide a transactional scope around a series of async operations.
+
+        I/O 等待期间释放事件循环，行为与 session_scope 一致
+        Frees the event loop during I/O waits; otherwise mirrors session_scope."""
+
+        if not self._is_async:
+            raise SessionError("Sync engine bound; use session_scope() instead")
+
+        session = self._session_factory()
+        scope = _ScopeLog(session)
+
+        with scope.context:
+            try:
+                yield session
+                await session.commit()
+                scope.committed()
+            except Exception as e:
+                await session.rollback()
+                scope.rolled_back(e)
+                raise
+            finally:
+                session.expunge_all()
+                await session.close()
+                scope.closed()
+
+
+class _ScopeLog:
+    """会话作用域日志助手，日志关闭时不做额外工作
+    Session-scope logging helper that does no extra work when logging is disabled."""
+
+    __slots__ = ("_session", "_start_time", "_debug", "_enabled", "session_id", "context")
+
+    def __init__(self, session) -> None:
+        self._session = session
+        self._start_time = time.monotonic()
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+        self._enabled = self._debug or logger.isEnabledFor(logging.INFO)
+
+        if self._enabled:
+            self.session_id = f"session_{id(session)}"
+            self.context = MetadataContext(session_id=self.session_id)
+            if self._debug:
                 logger.debug(
-                    "数据库会话已关闭",
-                    extra={'session_id': session_id}
+                    "数据库会话已创建",
+                    extra={'session_id': self.session_id}
                 )
+        else:
+            self.session_id = None
+            self.context = nullcontext()
+
+    def committed(self) -> None:
+        if self._enabled:
+            logger.info(
+                "数据库事务已提交",
+                extra={
+                    'session_id': self.session_id,
+                    'duration': time.monotonic() - self._start_time,
+                    'status': 'committed'
+                }
+            )
+
+    def rolled_back(self, error: Exception) -> None:
+        if not logger.isEnabledFor(logging.ERROR):
+            return
+        session_id = self.session_id or f"session_{id(self._session)}"
+        duration = time.monotonic() - self._start_time
+
+        if self._debug:
+            # 仅在 DEBUG 下格式化异常消息和完整回溯 / Format message and traceback only at DEBUG
+            logger.error(
+                "数据库事务已回滚",
+                extra={
+                    'session_id': session_id,
+                    'duration': duration,
+                    'status': 'rolled_back',
+                    'error_type': type(error).__name__,
+                    'error_message': str(error)
+                },
+                exc_info=True
+            )
+            return
+
+        logger.error(
+            "数据库事务已回滚 session=%s duration=%.3fs error=%s",
+            session_id,
+            duration,
+            type(error).__name__,
+            extra={
+                'session_id': session_id,
+                'duration': duration,
+                'status': 'rolled_back',
+                'error_type': type(error).__name__
+            }
+        )
+
+    def closed(self) -> None:
+        if self._debug:
+            logger.debug(
+                "数据库会话已关闭",
+                extra={'session_id': self.session_id}
+            )
@@ -1,11 +1,40 @@
 """数据库优化模块：本地缓存管理
 Database optimization module: Local cache management."""
 
-from .backends import CacheBackend, CacheEntry, LocalCache
-from .cache_manager import (
-    CacheManager,
-    create_local_cache_manager,
-)
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+# 按需导入（PEP 562）/ Lazy imports (PEP 562)
+_LAZY_IMPORTS = {
+    "CacheBackend": ".backends",
+    "LocalCache": ".backends",
+    "CacheEntry": ".backends",
+    "CacheManager": ".cache_manager",
+    "create_local_cache_manager": ".cache_manager",
+}
+
+if TYPE_CHECKING:
+    from .backends import CacheBackend, CacheEntry, LocalCache
+    from .cache_manager import (
+        CacheManager,
+        create_local_cache_manager,
+    )
+
+
+def __getattr__(name: str) -> Any:
+    module_path = _LAZY_IMPORTS.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_path, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
+
 
 __all__ = [
     # 缓存后端 Cache backends
@@ -16,4 +45,3 @@ __all__ = [
     "CacheManager",
     "create_local_cache_manager",
 ]
-
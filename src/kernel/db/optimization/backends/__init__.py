@@ -1,12 +1,38 @@
 """本地缓存后端模块导出
 Local cache backend module exports."""
 
-from .cache_backend import CacheBackend
-from .local_cache import CacheEntry, LocalCache
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+# 按需导入（PEP 562）/ Lazy imports (PEP 562)
+_LAZY_IMPORTS = {
+    "CacheBackend": ".cache_backend",
+    "LocalCache": ".local_cache",
+    "CacheEntry": ".local_cache",
+}
+
+if TYPE_CHECKING:
+    from .cache_backend import CacheBackend
+    from .local_cache import CacheEntry, LocalCache
+
+
+def __getattr__(name: str) -> Any:
+    module_path = _LAZY_IMPORTS.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_path, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
+
 
 __all__ = [
     "CacheBackend",
     "LocalCache",
     "CacheEntry",
 ]
-
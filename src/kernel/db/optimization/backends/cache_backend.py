@@ -3,24 +3,72 @@ Cache backend abstract interface."""
 
 from __future__ import annotations
 
+import functools
+import inspect
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any, Callable, Optional
+
+# 未命中标记，与缓存的 None 区分 / Miss marker, distinct from a cached None
+_MISSING = object()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_accepts_default(backend_type: type) -> bool:
+    """后端的 get 是否接受 default 参数（早期接口只有 get(key)）
+    Whether the backend's get accepts a default argument (the earlier interface was get(key))."""
+    try:
+        params = list(inspect.signature(backend_type.get).parameters.values())
+    except (TypeError, ValueError):
+        return True
+    return len(params) >= 3 or any(
+        param.kind is inspect.Parameter.VAR_POSITIONAL for param in params
+    )
+
+
+def _bind_get(backend: "CacheBackend") -> Callable[[str, Any], Any]:
+    """返回支持 default 参数的 get；只实现 get(key) 的旧后端无法区分缓存的 None，按未命中处理
+    Return a get that takes a default. Legacy backends implementing only get(key) cannot
+    tell a cached None from a miss, so None is treated as a miss for them."""
+    get = backend.get
+    if _get_accepts_default(type(backend)):
+        return get
+
+    def get_with_default(key: str, default: Any = None) -> Any:
+        value = get(key)
+        return default if value is None else value
+
+    return get_with_default
 
 
 class CacheBackend(ABC):
     """缓存后端抽象基类
-    Abstract base class for cache backends."""
+    Abstract base class for cache backends.
+
+    CacheManager 的 *_many 方法会把整批键一次性交给后端，实现方应将批量方法
+    作为一次往返完成（本地缓存一次加锁，远程缓存一次 pipeline），而不是逐键调用单键方法。
+    CacheManager's *_many methods hand the whole batch to the backend; implementations
+    should complete each batch method in one round trip (one lock acquisition locally,
+    one pipeline remotely) rather than looping over the single-key methods."""
 
     @abstractmethod
-    def get(self, key: str) -> Optional[Any]:
+    def get(self, key: str, default: Any = None) -> Any:
         """从缓存中获取值
         Get value from cache by key.
+
+        未命中时返回 default，已缓存的 None 照常返回，调用方可传入哨兵对象区分两者
+        Returns default on a miss; a cached None is returned as-is, so callers can
+        pass a sentinel to tell the two apart.
+
+        只覆盖 get(key) 的旧实现仍可使用，但缓存的 None 会被视为未命中
+        Legacy implementations overriding only get(key) still work, but a cached None
+        is then treated as a miss.
         
         参数 Args:
             key: 缓存键 / Cache key
+            default: 未命中时的返回值 / Value returned on a miss
             
         返回 Returns:
-            缓存的值，如果不存在则返回 None / Cached value or None if not found
+            缓存的值，如果不存在则返回 default / Cached value or default if not found
         """
         pass
 
@@ -84,7 +132,7 @@ class CacheBackend(ABC):
             keys: 缓存键列表 / List of cache keys
             
         返回 Returns:
-            键值对字典 / Dictionary of key-value pairs
+            命中的键值对字典（包括缓存的 None）/ Dictionary of hits, including cached None values
         """
         pass
 
@@ -143,5 +191,34 @@ class CacheBackend(ABC):
         """
         pass
 
+    def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Any],
+        ttl: Optional[int] = None
+    ) -> Any:
+        """获取值，不存在时调用工厂函数生成并写入
+        Get value, or compute it with the factory and store it on a miss.
+
+        默认实现为 get + set。能在一次往返内完成探测并原子写入的后端
+        （如 GET + SET NX）应覆盖此方法，CacheManager 会自动委托给覆盖版本。
+        The default is get followed by set. Backends that can probe and write atomically
+        in one round trip (e.g. GET + SET NX) should override this; CacheManager delegates
+        to overrides automatically.
+
+        参数 Args:
+            key: 缓存键 / Cache key
+            factory: 值工厂函数 / Factory function to generate value
+            ttl: 过期时间（秒）/ Time to live in seconds
+
+        返回 Returns:
+            缓存的值或新生成的值 / Cached or freshly computed value
+        """
+        value = _bind_get(self)(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
 
 __all__ = ["CacheBackend"]
@@ -3,199 +3,439 @@ Local in-memory cache implementation."""
 
 from __future__ import annotations
 
+import itertools
+import random
 import time
+import weakref
+from collections import OrderedDict
 from dataclasses import dataclass
-from threading import Lock
+from threading import Event, Lock, Thread
 from typing import Any, Optional
 
 from .cache_backend import CacheBackend
 
+# 支持的淘汰策略 / Supported eviction policies
+EVICTION_POLICIES = ("lru", "sampled_lru", "tinylfu")
+
+# 热路径上直接调用，省去 time 模块属性查找 / Called directly on hot paths to skip the module attribute lookup
+_now = time.time
+
 
 @dataclass
 class CacheEntry:
     """缓存条目
     Cache entry with value and expiration."""
-    
+
     value: Any
     expires_at: Optional[float] = None  # Unix 时间戳 / Unix timestamp
-    
+    last_access: int = 0  # 逻辑访问时钟 / Logical access clock
+
     def is_expired(self) -> bool:
         """检查是否已过期
         Check if entry is expired."""
         if self.expires_at is None:
             return False
-        return time.time() > self.expires_at
+        return _now() > self.expires_at
 
 
 class LocalCache(CacheBackend):
     """本地内存缓存实现（线程安全）
-    Local in-memory cache implementation (thread-safe)."""
-    
-    def __init__(self, max_size: int = 1000, default_ttl: Optional[int] = 3600):
+    Local in-memory cache implementation (thread-safe).
+
+    淘汰策略 Eviction policies:
+        - ``lru``: 严格 LRU，每次读取都会调整顺序 / Strict LRU, every read reorders entries
+        - ``sampled_lru``: 近似 LRU（Redis 风格），读取只更新访问时钟，淘汰时随机采样
+          ``sample_size`` 个候选并移除最久未访问者 / Approximate LRU (Redis-style): reads only
+          bump an access clock, eviction samples ``sample_size`` candidates and drops the oldest
+        - ``tinylfu``: 在 ``sampled_lru`` 基础上增加频率准入，新键访问频率低于被淘汰者时拒绝写入 /
+          ``sampled_lru`` plus a frequency-based admission filter that rejects new keys
+          accessed less often than the eviction victim
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        default_ttl: Optional[int] = 3600,
+        policy: str = "lru",
+        sample_size: int = 5,
+        cleanup_interval: Optional[float] = None,
+    ):
         """初始化本地缓存
         Initialize local cache.
-        
+
         参数 Args:
-            max_size: 最大缓存条目数 / Maximum number of cache entries
+            max_size: 最大缓存条目数，小于 1 时按 1 处理 / Maximum number of cache entries,
+                values below 1 are treated as 1
             default_ttl: 默认过期时间（秒）/ Default TTL in seconds
+            policy: 淘汰策略 / Eviction policy: "lru", "sampled_lru" or "tinylfu"
+            sample_size: 采样淘汰的候选数量 / Number of candidates sampled on eviction
+            cleanup_interval: 后台清理过期条目的间隔（秒），None 表示不启动后台线程 /
+                Interval in seconds for the background expiry sweep, None disables the thread
         """
-        self._cache: dict[str, CacheEntry] = {}
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(
+                f"Unknown eviction policy '{policy}', expected one of {EVICTION_POLICIES}"
+            )
+
+        self._cache: OrderedDict[str, CacheEntry] = OrderedDict()
         self._lock = Lock()
-        self._max_size = max_size
+        # 与逐条写入的行为一致：容量为 0 时仍保留最近写入的一条
+        # Matches single-key writes: a zero capacity still keeps the latest entry
+        self._max_size = max(1, max_size)
         self._default_ttl = default_ttl
-        self._access_order: list[str] = []  # LRU 顺序 / LRU order
-    
-    def get(self, key: str) -> Optional[Any]:
+        self._policy = policy
+        self._sample_size = max(1, sample_size)
+        self._clock = itertools.count(1)
+
+        # 采样策略需要 O(1) 随机取键 / Sampling policies need O(1) random key picks
+        self._sampled = policy != "lru"
+        self._keys: list[str] = []
+        self._slot_of: dict[str, int] = {}
+
+        # TinyLFU 频率统计 / TinyLFU frequency counters
+        self._freq: dict[str, int] = {}
+        self._freq_ops = 0
+        self._freq_reset_at = max(10 * max_size, 100)
+
+        # 后台清理线程 / Background cleanup thread
+        self._janitor_stop = Event()
+        self._janitor: Optional[Thread] = None
+        if cleanup_interval is not None and cleanup_interval > 0:
+            self._janitor = Thread(
+                target=_janitor_loop,
+                args=(weakref.ref(self), self._janitor_stop, cleanup_interval),
+                name="LocalCacheJanitor",
+                daemon=True,
+            )
+            self._janitor.start()
+
+    @property
+    def policy(self) -> str:
+        """当前淘汰策略
+        Current eviction policy."""
+        return self._policy
+
+    def _add_slot(self, key: str) -> None:
+        """登记新键以便随机采样
+        Register a new key for random sampling."""
+        if self._sampled:
+            self._slot_of[key] = len(self._keys)
+            self._keys.append(key)
+
+    def _remove(self, key: str) -> None:
+        """移除条目（调用方需持有锁）
+        Remove an entry (caller must hold the lock)."""
+        del self._cache[key]
+        if self._sampled:
+            slot = self._slot_of.pop(key)
+            last = self._keys.pop()
+            if last != key:
+                self._keys[slot] = last
+                self._slot_of[last] = slot
+
+    def _record(self, key: str) -> None:
+        """记录访问频率（调用方需持有锁）
+        Record access frequency (caller must hold the lock)."""
+        self._freq[key] = self._freq.get(key, 0) + 1
+        self._freq_ops += 1
+        if self._freq_ops >= self._freq_reset_at:
+            # 周期性减半，让旧热点逐渐老化 / Periodic halving ages out stale hot keys
+            self._freq = {k: v >> 1 for k, v in self._freq.items() if v > 1}
+            self._freq_ops = 0
+
+    def _select_victim(self, exclude: Optional[set] = None) -> str:
+        """选择淘汰对象（调用方需持有锁）
+        Select the entry to evict (caller must hold the lock).
+
+        参数 Args:
+            exclude: 不可淘汰的键 / Keys that must not be evicted
+
+        异常 Raises:
+            KeyError: 没有可淘汰的条目 / No entry can be evicted
+        """
+        if not self._sampled:
+            victim = next((key for key in self._cache if not exclude or key not in exclude), None)
+            if victim is None:
+                raise KeyError("no evictable cache entry")
+            return victim
+
+        keys = self._keys
+        count = len(keys)
+        cache = self._cache
+        if count <= self._sample_size:
+            candidates = keys
+        else:
+            candidates = [keys[random.randrange(count)] for _ in range(self._sample_size)]
+        if exclude:
+            candidates = [key for key in candidates if key not in exclude]
+            if not candidates:
+                # 样本全部被排除时退回全量扫描，保证有进展
+                # Fall back to a full scan when every sample is excluded so we always make progress
+                candidates = [key for key in keys if key not in exclude]
+                if not candidates:
+                    raise KeyError("no evictable cache entry")
+        return min(candidates, key=lambda k: cache[k].last_access)
+
+    def _set_locked(self, key: str, value: Any, ttl: Optional[int], admit: bool = False) -> bool:
+        """写入条目（调用方需持有锁），admit 为 True 时跳过 tinylfu 准入过滤
+        Write an entry (caller must hold the lock); admit=True bypasses the tinylfu admission filter."""
+        # 计算过期时间 / Calculate expiration time
+        if ttl is None:
+            ttl = self._default_ttl
+
+        expires_at = None
+        if ttl is not None and ttl > 0:
+            expires_at = _now() + ttl
+
+        entry = CacheEntry(value=value, expires_at=expires_at, last_access=next(self._clock))
+
+        if key in self._cache:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            return True
+
+        # 如果缓存已满，淘汰一个条目 / If cache is full, evict one entry
+        if len(self._cache) >= self._max_size and self._cache:
+            victim = self._select_victim()
+            if (
+                not admit
+                and self._policy == "tinylfu"
+                and self._freq.get(key, 0) < self._freq.get(victim, 0)
+            ):
+                # 准入过滤：新键不如被淘汰者热 / Admission filter: new key is colder than victim
+                return False
+            self._remove(victim)
+
+        self._cache[key] = entry
+        self._add_slot(key)
+        return True
+
+    def get(self, key: str, default: Any = None) -> Any:
         """从缓存中获取值
         Get value from cache by key."""
-        with self._lock:
+        # 热路径：内联过期判断，避免 is_expired() 的方法调用开销
+        # Hot path: expiry check is inlined to avoid the is_expired() call overhead
+        if self._policy == "sampled_lru":
+            # 只读路径：仅更新访问时钟 / Read-only path: only bump the access clock
             entry = self._cache.get(key)
             if entry is None:
-                return None
-            
-            if entry.is_expired():
-                del self._cache[key]
-                if key in self._access_order:
-                    self._access_order.remove(key)
-                return None
-            
+                return default
+            expires_at = entry.expires_at
+            if expires_at is not None and _now() > expires_at:
+                with self._lock:
+                    if self._cache.get(key) is entry:
+                        self._remove(key)
+                return default
+            entry.last_access = next(self._clock)
+            return entry.value
+
+        with self._lock:
+            if self._policy == "tinylfu":
+                self._record(key)
+
+            cache = self._cache
+            entry = cache.get(key)
+            if entry is None:
+                return default
+
+            expires_at = entry.expires_at
+            if expires_at is not None and _now() > expires_at:
+                self._remove(key)
+                return default
+
             # 更新 LRU 顺序 / Update LRU order
-            if key in self._access_order:
-                self._access_order.remove(key)
-            self._access_order.append(key)
-            
+            if self._sampled:
+                entry.last_access = next(self._clock)
+            else:
+                cache.move_to_end(key)
+
             return entry.value
-    
+
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
         """设置缓存值
         Set value in cache."""
         with self._lock:
-            # 计算过期时间 / Calculate expiration time
-            if ttl is None:
-                ttl = self._default_ttl
-            
-            expires_at = None
-            if ttl is not None and ttl > 0:
-                expires_at = time.time() + ttl
-            
-            # 如果缓存已满，移除最少使用的条目 / If cache is full, remove LRU entry
-            if key not in self._cache and len(self._cache) >= self._max_size:
-                if self._access_order:
-                    lru_key = self._access_order.pop(0)
-                    del self._cache[lru_key]
-            
-            # 设置缓存条目 / Set cache entry
-            self._cache[key] = CacheEntry(value=value, expires_at=expires_at)
-            
-            # 更新访问顺序 / Update access order
-            if key in self._access_order:
-                self._access_order.remove(key)
-            self._access_order.append(key)
-            
-            return True
-    
+            return self._set_locked(key, value, ttl)
+
     def delete(self, key: str) -> bool:
         """删除缓存键
         Delete cache key."""
         with self._lock:
             if key in self._cache:
-                del self._cache[key]
-                if key in self._access_order:
-                    self._access_order.remove(key)
+                self._remove(key)
                 return True
             return False
-    
+
     def exists(self, key: str) -> bool:
         """检查键是否存在
         Check if key exists."""
-        with self._lock:
-            entry = self._cache.get(key)
-            if entry is None:
-                return False
-            
-            if entry.is_expired():
-                del self._cache[key]
-                if key in self._access_order:
-                    self._access_order.remove(key)
-                return False
-            
-            return True
-    
+        entry = self._cache.get(key)
+        if entry is not None and entry.is_expired():
+            with self._lock:
+                if self._cache.get(key) is entry:
+                    self._remove(key)
+            return False
+        return entry is not None
+
     def clear(self) -> bool:
         """清空所有缓存
         Clear all cache entries."""
         with self._lock:
             self._cache.clear()
-            self._access_order.clear()
+            self._keys.clear()
+            self._slot_of.clear()
+            self._freq.clear()
+            self._freq_ops = 0
             return True
-    
+
     def get_many(self, keys: list[str]) -> dict[str, Any]:
         """批量获取多个键的值
         Get multiple values by keys."""
         result = {}
-        for key in keys:
-            value = self.get(key)
-            if value is not None:
-                result[key] = value
+        now = _now()
+        # 整批只加一次锁 / Take the lock once for the whole batch
+        with self._lock:
+            cache = self._cache
+            record = self._policy == "tinylfu"
+            for key in keys:
+                if record:
+                    self._record(key)
+                entry = cache.get(key)
+                if entry is None:
+                    continue
+                expires_at = entry.expires_at
+                if expires_at is not None and now > expires_at:
+                    self._remove(key)
+                    continue
+                if self._sampled:
+                    entry.last_access = next(self._clock)
+                else:
+                    cache.move_to_end(key)
+                result[key] = entry.value
         return result
-    
+
     def set_many(self, mapping: dict[str, Any], ttl: Optional[int] = None) -> bool:
         """批量设置多个键值对
         Set multiple key-value pairs."""
-        for key, value in mapping.items():
-            self.set(key, value, ttl)
+        items = list(mapping.items())
+        if self._max_size < len(items):
+            # 超出容量的前部条目写入后也会被立即淘汰 / Leading items beyond capacity would be evicted anyway
+            items = items[-self._max_size:]
+
+        with self._lock:
+            if self._policy == "tinylfu":
+                # 准入过滤需要逐键判断 / The admission filter decides per key
+                for key, value in items:
+                    self._set_locked(key, value, ttl)
+                return True
+
+            if ttl is None:
+                ttl = self._default_ttl
+            expires_at = _now() + ttl if ttl is not None and ttl > 0 else None
+
+            # 一次性算出需要淘汰的数量并集中淘汰 / Compute the overflow once and evict up front
+            cache = self._cache
+            incoming = sum(1 for key, _ in items if key not in cache)
+            overflow = len(cache) + incoming - self._max_size
+            if overflow > 0:
+                keep = {key for key, _ in items}
+                # 最多淘汰不在本批中的条目 / Never evict more than the entries outside this batch
+                overflow = min(overflow, len(cache) - (len(items) - incoming))
+                for _ in range(overflow):
+                    self._remove(self._select_victim(keep))
+
+            for key, value in items:
+                entry = CacheEntry(value=value, expires_at=expires_at, last_access=next(self._clock))
+                if key in cache:
+                    cache[key] = entry
+                    cache.move_to_end(key)
+                else:
+                    cache[key] = entry
+                    self._add_slot(key)
         return True
-    
+
     def delete_many(self, keys: list[str]) -> int:
         """批量删除多个键
         Delete multiple keys."""
         count = 0
-        for key in keys:
-            if self.delete(key):
-                count += 1
+        with self._lock:
+            cache = self._cache
+            for key in keys:
+                if key in cache:
+                    self._remove(key)
+                    count += 1
         return count
-    
+
     def increment(self, key: str, delta: int = 1) -> int:
         """递增计数器
         Increment counter."""
         with self._lock:
             entry = self._cache.get(key)
             if entry is None or entry.is_expired():
-                new_value = delta
+                if entry is not None:
+                    self._remove(key)
+                # 计数器总是准入，否则返回的值从未被存储
+                # Counters are always admitted, otherwise the returned value was never stored
+                self._set_locked(key, delta, None, admit=True)
+                return delta
+
+            current_value = entry.value
+            if not isinstance(current_value, int):
+                raise ValueError(f"Value for key '{key}' is not an integer")
+
+            # 原地更新计数器，保留原有过期时间（与 INCRBY 一致）
+            # Update the counter in place and keep its expiry (matches INCRBY)
+            new_value = current_value + delta
+            entry.value = new_value
+            if self._sampled:
+                entry.last_access = next(self._clock)
             else:
-                current_value = entry.value
-                if not isinstance(current_value, int):
-                    raise ValueError(f"Value for key '{key}' is not an integer")
-                new_value = current_value + delta
-            
-            self.set(key, new_value)
+                self._cache.move_to_end(key)
             return new_value
-    
+
     def decrement(self, key: str, delta: int = 1) -> int:
         """递减计数器
         Decrement counter."""
         return self.increment(key, -delta)
-    
+
     def cleanup_expired(self) -> int:
         """清理过期条目
         Clean up expired entries.
-        
+
         返回 Returns:
             清理的条目数 / Number of entries cleaned up
         """
+        # 锁内只做快照，过滤在锁外完成 / Snapshot under the lock, filter outside it
+        with self._lock:
+            snapshot = list(self._cache.items())
+
+        now = _now()
+        expired = [
+            (key, entry) for key, entry in snapshot
+            if entry.expires_at is not None and now > entry.expires_at
+        ]
+        if not expired:
+            return 0
+
+        removed = 0
         with self._lock:
-            expired_keys = [
-                key for key, entry in self._cache.items()
-                if entry.is_expired()
-            ]
-            
-            for key in expired_keys:
-                del self._cache[key]
-                if key in self._access_order:
-                    self._access_order.remove(key)
-            
-            return len(expired_keys)
-    
+            cache = self._cache
+            for key, entry in expired:
+                # 快照后可能已被覆盖 / The key may have been overwritten since the snapshot
+                if cache.get(key) is entry:
+                    self._remove(key)
+                    removed += 1
+        return removed
+
+    def close(self) -> None:
+        """停止后台清理线程
+        Stop the background cleanup thread."""
+        self._janitor_stop.set()
+        janitor = self._janitor
+        if janitor is not None and janitor.is_alive():
+            janitor.join()
+        self._janitor = None
+
     def size(self) -> int:
         """获取当前缓存大小
         Get current cache size."""
@@ -203,4 +443,15 @@ class LocalCache(CacheBackend):
             return len(self._cache)
 
 
-__all__ = ["LocalCache", "CacheEntry"]
+def _janitor_loop(cache_ref: "weakref.ref[LocalCache]", stop: Event, interval: float) -> None:
+    """后台清理循环，只持有弱引用，缓存被回收后自动退出
+    Background cleanup loop holding only a weak reference; exits once the cache is collected."""
+    while not stop.wait(interval):
+        cache = cache_ref()
+        if cache is None:
+            return
+        cache.cleanup_expired()
+        del cache
+
+
+__all__ = ["LocalCache", "CacheEntry", "EVICTION_POLICIES"]
@@ -3,12 +3,48 @@ Cache Manager: Unified cache management interface."""
 
 from __future__ import annotations
 
+import base64
 import functools
 import hashlib
-import json
+import io
+import pickle
+from concurrent.futures import Future
+from threading import Lock
 from typing import Any, Callable, Optional
 
 from .backends import CacheBackend, LocalCache
+from .backends.cache_backend import _MISSING, _bind_get
+
+# 可安全记忆键的参数类型：不可变，且彼此之间不存在跨类型相等（排除 bool/float，避免 1 == True == 1.0）
+# Argument types whose keys are safe to memoize: immutable, with no cross-type equality
+# (bool/float are excluded because 1 == True == 1.0)
+_MEMO_SAFE_TYPES = frozenset({str, bytes, int, type(None)})
+
+
+def _sorted_any(items: list) -> list:
+    """排序可能混合类型的元素，无法直接比较时按 repr 排序
+    Sort possibly mixed-type items, falling back to repr when they are not comparable."""
+    try:
+        return sorted(items)
+    except TypeError:
+        return sorted(items, key=repr)
+
+
+def _normalize_key_arg(value: Any) -> Any:
+    """把映射和集合转换为与插入顺序无关的形式，使相等的参数生成相同的缓存键
+    Convert mappings and sets to an order-independent form so equal arguments share a key.
+
+    pickle 按插入（迭代）顺序序列化 dict 和 set / pickle serializes dicts and sets in iteration order
+    """
+    if isinstance(value, dict):
+        return (dict, tuple(_sorted_any([(k, _normalize_key_arg(v)) for k, v in value.items()])))
+    if isinstance(value, (set, frozenset)):
+        return (frozenset, tuple(_sorted_any([_normalize_key_arg(v) for v in value])))
+    if isinstance(value, list):
+        return [_normalize_key_arg(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_normalize_key_arg(v) for v in value)
+    return value
 
 
 class CacheManager:
@@ -29,16 +65,29 @@ class CacheManager:
             default_ttl: 默认过期时间（秒）/ Default TTL in seconds
             key_prefix: 全局键前缀 / Global key prefix
         """
-        self._backend = backend or LocalCache(default_ttl=default_ttl)
+        self._backend = backend = backend or LocalCache(default_ttl=default_ttl)
         self._default_ttl = default_ttl
+        # 预先绑定后端方法，热路径省去属性查找和绑定方法创建
+        # Pre-bound backend methods; hot paths skip attribute lookups and bound-method creation
+        self._backend_get = _bind_get(backend)
+        self._backend_set = backend.set
+        self._backend_delete = backend.delete
+        self._backend_exists = backend.exists
+        self._backend_get_many = backend.get_many
+        self._backend_set_many = backend.set_many
+        self._backend_delete_many = backend.delete_many
+        self._backend_increment = backend.increment
+        self._backend_decrement = backend.decrement
         self._key_prefix = key_prefix
-    
-    def _make_key(self, key: str) -> str:
-        """生成完整的缓存键
-        Generate full cache key."""
-        if self._key_prefix:
-            return f"{self._key_prefix}:{key}"
-        return key
+        # 预先拼好 "prefix:"，热路径只做一次字符串拼接 / Pre-built "prefix:" so hot paths do a single concat
+        self._prefix_str = f"{key_prefix}:" if key_prefix else ""
+        # 后端是否提供原生的 get_or_set / Whether the backend provides a native get_or_set
+        self._native_get_or_set = (
+            type(self._backend).get_or_set is not CacheBackend.get_or_set
+        )
+        # 进行中的加载（single-flight）/ In-flight loads (single-flight)
+        self._inflight: dict[str, Future] = {}
+        self._inflight_lock = Lock()
     
     def get(self, key: str, default: Any = None) -> Any:
         """获取缓存值
@@ -51,9 +100,7 @@ class CacheManager:
         返回 Returns:
             缓存的值或默认值 / Cached value or default
         """
-        full_key = self._make_key(key)
-        value = self._backend.get(full_key)
-        return value if value is not None else default
+        return self._backend_get(self._prefix_str + key, default)
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
         """设置缓存值
@@ -67,10 +114,9 @@ class CacheManager:
         返回 Returns:
             是否设置成功 / True if successful
         """
-        full_key = self._make_key(key)
         if ttl is None:
             ttl = self._default_ttl
-        return self._backend.set(full_key, value, ttl)
+        return self._backend_set(self._prefix_str + key, value, ttl)
     
     def delete(self, key: str) -> bool:
         """删除缓存键
@@ -82,8 +128,7 @@ class CacheManager:
         返回 Returns:
             是否删除成功 / True if successful
         """
-        full_key = self._make_key(key)
-        return self._backend.delete(full_key)
+        return self._backend_delete(self._prefix_str + key)
     
     def exists(self, key: str) -> bool:
         """检查键是否存在
@@ -95,8 +140,7 @@ class CacheManager:
         返回 Returns:
             键是否存在 / True if key exists
         """
-        full_key = self._make_key(key)
-        return self._backend.exists(full_key)
+        return self._backend_exists(self._prefix_str + key)
     
     def clear(self) -> bool:
         """清空所有缓存
@@ -124,11 +168,46 @@ class CacheManager:
         返回 Returns:
             缓存的值 / Cached value
         """
-        value = self.get(key)
-        if value is None:
+        if self._native_get_or_set:
+            if ttl is None:
+                ttl = self._default_ttl
+            return self._backend.get_or_set(self._prefix_str + key, default_factory, ttl)
+        
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._load_once(key, default_factory, ttl)
+        return value
+    
+    def _load_once(
+        self,
+        key: str,
+        default_factory: Callable[[], Any],
+        ttl: Optional[int]
+    ) -> Any:
+        """同一个键的并发未命中只调用一次工厂函数，其余调用方等待同一结果
+        Run the factory once per key for concurrent misses; other callers wait for the same result."""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not leader:
+            return future.result()
+        
+        try:
             value = default_factory()
             self.set(key, value, ttl)
-        return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
     
     def get_many(self, keys: list[str]) -> dict[str, Any]:
         """批量获取多个键的值
@@ -140,14 +219,15 @@ class CacheManager:
         返回 Returns:
             键值对字典 / Dictionary of key-value pairs
         """
-        full_keys = [self._make_key(key) for key in keys]
-        result = self._backend.get_many(full_keys)
+        prefix_str = self._prefix_str
+        if not prefix_str:
+            return self._backend_get_many(keys)
+        
+        result = self._backend_get_many([prefix_str + key for key in keys])
         
         # 移除前缀返回原始键 / Remove prefix and return original keys
-        if self._key_prefix:
-            prefix_len = len(self._key_prefix) + 1
-            return {k[prefix_len:]: v for k, v in result.items()}
-        return result
+        prefix_len = len(prefix_str)
+        return {k[prefix_len:]: v for k, v in result.items()}
     
     def set_many(self, mapping: dict[str, Any], ttl: Optional[int] = None) -> bool:
         """批量设置多个键值对
@@ -160,10 +240,12 @@ class CacheManager:
         返回 Returns:
             是否设置成功 / True if successful
         """
-        full_mapping = {self._make_key(k): v for k, v in mapping.items()}
+        prefix_str = self._prefix_str
+        if prefix_str:
+            mapping = {prefix_str + k: v for k, v in mapping.items()}
         if ttl is None:
             ttl = self._default_ttl
-        return self._backend.set_many(full_mapping, ttl)
+        return self._backend_set_many(mapping, ttl)
     
     def delete_many(self, keys: list[str]) -> int:
         """批量删除多个键
@@ -175,8 +257,10 @@ class CacheManager:
         返回 Returns:
             删除的键数量 / Number of keys deleted
         """
-        full_keys = [self._make_key(key) for key in keys]
-        return self._backend.delete_many(full_keys)
+        prefix_str = self._prefix_str
+        if prefix_str:
+            keys = [prefix_str + key for key in keys]
+        return self._backend_delete_many(keys)
     
     def increment(self, key: str, delta: int = 1) -> int:
         """递增计数器
@@ -189,8 +273,7 @@ class CacheManager:
         返回 Returns:
             递增后的值 / Value after increment
         """
-        full_key = self._make_key(key)
-        return self._backend.increment(full_key, delta)
+        return self._backend_increment(self._prefix_str + key, delta)
     
     def decrement(self, key: str, delta: int = 1) -> int:
         """递减计数器
@@ -203,8 +286,7 @@ class CacheManager:
         返回 Returns:
             递减后的值 / Value after decrement
         """
-        full_key = self._make_key(key)
-        return self._backend.decrement(full_key, delta)
+        return self._backend_decrement(self._prefix_str + key, delta)
     
     def cached(
         self,
@@ -230,56 +312,175 @@ class CacheManager:
             ```
         """
         def decorator(func: Callable) -> Callable:
+            # 函数标识在装饰时固定，预先构建键前缀和个性化哈希器
+            # The function identity is fixed at decoration time; pre-build the key prefix and personalized hasher
+            func_prefix, hasher = self._key_hasher(func)
+            
+            # 简单参数的缓存键记忆，重复调用时跳过序列化和哈希
+            # Memoized keys for simple arguments; repeat calls skip serialization and hashing
+            @functools.lru_cache(maxsize=4096)
+            def key_for(args: tuple, kwargs_items: tuple) -> str:
+                return self._generate_cache_key(func_prefix, hasher, args, dict(kwargs_items))
+            
             @functools.wraps(func)
             def wrapper(*args, **kwargs):
                 # 生成缓存键 / Generate cache key
                 if key_builder:
                     cache_key = key_builder(*args, **kwargs)
+                elif all(type(arg) in _MEMO_SAFE_TYPES for arg in args) and all(
+                    type(value) in _MEMO_SAFE_TYPES for value in kwargs.values()
+                ):
+                    cache_key = key_for(args, tuple(sorted(kwargs.items())) if kwargs else ())
                 else:
-                    cache_key = self._generate_cache_key(func, args, kwargs)
+                    cache_key = self._generate_cache_key(func_prefix, hasher, args, kwargs)
                 
                 # 尝试从缓存获取 / Try to get from cache
-                cached_value = self.get(cache_key)
-                if cached_value is not None:
+                cached_value = self.get(cache_key, _MISSING)
+                if cached_value is not _MISSING:
                     return cached_value
                 
                 # 调用原函数并缓存结果 / Call original function and cache result
-                result = func(*args, **kwargs)
-                self.set(cache_key, result, ttl)
-                return result
+                return self._load_once(cache_key, lambda: func(*args, **kwargs), ttl)
+            
+            return wrapper
+        return decorator
+    
+    def cached_batch(
+        self,
+        ttl: Optional[int] = None,
+        key_builder: Optional[Callable[..., str]] = None
+    ):
+        """批量缓存装饰器：按元素缓存批处理函数的结果
+        Batch cache decorator: Cache a batch function's results per element.
+        
+        被装饰函数的第一个参数是元素序列，返回等长且顺序一致的结果列表。
+        每次调用只做一次 get_many 和一次 set_many，函数只处理未命中的元素。
+        The decorated function takes a sequence of items as its first argument and
+        returns a list of results in the same order. Each call does one get_many and
+        one set_many, and the function only receives the items that missed.
+        
+        参数 Args:
+            ttl: 过期时间（秒）/ TTL in seconds
+            key_builder: 自定义单个元素的键生成函数 / Custom key builder for a single item
+            
+        返回 Returns:
+            装饰器函数 / Decorator function
+            
+        示例 Example:
+            ```python
+            @cache_manager.cached_batch(ttl=300)
+            def embed(texts):
+                # 一次请求处理整批 / One request for the whole batch
+                return client.embed(texts)
+            ```
+        """
+        def decorator(func: Callable) -> Callable:
+            func_prefix, hasher = self._key_hasher(func)
+            
+            @functools.wraps(func)
+            def wrapper(items, *args, **kwargs):
+                items = list(items)
+                
+                # 生成每个元素的缓存键 / Generate a cache key per item
+                if key_builder:
+                    keys = [key_builder(item, *args, **kwargs) for item in items]
+                else:
+                    keys = [
+                        self._generate_cache_key(func_prefix, hasher, (item,) + args, kwargs)
+                        for item in items
+                    ]
+                
+                # 一次往返探测整批 / Probe the whole batch in one round trip
+                found = self.get_many(keys)
+                
+                # 未命中的元素去重后交给原函数 / Deduplicated misses go to the original function
+                missing: dict[str, Any] = {}
+                for key, item in zip(keys, items):
+                    if key not in found and key not in missing:
+                        missing[key] = item
+                
+                if missing:
+                    computed = list(func(list(missing.values()), *args, **kwargs))
+                    if len(computed) != len(missing):
+                        raise ValueError(
+                            f"{func.__qualname__} returned {len(computed)} results "
+                            f"for {len(missing)} items"
+                        )
+                    computed_map = dict(zip(missing, computed))
+                    self.set_many(computed_map, ttl)
+                    found.update(computed_map)
+                
+                return [found[key] for key in keys]
             
             return wrapper
         return decorator
     
-    def _generate_cache_key(self, func: Callable, args: tuple, kwargs: dict) -> str:
+    @staticmethod
+    def _key_hasher(func: Callable) -> tuple[str, Any]:
+        """为函数构建缓存键前缀和个性化的 BLAKE2b 哈希器
+        Build the cache key prefix and personalized BLAKE2b hasher for a function.
+        
+        参数 Args:
+            func: 函数对象 / Function object
+            
+        返回 Returns:
+            (键前缀, 哈希器模板) / (key prefix, hasher template)
+        """
+        func_name = f"{func.__module__}.{func.__qualname__}"
+        # 函数名作为个性化参数而非哈希输入，完整函数名仍保留在键前缀中避免跨函数冲突
+        # The function name personalizes the hash instead of being hashed;
+        # the full name stays in the key prefix, so truncation cannot collide across functions
+        hasher = hashlib.blake2b(digest_size=16, person=func_name.encode()[:16])
+        return f"func:{func_name}:", hasher
+    
+    def _generate_cache_key(
+        self,
+        func_prefix: str,
+        hasher: Any,
+        args: tuple,
+        kwargs: dict
+    ) -> str:
         """生成函数调用的缓存键
         Generate cache key for function call.
         
         参数 Args:
-            func: 函数对象 / Function object
+            func_prefix: 由 _key_hasher 生成的键前缀 / Key prefix from _key_hasher
+            hasher: 由 _key_hasher 生成的哈希器模板 / Hasher template from _key_hasher
             args: 位置参数 / Positional arguments
             kwargs: 关键字参数 / Keyword arguments
             
         返回 Returns:
             缓存键 / Cache key
         """
-        # 构建键组件 / Build key components
-        func_name = f"{func.__module__}.{func.__qualname__}"
-        
-        # 序列化参数 / Serialize arguments
+        # 序列化参数：pickle 在 C 层完成，支持任意可 pickle 对象；kwargs 按名称排序、
+        # dict/set 参数先规范化，保证相等的参数得到相同的键
+        # Serialize arguments: pickle runs in C and handles any picklable object;
+        # kwargs are sorted by name and dict/set arguments are normalized first,
+        # so equal arguments always produce the same key
+        kwargs_items = tuple(sorted(kwargs.items()))
         try:
-            args_str = json.dumps(args, sort_keys=True)
-            kwargs_str = json.dumps(kwargs, sort_keys=True)
-        except (TypeError, ValueError):
-            # 如果无法序列化，使用字符串表示 / Use string representation if can't serialize
-            args_str = str(args)
-            kwargs_str = str(kwargs)
-        
-        # 生成哈希键 / Generate hash key
-        key_data = f"{func_name}:{args_str}:{kwargs_str}"
-        key_hash = hashlib.md5(key_data.encode()).hexdigest()
+            args = _normalize_key_arg(args)
+            kwargs_items = tuple((name, _normalize_key_arg(value)) for name, value in kwargs_items)
+            # 关闭 memo：否则同一对象出现两次会被写成引用，(s, s) 与 (s, copy(s)) 得到不同的键
+            # Memoization off: otherwise a repeated object is written as a back-reference,
+            # so (s, s) and (s, copy(s)) would produce different keys
+            buffer = io.BytesIO()
+            pickler = pickle.Pickler(buffer, protocol=5)
+            pickler.fast = True
+            pickler.dump((args, kwargs_items))
+            key_data = buffer.getvalue()
+        except Exception:
+            # 不可 pickle 或自引用的参数退回 repr
+            # Fall back to repr for unpicklable or self-referencing arguments
+            key_data = repr((args, kwargs_items)).encode()
         
-        return f"func:{func_name}:{key_hash}"
+        # 复制预先个性化的哈希器，省去每次调用的参数解析和初始化；
+        # 摘要用 urlsafe base64 编码（22 字符，十六进制需要 32 字符）
+        # Copy the pre-personalized hasher, skipping per-call parameter setup;
+        # the digest is urlsafe base64 encoded (22 chars instead of 32 hex chars)
+        h = hasher.copy()
+        h.update(key_data)
+        return func_prefix + base64.urlsafe_b64encode(h.digest()).rstrip(b"=").decode("ascii")
     
     @property
     def backend(self) -> CacheBackend:
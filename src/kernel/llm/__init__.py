@@ -4,110 +4,216 @@ LLM 模块
 提供统一的 LLM 交互接口，支持多种提供商和模型
 """
 
-# 基础组件
-from .model_client import (
-    BaseLLMClient,
-    ModelInfo,
-    LLMResponse,
-    StreamChunk,
-    ModelCapability,
-    OpenAIClient,
-    GeminiClient,
-    BedrockClient,
-    OPENAI_CLIENT_AVAILABLE,
-    GEMINI_CLIENT_AVAILABLE,
-    BEDROCK_CLIENT_AVAILABLE
-)
-
-# 客户端注册
-from .client_registry import (
-    ClientRegistry,
-    get_registry,
-    register_client,
-    unregister_client,
-    get_client,
-    create_client,
-    list_clients
-)
-
-# 异常
-from .exceptions import (
-    LLMError,
-    AuthenticationError,
-    RateLimitError,
-    ModelNotFoundError,
-    InvalidRequestError,
-    APIConnectionError,
-    ContextLengthExceededError,
-    InvalidResponseError,
-    ValidationError,
-    TimeoutError as LLMTimeoutError,
-    StreamError
-)
-
-# 请求管理
-from .llm_request import (
-    LLMRequest,
-    LLMRequestManager,
-    get_manager,
-    generate,
-    stream_generate,
-    generate_with_tools,
-    create_embeddings
-)
-
-# Payload 构建器
-from .payload import (
-    # Message
-    MessageBuilder,
-    MessageRole,
-    
-    # Tool
-    ToolBuilder,
-    ToolType,
-    ParameterType,
-    Parameter,
-    FunctionDefinition,
-    ToolDefinition,
-    
-    # Response
-    ResponseParser,
-    CompletionResponse,
-    Choice,
-    Message,
-    Usage,
-    FunctionCall,
-    ToolCall,
-    FinishReason,
-    
-    # Prompt
-    SystemPrompts,
-    PromptTemplates,
-    PromptBuilder,
-    get_system_prompt,
-    create_qa_prompt,
-    create_summary_prompt,
-    create_translation_prompt
-)
-
-# 工具函数
-from .utils import (
-    compress_image,
-    image_to_base64,
-    base64_to_image,
-    create_data_url,
-    estimate_tokens,
-    truncate_text
-)
-
-# 视频处理（inkfox）
-from .video_utils import (
-    VideoKeyframeExtractor,
-    extract_keyframes_from_video,
-    get_system_info,
-    check_inkfox_available,
-    INKFOX_AVAILABLE
-)
+import importlib
+from typing import TYPE_CHECKING, Any
+
+# 按需导入（PEP 562）：名称在首次访问时才加载对应子模块，
+# 只用到部分功能的调用方无需加载所有 SDK（openai、aioboto3、PIL 等）
+# 映射：导出名称 -> (子模块, 属性名)
+_LAZY_IMPORTS = {
+    # 基础组件
+    "BaseLLMClient": (".model_client", "BaseLLMClient"),
+    "ModelInfo": (".model_client", "ModelInfo"),
+    "LLMResponse": (".model_client", "LLMResponse"),
+    "StreamChunk": (".model_client", "StreamChunk"),
+    "ModelCapability": (".model_client", "ModelCapability"),
+    "OpenAIClient": (".model_client", "OpenAIClient"),
+    "GeminiClient": (".model_client", "GeminiClient"),
+    "BedrockClient": (".model_client", "BedrockClient"),
+    "OPENAI_CLIENT_AVAILABLE": (".model_client", "OPENAI_CLIENT_AVAILABLE"),
+    "GEMINI_CLIENT_AVAILABLE": (".model_client", "GEMINI_CLIENT_AVAILABLE"),
+    "BEDROCK_CLIENT_AVAILABLE": (".model_client", "BEDROCK_CLIENT_AVAILABLE"),
+    # 客户端注册
+    "ClientRegistry": (".client_registry", "ClientRegistry"),
+    "get_registry": (".client_registry", "get_registry"),
+    "register_client": (".client_registry", "register_client"),
+    "unregister_client": (".client_registry", "unregister_client"),
+    "get_client": (".client_registry", "get_client"),
+    "create_client": (".client_registry", "create_client"),
+    "list_clients": (".client_registry", "list_clients"),
+    # 客户端限流
+    "AsyncTokenBucket": (".rate_limiter", "AsyncTokenBucket"),
+    # 异常
+    "LLMError": (".exceptions", "LLMError"),
+    "AuthenticationError": (".exceptions", "AuthenticationError"),
+    "RateLimitError": (".exceptions", "RateLimitError"),
+    "ModelNotFoundError": (".exceptions", "ModelNotFoundError"),
+    "InvalidRequestError": (".exceptions", "InvalidRequestError"),
+    "APIConnectionError": (".exceptions", "APIConnectionError"),
+    "ContextLengthExceededError": (".exceptions", "ContextLengthExceededError"),
+    "InvalidResponseError": (".exceptions", "InvalidResponseError"),
+    "ValidationError": (".exceptions", "ValidationError"),
+    "LLMTimeoutError": (".exceptions", "TimeoutError"),
+    "StreamError": (".exceptions", "StreamError"),
+    # 请求管理
+    "LLMRequest": (".llm_request", "LLMRequest"),
+    "LLMRequestManager": (".llm_request", "LLMRequestManager"),
+    "get_manager": (".llm_request", "get_manager"),
+    "generate": (".llm_request", "generate"),
+    "stream_generate": (".llm_request", "stream_generate"),
+    "generate_with_tools": (".llm_request", "generate_with_tools"),
+    "create_embeddings": (".llm_request", "create_embeddings"),
+    # Payload 构建器
+    "MessageBuilder": (".payload", "MessageBuilder"),
+    "MessageRole": (".payload", "MessageRole"),
+    "ToolBuilder": (".payload", "ToolBuilder"),
+    "ToolType": (".payload", "ToolType"),
+    "ParameterType": (".payload", "ParameterType"),
+    "Parameter": (".payload", "Parameter"),
+    "FunctionDefinition": (".payload", "FunctionDefinition"),
+    "ToolDefinition": (".payload", "ToolDefinition"),
+    "ResponseParser": (".payload", "ResponseParser"),
+    "CompletionResponse": (".payload", "CompletionResponse"),
+    "Choice": (".payload", "Choice"),
+    "Message": (".payload", "Message"),
+    "Usage": (".payload", "Usage"),
+    "FunctionCall": (".payload", "FunctionCall"),
+    "ToolCall": (".payload", "ToolCall"),
+    "FinishReason": (".payload", "FinishReason"),
+    "SystemPrompts": (".payload", "SystemPrompts"),
+    "PromptTemplates": (".payload", "PromptTemplates"),
+    "PromptBuilder": (".payload", "PromptBuilder"),
+    "get_system_prompt": (".payload", "get_system_prompt"),
+    "create_qa_prompt": (".payload", "create_qa_prompt"),
+    "create_summary_prompt": (".payload", "create_summary_prompt"),
+    "create_translation_prompt": (".payload", "create_translation_prompt"),
+    # 工具函数
+    "compress_image": (".utils", "compress_image"),
+    "image_to_base64": (".utils", "image_to_base64"),
+    "base64_to_image": (".utils", "base64_to_image"),
+    "create_data_url": (".utils", "create_data_url"),
+    "estimate_tokens": (".utils", "estimate_tokens"),
+    "truncate_text": (".utils", "truncate_text"),
+    # 视频处理（inkfox）
+    "VideoKeyframeExtractor": (".video_utils", "VideoKeyframeExtractor"),
+    "extract_keyframes_from_video": (".video_utils", "extract_keyframes_from_video"),
+    "get_system_info": (".video_utils", "get_system_info"),
+    "check_inkfox_available": (".video_utils", "check_inkfox_available"),
+    "INKFOX_AVAILABLE": (".video_utils", "INKFOX_AVAILABLE"),
+}
+
+if TYPE_CHECKING:
+    # 基础组件
+    from .model_client import (
+        BaseLLMClient,
+        ModelInfo,
+        LLMResponse,
+        StreamChunk,
+        ModelCapability,
+        OpenAIClient,
+        GeminiClient,
+        BedrockClient,
+        OPENAI_CLIENT_AVAILABLE,
+        GEMINI_CLIENT_AVAILABLE,
+        BEDROCK_CLIENT_AVAILABLE
+    )
+
+    # 客户端注册
+    from .client_registry import (
+        ClientRegistry,
+        get_registry,
+        register_client,
+        unregister_client,
+        get_client,
+        create_client,
+        list_clients
+    )
+
+    # 客户端限流
+    from .rate_limiter import AsyncTokenBucket
+
+    # 异常
+    from .exceptions import (
+        LLMError,
+        AuthenticationError,
+        RateLimitError,
+        ModelNotFoundError,
+        InvalidRequestError,
+        APIConnectionError,
+        ContextLengthExceededError,
+        InvalidResponseError,
+        ValidationError,
+        TimeoutError as LLMTimeoutError,
+        StreamError
+    )
+
+    # 请求管理
+    from .llm_request import (
+        LLMRequest,
+        LLMRequestManager,
+        get_manager,
+        generate,
+        stream_generate,
+        generate_with_tools,
+        create_embeddings
+    )
+
+    # Payload 构建器
+    from .payload import (
+        # Message
+        MessageBuilder,
+        MessageRole,
+
+        # Tool
+        ToolBuilder,
+        ToolType,
+        ParameterType,
+        Parameter,
+        FunctionDefinition,
+        ToolDefinition,
+
+        # Response
+        ResponseParser,
+        CompletionResponse,
+        Choice,
+        Message,
+        Usage,
+        FunctionCall,
+        ToolCall,
+        FinishReason,
+
+        # Prompt
+        SystemPrompts,
+        PromptTemplates,
+        PromptBuilder,
+        get_system_prompt,
+        create_qa_prompt,
+        create_summary_prompt,
+        create_translation_prompt
+    )
+
+    # 工具函数
+    from .utils import (
+        compress_image,
+        image_to_base64,
+        base64_to_image,
+        create_data_url,
+        estimate_tokens,
+        truncate_text
+    )
+
+    # 视频处理（inkfox）
+    from .video_utils import (
+        VideoKeyframeExtractor,
+        extract_keyframes_from_video,
+        get_system_info,
+        check_inkfox_available,
+        INKFOX_AVAILABLE
+    )
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module_path, attr = _LAZY_IMPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_path, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
 
 
 __all__ = [
@@ -135,6 +241,9 @@ __all__ = [
     "create_client",
     "list_clients",
     
+    # Rate limiting
+    "AsyncTokenBucket",
+    
     # Exceptions
     "LLMError",
     "AuthenticationError",
@@ -4,11 +4,60 @@ LLM Client 注册管理器
 管理和注册不同的 LLM 客户端实现
 """
 
-from typing import Dict, Type, Optional, Any, List
+import asyncio
+import functools
+import hashlib
+import importlib
+import pickle
+from dataclasses import dataclass, field
+from typing import Dict, Type, Optional, Any, List, Tuple, Union
 from kernel.logger import get_logger
 from .model_client.base_client import BaseLLMClient
 
 
+logger = get_logger(__name__)
+
+# 实例缓存键：(API密钥, 配置摘要)
+InstanceKey = Tuple[Optional[str], bytes]
+
+# 延迟加载的客户端：(模块路径, 类名)，首次使用时才导入
+LazyClientSpec = Tuple[str, str]
+ClientSpec = Union[Type[BaseLLMClient], LazyClientSpec]
+
+
+@functools.lru_cache(maxsize=256)
+def _check_subclass(cls: type, base: type) -> bool:
+    """缓存的子类检查，类定义后不可变，结果可以安全复用"""
+    return isinstance(cls, type) and issubclass(cls, base)
+
+
+def _hash_config(config: Optional[Dict[str, Any]]) -> bytes:
+    """计算配置摘要，用于区分不同配置的客户端实例
+    
+    Args:
+        config: 客户端配置
+        
+    Returns:
+        bytes: 8 字节摘要，空配置返回 b""
+    """
+    if not config:
+        return b""
+    items = sorted(config.items())
+    try:
+        data = pickle.dumps(items, protocol=5)
+    except Exception:
+        # 不可 pickle 的配置值退回 repr
+        data = repr(items).encode()
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+@dataclass(slots=True)
+class _ClientEntry:
+    """单个客户端名称的注册信息：客户端类（或延迟加载描述）及其缓存实例"""
+    client_class: ClientSpec
+    instances: Dict[InstanceKey, BaseLLMClient] = field(default_factory=dict)
+
+
 class ClientRegistry:
     """LLM客户端注册管理器
     
@@ -17,36 +66,39 @@ class ClientRegistry:
     
     def __init__(self):
         """初始化注册器"""
-        self._clients: Dict[str, Type[BaseLLMClient]] = {}
-        self._instances: Dict[str, BaseLLMClient] = {}
-        self.logger = get_logger(__name__)
+        # 名称 -> 注册信息，一次查找同时拿到客户端类和缓存实例
+        self._clients: Dict[str, _ClientEntry] = {}
+        self.logger = logger
     
     def register(
         self,
         name: str,
-        client_class: Type[BaseLLMClient],
+        client_class: ClientSpec,
         override: bool = False
     ) -> None:
         """注册LLM客户端类
         
         Args:
             name: 客户端名称（如 'openai', 'gemini', 'bedrock'）
-            client_class: 客户端类（必须继承BaseLLMClient）
+            client_class: 客户端类（必须继承BaseLLMClient），
+                或 (模块路径, 类名) 元组，首次创建实例时才导入并校验
             override: 是否覆盖已存在的注册
             
         Raises:
             TypeError: 如果client_class不是BaseLLMClient的子类
             ValueError: 如果名称已存在且override=False
         """
-        # 验证类型
-        if not issubclass(client_class, BaseLLMClient):
-            self.logger.error(
-                f"注册失败: {client_class.__name__} 不是 BaseLLMClient 的子类"
-            )
-            raise TypeError(
-                f"client_class must be a subclass of BaseLLMClient, "
-                f"got {client_class.__name__}"
-            )
+        # 延迟加载的客户端只校验描述格式，类型检查推迟到首次使用
+        if isinstance(client_class, tuple):
+            if len(client_class) != 2 or not all(isinstance(part, str) for part in client_class):
+                raise TypeError(
+                    f"Lazy client spec must be a (module_path, class_name) tuple, "
+                    f"got {client_class!r}"
+                )
+            class_name = client_class[1]
+        else:
+            self._validate_class(client_class)
+            class_name = client_class.__name__
         
         # 检查是否已存在
         if name in self._clients and not override:
@@ -56,12 +108,16 @@ class ClientRegistry:
                 f"Use override=True to replace it."
             )
         
-        # 注册
-        self._clients[name] = client_class
-        self.logger.info(f"注册LLM客户端: {name} -> {client_class.__name__}")
+        # 注册（覆盖时保留已缓存的实例）
+        entry = self._clients.get(name)
+        if entry is None:
+            self._clients[name] = _ClientEntry(client_class)
+        else:
+            entry.client_class = client_class
+        self.logger.info(f"注册LLM客户端: {name} -> {class_name}")
     
-    def unregister(self, name: str) -> None:
-        """注销客户端
+    async def unregister(self, name: str) -> None:
+        """注销客户端，并等待其缓存实例关闭
         
         Args:
             name: 客户端名称
@@ -69,34 +125,81 @@ class ClientRegistry:
         Raises:
             KeyError: 如果客户端不存在
         """
-        if name not in self._clients:
+        entry = self._clients.pop(name, None)
+        if entry is None:
             raise KeyError(f"Client '{name}' is not registered")
         
         # 如果有实例，先关闭
-        if name in self._instances:
-            import asyncio
-            try:
-                asyncio.create_task(self._instances[name].close())
-            except:
-                pass
-            del self._instances[name]
+        if entry.instances:
+            await asyncio.gather(*(
+                self._safe_close(name, client) for client in entry.instances.values()
+            ))
         
-        del self._clients[name]
         self.logger.info(f"注销LLM客户端: {name}")
     
-    def get_client_class(self, name: str) -> Type[BaseLLMClient]:
-        """获取客户端类
+    def unregister_sync(self, name: str) -> None:
+        """在同步上下文中注销客户端
+        
+        不会关闭缓存实例，只丢弃引用；能 await 时请使用 unregister()
         
         Args:
             name: 客户端名称
             
-        Returns:
-            Type[BaseLLMClient]: 客户端类
-            
         Raises:
-            KeyError: 如果客户端未注册
+            KeyError: 如果客户端不存在
+        """
+        entry = self._clients.pop(name, None)
+        if entry is None:
+            raise KeyError(f"Client '{name}' is not registered")
+        
+        if entry.instances:
+            self.logger.warning(
+                f"同步注销客户端 '{name}'，{len(entry.instances)} 个缓存实例未关闭，请改用 await unregister()"
+            )
+        
+        self.logger.info(f"注销LLM客户端: {name}")
+    
+    def _validate_class(self, client_class: Any) -> None:
+        """校验客户端类继承自 BaseLLMClient
+        
+        Raises:
+            TypeError: 如果不是BaseLLMClient的子类
+        """
+        if not _check_subclass(client_class, BaseLLMClient):
+            class_name = getattr(client_class, '__name__', repr(client_class))
+            self.logger.error(
+                f"注册失败: {class_name} 不是 BaseLLMClient 的子类"
+            )
+            raise TypeError(
+                f"client_class must be a subclass of BaseLLMClient, "
+                f"got {class_name}"
+            )
+    
+    def _resolve_class(self, entry: _ClientEntry) -> Type[BaseLLMClient]:
+        """返回注册信息中的客户端类，延迟加载的客户端在此导入并校验
+        
+        Raises:
+            ImportError: 如果模块或类无法导入
+            TypeError: 如果导入的类不是BaseLLMClient的子类
         """
-        if name not in self._clients:
+        client_class = entry.client_class
+        if isinstance(client_class, tuple):
+            module_path, class_name = client_class
+            module = importlib.import_module(module_path)
+            try:
+                client_class = getattr(module, class_name)
+            except AttributeError:
+                raise ImportError(
+                    f"cannot import name '{class_name}' from '{module_path}'"
+                ) from None
+            self._validate_class(client_class)
+            entry.client_class = client_class
+        return client_class
+    
+    def _get_entry(self, name: str) -> _ClientEntry:
+        """获取注册信息，未注册时记录日志并抛出 KeyError"""
+        entry = self._clients.get(name)
+        if entry is None:
             available = ', '.join(self.list_clients())
             self.logger.error(
                 f"客户端 '{name}' 未注册，可用客户端: {available}"
@@ -105,8 +208,23 @@ class ClientRegistry:
                 f"Client '{name}' is not registered. "
                 f"Available clients: {available}"
             )
+        return entry
+    
+    def get_client_class(self, name: str) -> Type[BaseLLMClient]:
+        """获取客户端类
         
-        return self._clients[name]
+        Args:
+            name: 客户端名称
+            
+        Returns:
+            Type[BaseLLMClient]: 客户端类
+            
+        Raises:
+            KeyError: 如果客户端未注册
+            ImportError: 如果延迟加载的客户端无法导入
+            TypeError: 如果延迟加载的类不是BaseLLMClient的子类
+        """
+        return self._resolve_class(self._get_entry(name))
     
     def create_client(
         self,
@@ -121,7 +239,7 @@ class ClientRegistry:
             name: 客户端名称
             api_key: API密钥
             config: 客户端配置
-            cache: 是否缓存实例（相同配置复用实例）
+            cache: 是否缓存实例（名称、API密钥和配置都相同时复用实例）
             
         Returns:
             BaseLLMClient: 客户端实例
@@ -129,21 +247,23 @@ class ClientRegistry:
         Raises:
             KeyError: 如果客户端未注册
         """
-        # 如果启用缓存且实例已存在
-        if cache and name in self._instances:
-            self.logger.debug(f"复用缓存的客户端实例: {name}")
-            return self._instances[name]
+        entry = self._get_entry(name)
         
-        # 获取客户端类
-        client_class = self.get_client_class(name)
+        # 实例按 (API密钥, 配置摘要) 缓存，不同配置不会误用同一实例
+        if cache:
+            instance_key = (api_key, _hash_config(config))
+            instance = entry.instances.get(instance_key)
+            if instance is not None:
+                self.logger.debug(f"复用缓存的客户端实例: {name}")
+                return instance
         
         # 创建实例
         self.logger.info(f"创建LLM客户端实例: {name}")
-        instance = client_class(api_key=api_key, config=config)
+        instance = self._resolve_class(entry)(api_key=api_key, config=config)
         
         # 缓存实例
         if cache:
-            self._instances[name] = instance
+            entry.instances[instance_key] = instance
         
         return instance
     
@@ -211,28 +331,47 @@ class ClientRegistry:
         Raises:
             KeyError: 如果客户端未注册
         """
-        client_class = self.get_client_class(name)
+        entry = self._get_entry(name)
+        client_class = self._resolve_class(entry)
         
         return {
             'name': name,
             'class': client_class.__name__,
             'module': client_class.__module__,
-            'has_instance': name in self._instances,
+            'has_instance': bool(entry.instances),
             'doc': client_class.__doc__
         }
     
     async def close_all(self) -> None:
         """关闭所有缓存的客户端实例"""
-        self.logger.info(f"关闭所有LLM客户端实例，共 {len(self._instances)} 个")
+        self.logger.info(f"关闭所有LLM客户端实例，共 {self._instance_count()} 个")
         
-        for name, client in self._instances.items():
-            try:
-                await client.close()
-                self.logger.debug(f"关闭客户端实例: {name}")
-            except Exception as e:
-                self.logger.error(f"关闭客户端 '{name}' 失败: {e}")
+        # 并发关闭，总耗时约等于最慢的一个
+        await asyncio.gather(*(
+            self._safe_close(name, client)
+            for name, entry in self._clients.items()
+            for client in entry.instances.values()
+        ))
         
-        self._instances.clear()
+        for entry in self._clients.values():
+            entry.instances.clear()
+    
+    def _instance_count(self) -> int:
+        """统计所有缓存实例数量"""
+        return sum(len(entry.instances) for entry in self._clients.values())
+    
+    async def _safe_close(self, name: str, client: BaseLLMClient) -> None:
+        """关闭单个客户端实例，失败只记录日志不抛出
+        
+        Args:
+            name: 客户端名称
+            client: 客户端实例
+        """
+        try:
+            await client.close()
+            self.logger.debug(f"关闭客户端实例: {name}")
+        except Exception as e:
+            self.logger.error(f"关闭客户端 '{name}' 失败: {e}")
     
     def clear_cache(self, name: Optional[str] = None) -> None:
         """清除缓存的客户端实例
@@ -241,23 +380,25 @@ class ClientRegistry:
             name: 客户端名称，如果为None则清除所有
         """
         if name:
-            if name in self._instances:
-                del self._instances[name]
+            entry = self._clients.get(name)
+            if entry is not None and entry.instances:
+                entry.instances.clear()
                 self.logger.debug(f"清除客户端缓存: {name}")
         else:
-            self._instances.clear()
+            for entry in self._clients.values():
+                entry.instances.clear()
             self.logger.debug("清除所有客户端缓存")
     
     def __repr__(self) -> str:
         return (
             f"ClientRegistry("
             f"registered={len(self._clients)}, "
-            f"instances={len(self._instances)})"
+            f"instances={self._instance_count()})"
         )
 
 
-# 全局单例注册器
-_global_registry: Optional[ClientRegistry] = None
+# 全局单例注册器（导入时创建，构造开销很小）
+_global_registry = ClientRegistry()
 
 
 def get_registry() -> ClientRegistry:
@@ -266,15 +407,12 @@ def get_registry() -> ClientRegistry:
     Returns:
         ClientRegistry: 全局注册器实例
     """
-    global _global_registry
-    if _global_registry is None:
-        _global_registry = ClientRegistry()
     return _global_registry
 
 
 def register_client(
     name: str,
-    client_class: Type[BaseLLMClient],
+    client_class: ClientSpec,
     override: bool = False
 ) -> None:
     """注册LLM客户端到全局注册器
@@ -283,7 +421,7 @@ def register_client(
     
     Args:
         name: 客户端名称
-        client_class: 客户端类
+        client_class: 客户端类，或 (模块路径, 类名) 元组延迟导入
         override: 是否覆盖已存在的注册
         
     Examples:
@@ -291,15 +429,15 @@ def register_client(
         >>> from kernel.llm.model_client import OpenAIClient
         >>> 
         >>> register_client('openai', OpenAIClient)
+        >>> # 首次创建实例时才导入 SDK
+        >>> register_client('bedrock', ('kernel.llm.model_client.bedrock_client', 'BedrockClient'))
     """
-    registry = get_registry()
-    registry.register(name, client_class, override)
+    _global_registry.register(name, client_class, override)
 
 
-def unregister_client(name: str) -> None:
-    """从全局注册器注销客户端并清理缓存实例"""
-    registry = get_registry()
-    registry.unregister(name)
+async def unregister_client(name: str) -> None:
+    """从全局注册器注销客户端并关闭缓存实例"""
+    await _global_registry.unregister(name)
 
 
 def create_client(
@@ -323,8 +461,7 @@ def create_client(
         >>> client = create_client('openai', api_key='sk-...')
         >>> await client.initialize()
     """
-    registry = get_registry()
-    return registry.create_client(name, api_key, config, cache)
+    return _global_registry.create_client(name, api_key, config, cache)
 
 
 def get_client(
@@ -359,8 +496,7 @@ async def create_client_async(
         >>> # 客户端已初始化，可以直接使用
         >>> response = await client.generate(...)
     """
-    registry = get_registry()
-    return await registry.create_client_async(name, api_key, config, cache)
+    return await _global_registry.create_client_async(name, api_key, config, cache)
 
 
 def list_clients() -> List[str]:
@@ -369,5 +505,4 @@ def list_clients() -> List[str]:
     Returns:
         List[str]: 客户端名称列表
     """
-    registry = get_registry()
-    return registry.list_clients()
+    return _global_registry.list_clients()
@@ -2,12 +2,27 @@
 LLM 异常类定义
 
 定义 LLM 请求过程中可能出现的各种异常
+
+带额外属性的异常使用 __slots__ 存放这些属性，实例无需再分配 __dict__
 """
 
 
 class LLMError(Exception):
     """LLM 异常基类"""
-    pass
+
+    def __reduce__(self):
+        # 子类把额外属性放在 __slots__ 中，默认的 pickle 状态只包含 __dict__，需要显式补上
+        state = dict(self.__dict__)
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return _restore_error, (type(self), self.args), state
+
+
+def _restore_error(cls, args):
+    """反序列化时绕过 __init__ 重建异常，避免子类构造参数与 args 不一致"""
+    return cls.__new__(cls, *args)
 
 
 class ConfigurationError(LLMError):
@@ -28,6 +43,8 @@ class RateLimitError(LLMError):
     
     当达到 API 调用速率限制时抛出
     """
+    __slots__ = ("retry_after",)
+
     def __init__(self, message: str, retry_after: int = None):
         super().__init__(message)
         self.retry_after = retry_after  # 建议重试的秒数
@@ -54,6 +71,8 @@ class ModelNotFoundError(LLMError):
     
     当请求的模型不存在或不可用时抛出
     """
+    __slots__ = ("model_name",)
+
     def __init__(self, model_name: str, message: str = None):
         self.model_name = model_name
         msg = message or f"Model '{model_name}' not found or not available"
@@ -65,6 +84,8 @@ class ContextLengthExceededError(LLMError):
     
     当输入超过模型的最大上下文长度时抛出
     """
+    __slots__ = ("max_tokens", "actual_tokens")
+
     def __init__(self, message: str, max_tokens: int = None, actual_tokens: int = None):
         super().__init__(message)
         self.max_tokens = max_tokens
@@ -84,6 +105,8 @@ class TimeoutError(LLMError):
     
     当请求超时时抛出
     """
+    __slots__ = ("timeout",)
+
     def __init__(self, message: str, timeout: float = None):
         super().__init__(message)
         self.timeout = timeout
@@ -110,6 +133,8 @@ class ServerError(LLMError):
     
     当 API 服务器返回 5xx 错误时抛出
     """
+    __slots__ = ("status_code",)
+
     def __init__(self, message: str, status_code: int = None):
         super().__init__(message)
         self.status_code = status_code
@@ -4,29 +4,96 @@ LLM 请求核心逻辑
 提供统一的 LLM 交互接口，协调 client 和 payload
 """
 
-from typing import List, Dict, Any, Optional, Union, AsyncIterator
+import asyncio
+import hashlib
+import logging
+import random
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Union, AsyncIterator, Iterable, Mapping, Tuple
 from dataclasses import dataclass, field
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
 
-from .client_registry import create_client, ClientRegistry
-from .model_client.base_client import BaseLLMClient, LLMResponse, StreamChunk
+from .client_registry import get_registry, ClientRegistry
+from .model_client.base_client import BaseLLMClient, LLMResponse, StreamChunk, dumps_json, gather_or_cancel
+from .payload.message import MessageRole
 from .exceptions import (
     ModelNotFoundError,
     InvalidRequestError,
-    ValidationError
+    ValidationError,
+    InvalidResponseError
 )
 
 try:
-    from ..logger import get_logger
+    from ..logger import get_logger, LogMetadata, MetadataContext
     logger = get_logger(__name__)
 except ImportError:
-    import logging
+    LogMetadata = None
+    MetadataContext = None
     logger = logging.getLogger(__name__)
 
+# aiohttp 是可选的，用于在客户端之间共享连接池
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+# 客户端缓存键：(提供商, 模型)，元组键省去每次查找的字符串格式化
+ClientKey = Tuple[Optional[str], Optional[str]]
+
+# 嵌入去重键：(提供商, 模型, 文本摘要)
+EmbeddingKey = Tuple[Optional[str], str, bytes]
+
+# 可重试的瞬时错误：只包括客户端未处理的超时和连接错误。
+# 限流和服务端错误由各客户端自己重试（Gemini 的 _send、Bedrock 的 _invoke_with_retry、
+# OpenAI SDK 的 max_retries），转换后的 RateLimitError 等不再重试，避免重试次数逐层相乘
+_RETRYABLE_ERRORS: Tuple[type, ...] = (
+    asyncio.TimeoutError,
+) + ((aiohttp.ClientError,) if AIOHTTP_AVAILABLE else ())
+
+# 流式输出的缓冲队列长度
+_STREAM_BUFFER_SIZE = 64
+
+# 流式输出结束标记
+_STREAM_END = object()
+
+
+# 驻留的消息角色字符串，相同角色共享同一对象，比较和哈希更快
+_ROLES: Dict[str, str] = {role.value: sys.intern(role.value) for role in MessageRole}
+
+# 内部缓存字段，写入时不触发失效
+_CACHE_FIELDS = frozenset({"_cached_dict", "_cached_json", "_validated"})
+
 
-@dataclass
+def _request_context():
+    """为一次调用绑定 request_id，日志记录自动带上该 ID
+
+    调用方已设置 request_id 时沿用；日志关闭时不生成 ID，直接返回空上下文
+    """
+    if (
+        MetadataContext is None
+        or not logger.isEnabledFor(logging.INFO)
+        or LogMetadata.get_request_id() is not None
+    ):
+        return nullcontext()
+    return MetadataContext(request_id=uuid.uuid4().hex)
+
+
+@dataclass(slots=True, kw_only=True)
 class LLMRequest:
-    """LLM 请求配置"""
+    """LLM 请求配置
+    
+    构造时即完成参数验证；验证结果和 to_dict / to_json_bytes 的结果会缓存，直接给字段赋值时失效；
+    原地修改 messages 等可变字段后需调用 invalidate()
+    
+    Raises:
+        ValidationError: 构造参数无效
+    """
     
     # 基础配置
     model: str
@@ -54,8 +121,54 @@ class LLMRequest:
     # 元数据
     metadata: Dict[str, Any] = field(default_factory=dict)
     
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典格式"""
+    # to_dict 结果缓存
+    _cached_dict: Optional[Mapping[str, Any]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # to_json_bytes 结果缓存
+    _cached_json: Optional[bytes] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # 当前字段是否已通过验证
+    _validated: bool = field(default=False, init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        self.validate()
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        # 任意字段变更都会使缓存失效
+        if name not in _CACHE_FIELDS:
+            object.__setattr__(self, "_cached_dict", None)
+            object.__setattr__(self, "_cached_json", None)
+            object.__setattr__(self, "_validated", False)
+    
+    def invalidate(self) -> None:
+        """丢弃缓存的 to_dict / to_json_bytes 结果和验证结果"""
+        self._cached_dict = None
+        self._cached_json = None
+        self._validated = False
+    
+    def _intern_strings(self) -> None:
+        """驻留模型名和消息角色，仅在验证通过时执行一次"""
+        # 直接写入槽位，驻留不改变值，不需要使缓存失效
+        if type(self.model) is str:
+            object.__setattr__(self, "model", sys.intern(self.model))
+        
+        for message in self.messages:
+            role = message.get("role") if isinstance(message, dict) else None
+            interned = _ROLES.get(role) if type(role) is str else None
+            if interned is not None and interned is not role:
+                message["role"] = interned
+    
+    def to_dict(self) -> Mapping[str, Any]:
+        """转换为字典格式
+        
+        返回只读映射并缓存复用，需要修改时请先 dict() 复制
+        """
+        if self._cached_dict is not None:
+            return self._cached_dict
+        
         data = {
             "model": self.model,
             "messages": self.messages,
@@ -88,7 +201,18 @@ class LLMRequest:
         if self.user is not None:
             data["user"] = self.user
         
-        return data
+        proxy = MappingProxyType(data)
+        self._cached_dict = proxy
+        return proxy
+    
+    def to_json_bytes(self) -> bytes:
+        """转换为 JSON 字节串，可直接作为 HTTP 请求体
+        
+        结果会缓存，字段不变时重复调用不会重新编码
+        """
+        if self._cached_json is None:
+            self._cached_json = dumps_json(dict(self.to_dict()))
+        return self._cached_json
     
     def validate(self) -> bool:
         """验证请求参数
@@ -99,6 +223,23 @@ class LLMRequest:
         Raises:
             ValidationError: 参数无效
         """
+        if self._validated:
+            return True
+        
+        # 快速路径：一次组合判断，全部通过时不再逐项检查
+        max_tokens = self.max_tokens
+        if (
+            self.model
+            and self.messages
+            and 0 <= self.temperature <= 2
+            and 0 <= self.top_p <= 1
+            and (max_tokens is None or max_tokens > 0)
+        ):
+            self._intern_strings()
+            self._validated = True
+            return True
+        
+        # 慢路径：定位具体的错误
         if not self.model:
             raise ValidationError("Model is required")
         
@@ -123,14 +264,83 @@ class LLMRequestManager:
     提供统一的 LLM 交互接口
     """
     
-    def __init__(self, registry: Optional[ClientRegistry] = None):
+    def __init__(
+        self,
+        registry: Optional[ClientRegistry] = None,
+        max_clients: int = 100,
+        client_ttl: float = 600.0,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 10.0,
+        embedding_cache_size: int = 0,
+        embedding_cache_ttl: float = 3600.0
+    ):
         """初始化请求管理器
         
         Args:
             registry: 客户端注册表（默认使用全局注册表）
+            max_clients: 最多缓存的客户端数，超出时关闭最久未使用的客户端
+            client_ttl: 客户端最长存活时间（秒），过期后关闭并重建连接
+            max_retries: 客户端未处理的超时和连接错误的最大重试次数
+            retry_base_delay: 指数退避的基础延迟（秒）
+            retry_max_delay: 单次重试的最大延迟（秒）
+            embedding_cache_size: 嵌入结果缓存的条目数，0 表示不缓存
+            embedding_cache_ttl: 嵌入结果缓存的存活时间（秒）
         """
         self.registry = registry
-        self._clients: Dict[str, BaseLLMClient] = {}
+        self.max_clients = max_clients
+        self.client_ttl = client_ttl
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.embedding_cache_size = embedding_cache_size
+        self.embedding_cache_ttl = embedding_cache_ttl
+        # (提供商, 模型) -> (客户端, 过期时间)，按最近使用排序
+        self._clients: "OrderedDict[ClientKey, Tuple[BaseLLMClient, float]]" = OrderedDict()
+        # 正在创建客户端的键 -> 创建锁，创建完成后移除
+        self._creation_locks: Dict[ClientKey, asyncio.Lock] = {}
+        # 所有客户端共享的 HTTP 会话，首次需要时在事件循环内创建
+        self._session: Optional["aiohttp.ClientSession"] = None
+        # 共享会话所属的事件循环，循环变化（如再次 asyncio.run）时需要重建会话
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        # 正在请求的嵌入 -> 结果 Future，相同文本的并发请求共享一次调用
+        self._inflight_embeddings: Dict[EmbeddingKey, "asyncio.Future[List[float]]"] = {}
+        # 嵌入结果缓存：键 -> (向量, 过期时间)，按最近使用排序
+        self._embedding_cache: "OrderedDict[EmbeddingKey, Tuple[List[float], float]]" = OrderedDict()
+        # 客户端 id -> 正在使用该客户端的调用数
+        self._leases: Dict[int, int] = {}
+        # 已移出缓存但仍在使用的客户端，最后一个调用结束时关闭
+        self._retired: Dict[int, BaseLLMClient] = {}
+    
+    def _get_session(self) -> Optional["aiohttp.ClientSession"]:
+        """获取共享的 aiohttp 会话
+        
+        共享连接池避免每个客户端各自建立 TCP/TLS 连接；会话绑定创建它的事件循环，
+        在新的事件循环中调用时重建会话，并让已缓存的客户端改用新会话
+        
+        Returns:
+            Optional[aiohttp.ClientSession]: 共享会话，aiohttp 不可用时为 None
+        """
+        if not AIOHTTP_AVAILABLE:
+            return None
+        
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=20,
+                keepalive_timeout=30,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=60, connect=10)
+            )
+            self._session_loop = loop
+            for client, _ in self._clients.values():
+                client.bind_http_session(self._session)
+        
+        return self._session
     
     async def _get_client(
         self,
@@ -149,27 +359,175 @@ class LLMRequestManager:
         Raises:
             ModelNotFoundError: 找不到合适的客户端
         """
-        # 尝试从缓存获取
-        cache_key = f"{provider}:{model}"
-        if cache_key in self._clients:
-            return self._clients[cache_key]
+        # 事件循环变化后旧会话不可再用，先重建会话并重新绑定已缓存的客户端
+        if self._session_loop is not None and self._session_loop is not asyncio.get_running_loop():
+            self._get_session()
         
-        # 创建新客户端
-        try:
-            if self.registry:
-                client = await self.registry.create_client(provider, model=model)
-            else:
-                client = await create_client(provider, model=model)
-            
-            # 缓存客户端
-            self._clients[cache_key] = client
-            logger.debug(f"Created client for {provider}:{model}")
+        # 快速路径：命中未过期的缓存
+        cache_key = (provider, model)
+        entry = self._clients.get(cache_key)
+        if entry is not None and time.monotonic() < entry[1]:
+            self._clients.move_to_end(cache_key)
+            return entry[0]
+        
+        # 同一个键的并发冷启动只创建一次客户端，其余协程等待后复用
+        lock = self._creation_locks.setdefault(cache_key, asyncio.Lock())
+        async with lock:
+            try:
+                return await self._create_client(cache_key, provider, model)
+            finally:
+                if self._creation_locks.get(cache_key) is lock:
+                    del self._creation_locks[cache_key]
+    
+    async def warmup(
+        self,
+        pairs: List[ClientKey],
+        initialize: bool = True
+    ) -> List[Union[BaseLLMClient, BaseException]]:
+        """启动时并发预热客户端，把建连开销移出请求路径
+        
+        Args:
+            pairs: 要预热的 (提供商, 模型) 列表
+            initialize: 是否同时调用客户端的 initialize()（建立连接、校验密钥）
             
+        Returns:
+            List[Union[BaseLLMClient, BaseException]]: 与 pairs 顺序一致的结果，
+                预热失败的位置为异常对象
+        """
+        async def _warm(provider: Optional[str], model: Optional[str]) -> BaseLLMClient:
+            client = await self._get_client(provider, model)
+            if initialize and not client._initialized:
+                await client.initialize()
+                client._initialized = True
             return client
+        
+        results = await asyncio.gather(
+            *(_warm(provider, model) for provider, model in pairs),
+            return_exceptions=True
+        )
+        
+        for (provider, model), result in zip(pairs, results):
+            if isinstance(result, BaseException):
+                logger.warning("Warmup failed for %s:%s: %s", provider, model, result)
+        
+        return results
+    
+    async def _create_client(
+        self,
+        cache_key: ClientKey,
+        provider: Optional[str],
+        model: Optional[str]
+    ) -> BaseLLMClient:
+        """在创建锁内获取或创建客户端（调用方必须持有 cache_key 的锁）"""
+        # 等锁期间可能已有协程完成创建
+        entry = self._clients.get(cache_key)
+        if entry is not None:
+            client, expires_at = entry
+            if time.monotonic() < expires_at:
+                self._clients.move_to_end(cache_key)
+                return client
+            # 过期客户端关闭后重建，避免复用已被服务端断开的空闲连接
+            del self._clients[cache_key]
+            await self._retire_clients([client])
+        
+        # 创建新客户端（不放入注册表缓存，生命周期由管理器负责）
+        try:
+            registry = self.registry or get_registry()
+            client = registry.create_client(provider, cache=False)
+            
+            # 使用 aiohttp 的客户端复用共享连接池
+            session = self._get_session()
+            if session is not None:
+                client.bind_http_session(session)
             
         except Exception as e:
-            logger.error(f"Failed to get client: {e}")
+            logger.error("Failed to get client: %s", e)
             raise ModelNotFoundError(f"Cannot find client for {provider}:{model}") from e
+        
+        # 缓存客户端，超出容量时移出最久未使用的客户端
+        self._clients[cache_key] = (client, time.monotonic() + self.client_ttl)
+        logger.debug("Created client for %s:%s", provider, model)
+        
+        evicted = []
+        while len(self._clients) > self.max_clients:
+            _, (old_client, _) = self._clients.popitem(last=False)
+            evicted.append(old_client)
+        if evicted:
+            await self._retire_clients(evicted)
+        
+        return client
+    
+    def _retry_delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """计算第 attempt 次失败后的重试延迟
+        
+        指数退避加全随机抖动，避免大量请求同时重试
+        
+        Args:
+            attempt: 已失败的次数（从 0 开始）
+            error: 本次失败的异常
+            
+        Returns:
+            Optional[float]: 延迟秒数，不应重试时为 None
+        """
+        if attempt >= self.max_retries or not isinstance(error, _RETRYABLE_ERRORS):
+            return None
+        
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+    
+    async def _call_with_retry(self, func, *args, **kwargs) -> Any:
+        """调用客户端方法，瞬时错误时按退避策略重试
+        
+        Args:
+            func: 客户端的异步方法
+            *args: 位置参数
+            **kwargs: 关键字参数
+            
+        Returns:
+            Any: 方法的返回值
+        """
+        attempt = 0
+        while True:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                logger.warning(
+                    "%s, retrying in %.2fs (%d/%d)",
+                    type(e).__name__, delay, attempt, self.max_retries
+                )
+                await asyncio.sleep(delay)
+    
+    async def _retire_clients(self, clients: Iterable[BaseLLMClient]) -> None:
+        """关闭已移出缓存的客户端；仍有调用在使用的客户端等到最后一个调用结束再关闭
+        
+        Args:
+            clients: 已移出缓存的客户端
+        """
+        idle = []
+        for client in clients:
+            if id(client) in self._leases:
+                self._retired[id(client)] = client
+            else:
+                idle.append(client)
+        if idle:
+            await self._close_clients(idle)
+    
+    async def _close_clients(self, clients: Iterable[BaseLLMClient]) -> None:
+        """并发关闭客户端，失败只记录日志
+        
+        Args:
+            clients: 要关闭的客户端
+        """
+        async def _close(client: BaseLLMClient) -> None:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning("Failed to close client: %s", e)
+        
+        await asyncio.gather(*(_close(client) for client in clients))
     
     async def generate(
         self,
@@ -191,24 +549,56 @@ class LLMRequestManager:
         # 验证请求
         request.validate()
         
-        # 获取客户端
-        client = await self._get_client(request.provider, request.model)
+        with _request_context():
+            async with self.with_client(request.provider, request.model) as client:
+
+                # 由客户端生成最终参数；无额外参数时直接使用，
+                # 有额外参数时合并为新字典，允许 kwargs 覆盖请求字段
+                params = client.serialize(request)
+                if kwargs:
+                    params = {**params, **kwargs}
+
+                # 调用客户端
+                try:
+                    logger.info("Generating with model %s", request.model)
+                    response = await self._call_with_retry(client.generate, **params)
+                    logger.debug("Generation completed: %s", response.usage)
+
+                    return response
+
+                except Exception as e:
+                    logger.error("Generation failed: %s", e)
+                    raise
+    
+    async def generate_batch(
+        self,
+        requests: List[LLMRequest],
+        max_concurrency: int = 16,
+        **kwargs
+    ) -> List[Union[LLMResponse, BaseException]]:
+        """并发生成多个请求
         
-        # 合并参数
-        params = request.to_dict()
-        params.update(kwargs)
+        总耗时约等于最慢的一次调用，而不是所有调用之和
         
-        # 调用客户端
-        try:
-            logger.info(f"Generating with model {request.model}")
-            response = await client.generate(**params)
-            logger.debug(f"Generation completed: {response.usage}")
-            
-            return response
+        Args:
+            requests: LLM 请求配置列表
+            max_concurrency: 最大并发数
+            **kwargs: 额外参数（应用到每个请求）
             
-        except Exception as e:
-            logger.error(f"Generation failed: {e}")
-            raise
+        Returns:
+            List[Union[LLMResponse, BaseException]]: 与 requests 顺序一致的结果，
+                失败的请求对应位置为异常对象
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def _one(request: LLMRequest) -> LLMResponse:
+            async with semaphore:
+                return await self.generate(request, **kwargs)
+        
+        return await asyncio.gather(
+            *(_one(request) for request in requests),
+            return_exceptions=True
+        )
     
     async def stream_generate(
         self,
@@ -230,28 +620,86 @@ class LLMRequestManager:
         # 验证请求
         request.validate()
         
-        # 强制启用流式模式
-        request.stream = True
+        # request_id 只在不跨越 yield 的代码段内绑定：异步生成器 yield 时上下文变量会泄露给调用方。
+        # 后台任务创建时复制当前上下文，读取流时的日志同样带上该 ID
+        request_context = _request_context()
         
-        # 获取客户端
-        client = await self._get_client(request.provider, request.model)
+        # 流式输出期间持有客户端，避免被淘汰时关闭
+        async with self.with_client(request.provider, request.model) as client:
         
-        # 合并参数
-        params = request.to_dict()
-        params.update(kwargs)
+            # 由客户端生成最终参数；强制流式模式只覆盖参数，不修改请求对象，
+            # 请求的缓存保持有效，可以继续复用
+            params = client.serialize(request)
+            if params.get("stream") is False:
+                params = {**params, "stream": True}
+            if kwargs:
+                params = {**params, **kwargs}
         
-        # 流式调用
-        try:
-            logger.info(f"Streaming generation with model {request.model}")
-            
-            async for chunk in client.stream_generate(**params):
-                yield chunk
+            # 流式调用：后台任务读取网络流写入有界队列，慢消费者不会阻塞网络读取
+            queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=_STREAM_BUFFER_SIZE)
+            with request_context:
+                logger.info("Streaming generation with model %s", request.model)
+                producer = asyncio.create_task(self._drain_stream(client, params, queue))
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is _STREAM_END:
+                        break
+                    if isinstance(item, BaseException):
+                        raise item
+                    yield item
             
-            logger.debug("Streaming generation completed")
+                with request_context:
+                    logger.debug("Streaming generation completed")
             
+            except Exception as e:
+                with request_context:
+                    logger.error("Streaming generation failed: %s", e)
+                raise
+            finally:
+                # 消费者提前退出或出错时停止读取，等后台任务结束后再释放客户端
+                if not producer.done():
+                    producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+    
+    async def _drain_stream(
+        self,
+        client: BaseLLMClient,
+        params: Mapping[str, Any],
+        queue: "asyncio.Queue[Any]"
+    ) -> None:
+        """把客户端的流式输出写入队列，出错时写入异常，结束时写入结束标记
+        
+        只在尚未输出任何数据块时重试，避免重复输出
+        
+        Args:
+            client: 客户端实例
+            params: 请求参数
+            queue: 输出队列
+        """
+        attempt = 0
+        started = False
+        try:
+            while True:
+                try:
+                    async for chunk in client.stream_generate(**params):
+                        started = True
+                        await queue.put(chunk)
+                    break
+                except Exception as e:
+                    delay = None if started else self._retry_delay(attempt, e)
+                    if delay is None:
+                        raise
+                    attempt += 1
+                    logger.warning(
+                        "%s, retrying stream in %.2fs (%d/%d)",
+                        type(e).__name__, delay, attempt, self.max_retries
+                    )
+                    await asyncio.sleep(delay)
         except Exception as e:
-            logger.error(f"Streaming generation failed: {e}")
-            raise
+            await queue.put(e)
+        else:
+            await queue.put(_STREAM_END)
     
     async def generate_with_tools(
         self,
@@ -277,38 +725,49 @@ class LLMRequestManager:
         # 验证请求
         request.validate()
         
-        # 获取客户端
-        client = await self._get_client(request.provider, request.model)
-        
-        # 合并参数
-        params = request.to_dict()
-        params.update(kwargs)
-        
-        # 调用客户端
-        try:
-            logger.info(f"Generating with tools, model {request.model}")
-            response = await client.generate_with_tools(**params)
-            logger.debug("Tool calling completed")
-            
-            return response
-            
-        except Exception as e:
-            logger.error(f"Tool calling failed: {e}")
-            raise
+        with _request_context():
+            async with self.with_client(request.provider, request.model) as client:
+
+                # 由客户端生成最终参数；无额外参数时直接使用，
+                # 有额外参数时合并为新字典，允许 kwargs 覆盖请求字段
+                params = client.serialize(request)
+                if kwargs:
+                    params = {**params, **kwargs}
+
+                # 调用客户端
+                try:
+                    logger.info("Generating with tools, model %s", request.model)
+                    response = await self._call_with_retry(client.generate_with_tools, **params)
+                    logger.debug("Tool calling completed")
+
+                    return response
+
+                except Exception as e:
+                    logger.error("Tool calling failed: %s", e)
+                    raise
     
     async def create_embeddings(
         self,
         texts: List[str],
         model: str,
         provider: Optional[str] = None,
+        batch_size: int = 64,
+        concurrency: int = 4,
         **kwargs
     ) -> List[List[float]]:
         """创建文本嵌入
         
+        文本数超过 batch_size 时拆分为多个子批次并发请求，结果按原顺序拼接。
+        没有额外参数时，相同文本只请求一次：并发调用共享正在进行的请求，
+        启用 embedding_cache_size 时重复文本直接从缓存返回。
+        共享的向量是同一个列表对象，调用方不应原地修改
+        
         Args:
             texts: 文本列表
             model: 模型名称
             provider: 提供商名称
+            batch_size: 每个子批次的文本数
+            concurrency: 子批次的最大并发数
             **kwargs: 额外参数
             
         Returns:
@@ -320,36 +779,185 @@ class LLMRequestManager:
         if not texts:
             raise InvalidRequestError("Texts cannot be empty")
         
-        # 获取客户端
-        client = await self._get_client(provider, model)
+        with _request_context():
+            async with self.with_client(provider, model) as client:
+
+                # 调用客户端
+                try:
+                    logger.info("Creating embeddings for %d texts", len(texts))
+
+                    if kwargs:
+                        # 额外参数可能改变结果，不参与去重和缓存
+                        embeddings = await self._embed(
+                            client, texts, model, batch_size, concurrency, kwargs
+                        )
+                    else:
+                        embeddings = await self._embed_coalesced(
+                            client, texts, provider, model, batch_size, concurrency
+                        )
+
+                    logger.debug("Embeddings created")
+
+                    return embeddings
+
+                except Exception as e:
+                    logger.error("Embeddings creation failed: %s", e)
+                    raise
+    
+    async def _embed(
+        self,
+        client: BaseLLMClient,
+        texts: List[str],
+        model: str,
+        batch_size: int,
+        concurrency: int,
+        kwargs: Mapping[str, Any]
+    ) -> List[List[float]]:
+        """调用客户端创建嵌入，超过 batch_size 时分批并发请求"""
+        if len(texts) <= batch_size:
+            return await self._call_with_retry(
+                client.create_embeddings, texts, model=model, **kwargs
+            )
         
-        # 调用客户端
-        try:
-            logger.info(f"Creating embeddings for {len(texts)} texts")
-            embeddings = await client.create_embeddings(texts, model=model, **kwargs)
-            logger.debug("Embeddings created")
-            
-            return embeddings
-            
-        except Exception as e:
-            logger.error(f"Embeddings creation failed: {e}")
-            raise
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def _shard(shard: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self._call_with_retry(
+                    client.create_embeddings, shard, model=model, **kwargs
+                )
+        
+        # 任一子批次失败时取消其余请求
+        shards = await gather_or_cancel(
+            _shard(texts[i:i + batch_size])
+            for i in range(0, len(texts), batch_size)
+        )
+        return [vector for shard in shards for vector in shard]
     
-    async def close(self):
-        """关闭所有客户端"""
-        for client in self._clients.values():
+    async def _embed_coalesced(
+        self,
+        client: BaseLLMClient,
+        texts: List[str],
+        provider: Optional[str],
+        model: str,
+        batch_size: int,
+        concurrency: int
+    ) -> List[List[float]]:
+        """按文本去重创建嵌入
+        
+        缓存命中的文本直接返回，其他调用正在请求的文本等待其结果，
+        只有剩余的文本由本次调用请求；等待的请求被其发起方取消时，由本次调用重新请求
+        """
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        keys = [
+            (provider, model, hashlib.blake2b(text.encode(), digest_size=16).digest())
+            for text in texts
+        ]
+        
+        vectors: Dict[EmbeddingKey, List[float]] = {}
+        pending: Dict[EmbeddingKey, "asyncio.Future[List[float]]"] = {}
+        owned: Dict[EmbeddingKey, str] = {}
+        texts_by_key: Dict[EmbeddingKey, str] = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in pending:
+                continue
+            texts_by_key[key] = text
+            cached = self._embedding_cache.get(key)
+            if cached is not None and cached[1] > now:
+                self._embedding_cache.move_to_end(key)
+                vectors[key] = cached[0]
+                continue
+            future = self._inflight_embeddings.get(key)
+            if future is None:
+                future = loop.create_future()
+                self._inflight_embeddings[key] = future
+                owned[key] = text
+            pending[key] = future
+        
+        if owned:
             try:
-                await client.close()
-            except Exception as e:
-                logger.warning(f"Failed to close client: {e}")
+                computed = await self._embed(
+                    client, list(owned.values()), model, batch_size, concurrency, {}
+                )
+                if len(computed) != len(owned):
+                    raise InvalidResponseError(
+                        f"Expected {len(owned)} embeddings, got {len(computed)}"
+                    )
+            except BaseException as e:
+                for key in owned:
+                    future = pending[key]
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                        # 没有其他等待者时避免 "exception was never retrieved" 警告
+                        future.exception()
+                raise
+            else:
+                for key, vector in zip(owned, computed):
+                    pending[key].set_result(vector)
+                    self._cache_embedding(key, vector, now)
+            finally:
+                for key in owned:
+                    self._inflight_embeddings.pop(key, None)
+        
+        # shield：本调用被取消时不影响其他调用共享的 Future
+        orphaned: Dict[EmbeddingKey, str] = {}
+        for key, future in pending.items():
+            try:
+                vectors[key] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 只有发起请求的调用被取消时才接手；本调用自身被取消时照常传播
+                task = asyncio.current_task()
+                if not future.cancelled() or (task is not None and task.cancelling()):
+                    raise
+                orphaned[key] = texts_by_key[key]
+        
+        if orphaned:
+            recomputed = await self._embed_coalesced(
+                client, list(orphaned.values()), provider, model, batch_size, concurrency
+            )
+            vectors.update(zip(orphaned, recomputed))
         
+        return [vectors[key] for key in keys]
+    
+    def _cache_embedding(self, key: EmbeddingKey, vector: List[float], now: float) -> None:
+        """写入嵌入缓存，超出容量时淘汰最久未使用的条目"""
+        if self.embedding_cache_size <= 0:
+            return
+        self._embedding_cache[key] = (vector, now + self.embedding_cache_ttl)
+        self._embedding_cache.move_to_end(key)
+        while len(self._embedding_cache) > self.embedding_cache_size:
+            self._embedding_cache.popitem(last=False)
+    
+    async def close(self):
+        """关闭所有客户端
+        
+        各客户端并发关闭，总耗时取决于最慢的一个
+        """
+        clients = [client for client, _ in self._clients.values()]
+        clients.extend(self._retired.values())
         self._clients.clear()
+        self._retired.clear()
+        self._embedding_cache.clear()
+        await self._close_clients(clients)
+        
+        # 客户端关闭后再关闭共享会话，并留出时间完成 SSL 关闭
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._session_loop = None
+            await asyncio.sleep(0.1)
+        
         logger.info("All clients closed")
     
     @asynccontextmanager
     async def with_client(self, provider: str, model: Optional[str] = None):
         """客户端上下文管理器
         
+        上下文内客户端即使过期或被淘汰也不会关闭，退出后才关闭
+        
         Args:
             provider: 提供商名称
             model: 模型名称
@@ -358,10 +966,20 @@ class LLMRequestManager:
             BaseLLMClient: 客户端实例
         """
         client = await self._get_client(provider, model)
+        key = id(client)
+        self._leases[key] = self._leases.get(key, 0) + 1
         try:
             yield client
         finally:
-            pass  # 客户端由管理器统一管理生命周期
+            # 客户端由管理器统一管理生命周期，这里只在它已被移出缓存时关闭
+            remaining = self._leases[key] - 1
+            if remaining:
+                self._leases[key] = remaining
+            else:
+                del self._leases[key]
+                retired = self._retired.pop(key, None)
+                if retired is not None:
+                    await self._close_clients([retired])
 
 
 # 全局请求管理器实例
@@ -477,6 +1095,7 @@ async def create_embeddings(
     texts: List[str],
     model: str,
     provider: Optional[str] = None,
+    concurrency: int = 4,
     **kwargs
 ) -> List[List[float]]:
     """创建文本嵌入（便捷函数）
@@ -485,10 +1104,13 @@ async def create_embeddings(
         texts: 文本列表
         model: 模型名称
         provider: 提供商名称
+        concurrency: 子批次的最大并发数
         **kwargs: 其他参数
         
     Returns:
         List[List[float]]: 嵌入向量列表
     """
     manager = get_manager()
-    return await manager.create_embeddings(texts, model, provider, **kwargs)
+    return await manager.create_embeddings(
+        texts, model, provider, concurrency=concurrency, **kwargs
+    )
@@ -4,6 +4,10 @@ LLM Model Client 子模块
 提供各种 LLM 提供商的客户端实现
 """
 
+import importlib
+import importlib.util
+from typing import TYPE_CHECKING, Any
+
 from .base_client import (
     BaseLLMClient,
     ModelInfo,
@@ -12,27 +16,53 @@ from .base_client import (
     ModelCapability
 )
 
-# 条件导入客户端实现
-try:
-    from .openai_client import OpenAIClient
-    OPENAI_CLIENT_AVAILABLE = True
-except ImportError:
-    OPENAI_CLIENT_AVAILABLE = False
-    OpenAIClient = None
+# 客户端实现按需导入（PEP 562），只加载实际用到的提供商 SDK
+# 客户端名称 -> 实现模块
+_LAZY_CLIENTS = {
+    "OpenAIClient": ".openai_client",
+    "GeminiClient": ".aiohttp_gemini_clinet",
+    "BedrockClient": ".bedrock_client",
+}
 
-try:
-    from .aiohttp_gemini_clinet import GeminiClient
-    GEMINI_CLIENT_AVAILABLE = True
-except ImportError:
-    GEMINI_CLIENT_AVAILABLE = False
-    GeminiClient = None
+# 可用性标记 -> 客户端依赖的第三方包，通过 find_spec 判断，不导入包本身
+_AVAILABILITY_FLAGS = {
+    "OPENAI_CLIENT_AVAILABLE": "openai",
+    "GEMINI_CLIENT_AVAILABLE": "aiohttp",
+    "BEDROCK_CLIENT_AVAILABLE": "aioboto3",
+}
 
-try:
+if TYPE_CHECKING:
+    from .openai_client import OpenAIClient
+    from .aiohttp_gemini_clinet import GeminiClient
     from .bedrock_client import BedrockClient
-    BEDROCK_CLIENT_AVAILABLE = True
-except ImportError:
-    BEDROCK_CLIENT_AVAILABLE = False
-    BedrockClient = None
+
+
+def _missing_client(name: str, error: ImportError) -> type:
+    """为无法导入的客户端生成占位类，实例化时抛出原始的 ImportError"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        raise ImportError(f"{name} is unavailable: {error}") from error
+
+    return type(name, (), {"__init__": __init__, "__module__": __name__})
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_CLIENTS:
+        try:
+            module = importlib.import_module(_LAZY_CLIENTS[name], __name__)
+            value = getattr(module, name)
+        except ImportError as e:
+            value = _missing_client(name, e)
+    elif name in _AVAILABILITY_FLAGS:
+        value = importlib.util.find_spec(_AVAILABILITY_FLAGS[name]) is not None
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_LAZY_CLIENTS) | set(_AVAILABILITY_FLAGS))
 
 
 __all__ = [
@@ -42,14 +72,14 @@ __all__ = [
     "LLMResponse",
     "StreamChunk",
     "ModelCapability",
-    
+
     # Clients
     "OpenAIClient",
     "GeminiClient",
     "BedrockClient",
-    
+
     # Availability flags
     "OPENAI_CLIENT_AVAILABLE",
     "GEMINI_CLIENT_AVAILABLE",
     "BEDROCK_CLIENT_AVAILABLE",
-]
\ No newline at end of file
+]
@@ -4,10 +4,25 @@ Google Gemini 客户端实现
 使用 aiohttp 实现的 Gemini API 客户端
 """
 
-from typing import List, Dict, Any, Optional, AsyncIterator, TYPE_CHECKING, Union
-import json
+from typing import List, Dict, Any, Optional, AsyncIterator, ClassVar, Tuple, TYPE_CHECKING, Union
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import asyncio
 
-from .base_client import BaseLLMClient, ModelInfo, LLMResponse, StreamChunk, ModelCapability
+from .base_client import (
+    BaseLLMClient,
+    ModelInfo,
+    LLMResponse,
+    StreamChunk,
+    ModelCapability,
+    JSON_HEADERS,
+    backoff_delay,
+    dumps_json,
+    gather_or_cancel,
+    loads_json,
+    parse_retry_after
+)
+from ..rate_limiter import AsyncTokenBucket
 from ..exceptions import (
     LLMError,
     AuthenticationError,
@@ -15,7 +30,8 @@ from ..exceptions import (
     ModelNotFoundError,
     InvalidRequestError,
     APIConnectionError,
-    ContextLengthExceededError
+    ContextLengthExceededError,
+    InvalidResponseError
 )
 
 try:
@@ -28,14 +44,76 @@ except ImportError:
 # aiohttp 是可选的
 try:
     import aiohttp  # type: ignore[import-not-found]
+    from yarl import URL  # aiohttp 的依赖
     AIOHTTP_AVAILABLE = True
 except ImportError:
     aiohttp = None  # type: ignore[assignment]
+    URL = None  # type: ignore[assignment,misc]
     AIOHTTP_AVAILABLE = False
     logger.warning("aiohttp package not available. Install with: pip install aiohttp")
 
 if TYPE_CHECKING:
-    from aiohttp import ClientSession  # type: ignore[import-not-found]
+    from aiohttp import ClientResponse, ClientSession  # type: ignore[import-not-found]
+    from ..llm_request import LLMRequest
+
+
+# OpenAI 风格角色 -> Gemini 角色，未列出的角色视为 model
+_ROLE_MAP = {
+    "user": "user",
+    "function": "user",
+    "tool": "user",
+    "assistant": "model",
+    "model": "model",
+}
+
+# 每个客户端缓存的消息前缀转换结果数
+_PREFIX_CACHE_SIZE = 32
+
+# 每个客户端缓存的 generationConfig 数
+_GENERATION_CONFIG_CACHE_SIZE = 64
+
+# 前缀缓存条目：(消息签名, 已转换的 contents, 系统指令)
+_PrefixEntry = Tuple[List[Tuple[Any, str]], List[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+async def _iter_sse_data(stream: Any) -> AsyncIterator[bytes]:
+    """从 Server-Sent Events 流中逐个取出事件的 data 字段
+    
+    按字节块读取并自行切分行，不受 readline 的行长度限制；
+    同一事件的多行 data 按规范以换行拼接，其他字段和注释忽略
+    
+    Args:
+        stream: aiohttp 的 StreamReader
+        
+    Yields:
+        bytes: 每个事件的 data 内容
+    """
+    buffer = bytearray()
+    data_lines: List[bytes] = []
+    
+    async for block in stream.iter_any():
+        buffer += block
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line = bytes(buffer[start:end]).rstrip(b"\r")
+            start = end + 1
+            if line:
+                if line.startswith(b"data:"):
+                    data_lines.append(line[5:].removeprefix(b" "))
+            elif data_lines:
+                # 空行表示事件结束
+                yield b"\n".join(data_lines)
+                data_lines = []
+        del buffer[:start]
+    
+    # 流结束时没有以空行收尾的最后一个事件
+    line = bytes(buffer).rstrip(b"\r")
+    if line.startswith(b"data:"):
+        data_lines.append(line[5:].removeprefix(b" "))
+    if data_lines:
+        yield b"\n".join(data_lines)
 
 
 class GeminiClient(BaseLLMClient):
@@ -46,12 +124,20 @@ class GeminiClient(BaseLLMClient):
     
     DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
     
+    # 所有实例共享的会话及其所属事件循环，连接池跨客户端复用
+    _shared_session: ClassVar[Optional["ClientSession"]] = None
+    _shared_loop: ClassVar[Optional[asyncio.AbstractEventLoop]] = None
+    
     def __init__(
         self,
         api_key: str,
         base_url: Optional[str] = None,
         timeout: float = 60.0,
         max_retries: int = 3,
+        retry_base_delay: float = 1.0,
+        connector_limit: int = 512,
+        limit_per_host: int = 64,
+        rpm: Optional[float] = None,
         **kwargs
     ):
         """初始化 Gemini 客户端
@@ -60,7 +146,11 @@ class GeminiClient(BaseLLMClient):
             api_key: API 密钥
             base_url: API 基础 URL
             timeout: 超时时间（秒）
-            max_retries: 最大重试次数
+            max_retries: 429 和 5xx 响应的最大重试次数
+            retry_base_delay: 指数退避的基础延迟（秒）
+            connector_limit: 共享连接池的总连接数上限
+            limit_per_host: 共享连接池对单个主机的连接数上限
+            rpm: 每分钟最多发出的请求数，为 None 时不限流
             **kwargs: 其他参数
         """
         if not AIOHTTP_AVAILABLE or aiohttp is None:
@@ -76,9 +166,24 @@ class GeminiClient(BaseLLMClient):
         assert aiohttp is not None
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.connector_limit = connector_limit
+        self.limit_per_host = limit_per_host
+        # 客户端限流，在发出请求前等待令牌
+        self._limiter = AsyncTokenBucket.per_minute(rpm) if rpm else None
+        
+        # API 密钥放在请求头中，URL 不含密钥，可以缓存且不会出现在日志里
+        self._auth_headers = {"x-goog-api-key": api_key}
+        self._json_headers = {**JSON_HEADERS, **self._auth_headers}
+        # (模型, 操作) -> 预先构建的 URL
+        self._url_cache: Dict[Tuple[str, Optional[str]], "URL"] = {}
         
         self.session: Optional["ClientSession"] = None
-        logger.info(f"Gemini client initialized with base_url={self.base_url}")
+        # 前缀哈希 -> 前缀缓存条目，按最近使用排序
+        self._prefix_cache: "OrderedDict[int, _PrefixEntry]" = OrderedDict()
+        # 生成参数 -> generationConfig，按最近使用排序
+        self._generation_config_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        logger.info("Gemini client initialized with base_url=%s", self.base_url)
     
     async def initialize(self) -> bool:
         """初始化客户端
@@ -88,39 +193,237 @@ class GeminiClient(BaseLLMClient):
         """
         assert aiohttp is not None
         try:
-            # 创建会话
-            self.session = aiohttp.ClientSession(timeout=self.timeout)
+            # 使用类级共享会话（已绑定外部会话时直接复用）
+            if self.session is None:
+                self.session = type(self).get_shared_session(
+                    self.connector_limit, self.limit_per_host
+                )
             assert self.session is not None
             
             # 测试连接 - 列出模型
-            url = f"{self.base_url}/models?key={self.api_key}"
-            async with self.session.get(url) as response:
-                if response.status == 401:
-                    raise AuthenticationError("Invalid API key")
-                
-                response.raise_for_status()
-                data = await response.json()
-                logger.debug(f"Gemini client initialized, {len(data.get('models', []))} models available")
+            data = await self._get_json(URL(f"{self.base_url}/models"))
+            logger.debug("Gemini client initialized, %d models available", len(data.get("models", [])))
             
             return True
             
-        except aiohttp.ClientError as e:
-            logger.error(f"Initialization failed: {e}")
+        except AuthenticationError:
+            raise
+        except (aiohttp.ClientError, LLMError) as e:
+            logger.error("Initialization failed: %s", e)
             return False
     
+    def serialize(self, request: "LLMRequest") -> Dict[str, Any]:
+        """只构建 Gemini 会用到的参数，跳过 OpenAI 专有字段"""
+        return self._core_params(request)
+    
+    @classmethod
+    def get_shared_session(
+        cls,
+        connector_limit: int = 512,
+        limit_per_host: int = 64
+    ) -> "ClientSession":
+        """获取类级共享的 aiohttp 会话，首次调用时创建
+        
+        会话绑定创建时的事件循环，循环变化或会话已关闭时重新创建。
+        连接池参数只在创建时生效
+        
+        Args:
+            connector_limit: 总连接数上限
+            limit_per_host: 单个主机的连接数上限
+            
+        Returns:
+            ClientSession: 共享会话
+        """
+        assert aiohttp is not None
+        loop = asyncio.get_running_loop()
+        session = cls._shared_session
+        if session is None or session.closed or cls._shared_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=connector_limit,
+                limit_per_host=limit_per_host,
+                ttl_dns_cache=300,
+                keepalive_timeout=75
+            )
+            # 超时按请求传入，各实例可以使用不同的超时设置
+            session = aiohttp.ClientSession(connector=connector)
+            GeminiClient._shared_session = session
+            GeminiClient._shared_loop = loop
+        return session
+    
+    @classmethod
+    async def aclose_shared(cls) -> None:
+        """关闭类级共享会话，通常在进程退出前调用"""
+        session = GeminiClient._shared_session
+        GeminiClient._shared_session = None
+        GeminiClient._shared_loop = None
+        if session is not None and not session.closed:
+            await session.close()
+    
+    def _connection_limit(self, session: "ClientSession") -> int:
+        """会话对单个主机的连接数上限
+        
+        绑定外部会话（例如 LLMRequestManager 的共享会话）时以其连接器为准，
+        而不是本实例为类级共享会话设置的 limit_per_host
+        
+        Args:
+            session: 实际使用的会话
+            
+        Returns:
+            int: 连接数上限；连接器不限制连接数时为 limit_per_host
+        """
+        connector = session.connector
+        if connector is None:
+            return self.limit_per_host
+        return connector.limit_per_host or connector.limit or self.limit_per_host
+    
+    def bind_http_session(self, session: "ClientSession") -> bool:
+        """绑定外部的 aiohttp 会话，复用其连接池
+        
+        Args:
+            session: 外部 aiohttp 会话，由调用方负责关闭
+            
+        Returns:
+            bool: 始终为 True
+        """
+        self.session = session
+        return True
+    
     async def close(self):
-        """关闭客户端"""
-        if self.session:
-            await self.session.close()
-            self.session = None
+        """关闭客户端
+        
+        会话是共享的，这里只释放引用；共享会话由 aclose_shared 关闭
+        """
+        self.session = None
         logger.info("Gemini client closed")
     
-    def _handle_error(self, status: int, message: str) -> LLMError:
+    def _url(self, model: str, action: Optional[str] = None) -> "URL":
+        """获取模型接口的 URL，每个 (模型, 操作) 只构建一次
+        
+        Args:
+            model: 模型名称
+            action: 接口操作，如 generateContent，可带查询参数；为 None 时返回模型信息接口
+            
+        Returns:
+            URL: 接口地址
+        """
+        key = (model, action)
+        url = self._url_cache.get(key)
+        if url is None:
+            path = f"{self.base_url}/models/{model}"
+            url = URL(f"{path}:{action}" if action else path)
+            self._url_cache[key] = url
+        return url
+    
+    @asynccontextmanager
+    async def _send(self, method: str, url: "URL", **kwargs: Any) -> AsyncIterator["ClientResponse"]:
+        """发送请求，429 和 5xx 响应按指数退避重试
+        
+        设置了 rpm 时每次发送前先取令牌，收到 429 时降低限流速率
+        
+        只有状态码为 200 的响应会交给调用方；其他状态码转换为对应的 LLMError
+        
+        Args:
+            method: HTTP 方法
+            url: 请求地址
+            **kwargs: 传给 session.request 的其他参数
+            
+        Yields:
+            ClientResponse: 成功的响应
+        """
+        # 只读取一次会话：重试等待期间并发的 close() 会把 self.session 置为 None
+        session = self.session
+        assert session is not None
+        attempt = 0
+        while True:
+            if self._limiter is not None:
+                await self._limiter.acquire()
+            response = await session.request(method, url, timeout=self.timeout, **kwargs)
+            try:
+                if response.status == 200:
+                    yield response
+                    return
+                
+                retry_after = response.headers.get("Retry-After")
+                error = self._handle_error(
+                    response.status,
+                    self._error_message(await response.read()),
+                    parse_retry_after(retry_after)
+                )
+                retryable = response.status == 429 or response.status >= 500
+                if response.status == 429 and self._limiter is not None:
+                    self._limiter.penalize()
+            finally:
+                response.release()
+            
+            if not retryable or attempt >= self.max_retries:
+                raise error
+            
+            delay = self._retry_delay(attempt, retry_after)
+            if delay is None:
+                # 服务端要求的等待过长，交给调用方按 retry_after 处理
+                raise error
+            attempt += 1
+            logger.warning(
+                "Gemini returned %d, retrying in %.2fs (%d/%d)",
+                response.status, delay, attempt, self.max_retries
+            )
+            await asyncio.sleep(delay)
+    
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> Optional[float]:
+        """计算重试前的等待时间，优先使用服务端给出的 Retry-After
+        
+        Args:
+            attempt: 已重试的次数
+            retry_after: Retry-After 响应头
+            
+        Returns:
+            Optional[float]: 等待秒数，Retry-After 超过退避上限时为 None
+        """
+        return backoff_delay(attempt, self.retry_base_delay, retry_after)
+    
+    @staticmethod
+    def _error_message(raw: bytes) -> str:
+        """从错误响应体中提取错误消息
+        
+        响应体只解析一次；为空或不是 JSON（例如网关返回的 HTML）时使用原始文本
+        
+        Args:
+            raw: 响应体字节
+            
+        Returns:
+            str: 错误消息
+        """
+        if not raw:
+            return "Unknown error"
+        try:
+            payload = loads_json(raw)
+        except ValueError:
+            return raw[:200].decode("utf-8", "replace")
+        if isinstance(payload, dict):
+            error = payload.get("error")
+            if isinstance(error, dict) and error.get("message"):
+                return error["message"]
+        return "Unknown error"
+    
+    async def _post_json(self, url: "URL", body: Dict[str, Any]) -> Dict[str, Any]:
+        """POST JSON 请求体并解析响应，失败时按需重试"""
+        async with self._send("POST", url, data=dumps_json(body), headers=self._json_headers) as response:
+            raw = await response.read()
+        return loads_json(raw) if raw else {}
+    
+    async def _get_json(self, url: "URL") -> Dict[str, Any]:
+        """GET 请求并解析响应，失败时按需重试"""
+        async with self._send("GET", url, headers=self._auth_headers) as response:
+            raw = await response.read()
+        return loads_json(raw) if raw else {}
+    
+    def _handle_error(self, status: int, message: str, retry_after: Optional[int] = None) -> LLMError:
         """处理错误
         
         Args:
             status: HTTP 状态码
             message: 错误消息
+            retry_after: 服务端建议的重试等待秒数，附加到 RateLimitError
             
         Returns:
             LLMError: 转换后的错误
@@ -128,7 +431,7 @@ class GeminiClient(BaseLLMClient):
         if status == 401:
             return AuthenticationError(f"Authentication failed: {message}")
         elif status == 429:
-            return RateLimitError(f"Rate limit exceeded: {message}")
+            return RateLimitError(f"Rate limit exceeded: {message}", retry_after=retry_after)
         elif status == 404:
             return ModelNotFoundError(f"Model not found: {message}")
         elif status == 400:
@@ -144,15 +447,72 @@ class GeminiClient(BaseLLMClient):
     def _convert_messages_to_gemini_format(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
         """转换消息格式为 Gemini 格式
         
+        纯文本对话按消息前缀缓存转换结果：与之前某次调用前缀相同时，
+        只转换新增的消息。含多模态内容的请求不走缓存
+        
         Args:
             messages: OpenAI 风格的消息列表
             
         Returns:
             Dict: Gemini 格式的请求体
         """
+        # 逐条累积前缀哈希，同时确认是否全部为纯文本
+        signature: List[Tuple[Any, str]] = []
+        hashes: List[int] = []
+        prefix_hash = 0
+        for msg in messages:
+            content = msg.get("content", "")
+            if not isinstance(content, str):
+                contents: List[Dict[str, Any]] = []
+                system_instruction = self._append_gemini_contents(messages, contents, None)
+                return self._build_gemini_body(contents, system_instruction)
+            item = (msg.get("role"), content)
+            signature.append(item)
+            prefix_hash = hash((prefix_hash, item))
+            hashes.append(prefix_hash)
+        
+        # 查找最长的已缓存前缀，比较签名以排除哈希碰撞
+        cache = self._prefix_cache
         contents = []
         system_instruction = None
+        start = 0
+        for i in range(len(hashes) - 1, -1, -1):
+            entry = cache.get(hashes[i])
+            if entry is not None and entry[0] == signature[:i + 1]:
+                cache.move_to_end(hashes[i])
+                contents = list(entry[1])
+                system_instruction = entry[2]
+                start = i + 1
+                break
+        
+        if start < len(messages):
+            system_instruction = self._append_gemini_contents(
+                messages[start:], contents, system_instruction
+            )
+            if hashes:
+                cache[hashes[-1]] = (signature, list(contents), system_instruction)
+                if len(cache) > _PREFIX_CACHE_SIZE:
+                    cache.popitem(last=False)
+        
+        return self._build_gemini_body(contents, system_instruction)
+    
+    def _append_gemini_contents(
+        self,
+        messages: List[Dict[str, Any]],
+        contents: List[Dict[str, Any]],
+        system_instruction: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """把消息转换后追加到 contents
         
+        Args:
+            messages: OpenAI 风格的消息列表
+            contents: 追加目标
+            system_instruction: 之前的系统指令
+            
+        Returns:
+            Optional[Dict]: 处理完这些消息后的系统指令
+        """
+        append = contents.append
         for msg in messages:
             role = msg.get("role")
             content = msg.get("content", "")
@@ -163,38 +523,134 @@ class GeminiClient(BaseLLMClient):
                 continue
             
             # 转换角色
-            gemini_role = "user" if role in ["user", "function"] else "model"
+            gemini_role = _ROLE_MAP.get(role, "model")
+            
+            # 纯文本（最常见的情况）
+            if type(content) is not list:
+                append({"role": gemini_role, "parts": [{"text": content}]})
+                continue
             
             # 处理多模态内容
-            if isinstance(content, list):
-                parts = []
-                for item in content:
-                    if item.get("type") == "text":
-                        parts.append({"text": item.get("text", "")})
-                    elif item.get("type") == "image_url":
-                        # Gemini 支持内联数据
-                        image_url = item.get("image_url", {}).get("url", "")
-                        if image_url.startswith("data:"):
-                            # 提取 base64 数据
-                            parts.append({"inline_data": self._parse_data_url(image_url)})
-                        else:
-                            # URL 图片
-                            parts.append({"file_data": {"file_uri": image_url}})
-                
-                contents.append({"role": gemini_role, "parts": parts})
-            else:
-                # 纯文本
-                contents.append({
-                    "role": gemini_role,
-                    "parts": [{"text": content}]
-                })
+            parts = []
+            for item in content:
+                if item.get("type") == "text":
+                    parts.append({"text": item.get("text", "")})
+                elif item.get("type") == "image_url":
+                    # Gemini 支持内联数据
+                    image_url = item.get("image_url", {}).get("url", "")
+                    if image_url.startswith("data:"):
+                        # 提取 base64 数据
+                        parts.append({"inline_data": self._parse_data_url(image_url)})
+                    else:
+                        # URL 图片
+                        parts.append({"file_data": {"file_uri": image_url}})
+            
+            append({"role": gemini_role, "parts": parts})
         
+        return system_instruction
+    
+    @staticmethod
+    def _build_gemini_body(
+        contents: List[Dict[str, Any]],
+        system_instruction: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """组装请求体的消息部分"""
         result: Dict[str, Any] = {"contents": contents}
         if system_instruction:
             result["system_instruction"] = system_instruction
         
         return result
     
+    def _generation_config(
+        self,
+        temperature: float,
+        top_p: float,
+        max_tokens: Optional[int],
+        stop: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """获取生成配置，相同参数复用同一个字典
+        
+        返回的字典只用于序列化请求体，调用方不应修改
+        
+        Args:
+            temperature: 温度参数
+            top_p: Top-p 采样
+            max_tokens: 最大 token 数
+            stop: 停止序列
+            
+        Returns:
+            Dict: Gemini 的 generationConfig
+        """
+        key = (temperature, top_p, max_tokens, tuple(stop) if stop else None)
+        cache = self._generation_config_cache
+        config = cache.get(key)
+        if config is not None:
+            cache.move_to_end(key)
+            return config
+        
+        config = {
+            "temperature": temperature,
+            "topP": top_p
+        }
+        
+        if max_tokens:
+            config["maxOutputTokens"] = max_tokens
+        
+        if stop:
+            config["stopSequences"] = list(stop)
+        
+        cache[key] = config
+        if len(cache) > _GENERATION_CONFIG_CACHE_SIZE:
+            cache.popitem(last=False)
+        return config
+    
+    @staticmethod
+    def _extract_text(parts: List[Dict[str, Any]]) -> str:
+        """提取响应片段中的文本
+        
+        流式响应的每个块通常只有一个文本片段，此时直接返回该字符串，不再拼接
+        
+        Args:
+            parts: 候选结果的 content.parts
+            
+        Returns:
+            str: 文本内容
+        """
+        if len(parts) == 1:
+            return parts[0].get("text", "")
+        return "".join([part.get("text", "") for part in parts])
+    
+    @staticmethod
+    def _extract_text_and_tools(
+        parts: List[Dict[str, Any]]
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """单次遍历响应片段，提取文本和函数调用
+        
+        Args:
+            parts: 候选结果的 content.parts
+            
+        Returns:
+            Tuple[str, List[Dict]]: (拼接后的文本, OpenAI 风格的工具调用列表)
+        """
+        texts: List[str] = []
+        tool_calls: List[Dict[str, Any]] = []
+        
+        for part in parts:
+            if "text" in part:
+                texts.append(part["text"])
+            elif "functionCall" in part:
+                func_call = part["functionCall"]
+                tool_calls.append({
+                    "id": f"call_{len(tool_calls)}",
+                    "type": "function",
+                    "function": {
+                        "name": func_call.get("name"),
+                        "arguments": dumps_json(func_call.get("args", {})).decode()
+                    }
+                })
+        
+        return "".join(texts), tool_calls
+    
     def _parse_data_url(self, data_url: str) -> Dict[str, str]:
         """解析 data URL
         
@@ -207,13 +663,16 @@ class GeminiClient(BaseLLMClient):
         if not data_url.startswith("data:"):
             return {}
         
-        # 分割 data URL
-        header, data = data_url.split(",", 1)
-        mime_type = header.split(":")[1].split(";")[0]
+        # 只在头部范围内查找分隔符，不扫描可能很长的 base64 数据
+        comma = data_url.find(",", 5)
+        if comma < 0:
+            return {}
+        semicolon = data_url.find(";", 5, comma)
+        mime_type = data_url[5:semicolon if semicolon >= 0 else comma]
         
         return {
             "mime_type": mime_type,
-            "data": data
+            "data": data_url[comma + 1:]
         }
     
     async def generate(
@@ -252,35 +711,20 @@ class GeminiClient(BaseLLMClient):
             request_body = self._convert_messages_to_gemini_format(messages)
             
             # 添加生成配置
-            generation_config: Dict[str, Any] = {
-                "temperature": temperature,
-                "topP": top_p
-            }
-            
-            if max_tokens:
-                generation_config["maxOutputTokens"] = max_tokens
-            
-            if stop:
-                generation_config["stopSequences"] = stop
-            
-            request_body["generationConfig"] = generation_config
+            request_body["generationConfig"] = self._generation_config(
+                temperature, top_p, max_tokens, stop
+            )
             
             # 添加其他参数
             if "safety_settings" in kwargs:
                 request_body["safetySettings"] = kwargs["safety_settings"]
             
-            logger.debug(f"Generating with model {model}")
+            logger.debug("Generating with model %s", model)
             
             # 调用 API
-            url = f"{self.base_url}/models/{model}:generateContent?key={self.api_key}"
+            url = self._url(model, "generateContent")
             
-            async with self.session.post(url, json=request_body) as response:
-                if response.status != 200:
-                    error_data = await response.json()
-                    error_msg = error_data.get("error", {}).get("message", "Unknown error")
-                    raise self._handle_error(response.status, error_msg)
-                
-                data = await response.json()
+            data = await self._post_json(url, request_body)
             
             # 解析响应
             candidates = data.get("candidates", [])
@@ -291,7 +735,7 @@ class GeminiClient(BaseLLMClient):
             content_parts = candidate.get("content", {}).get("parts", [])
             
             # 提取文本内容
-            content = "".join(part.get("text", "") for part in content_parts)
+            content, _ = self._extract_text_and_tools(content_parts)
             
             # 提取使用情况
             usage_metadata = data.get("usageMetadata", {})
@@ -309,16 +753,16 @@ class GeminiClient(BaseLLMClient):
                 raw_response=data
             )
             
-            logger.debug(f"Generation completed: {result.usage}")
+            logger.debug("Generation completed: %s", result.usage)
             return result
             
         except aiohttp.ClientError as e:
-            logger.error(f"Generation failed: {e}")
+            logger.error("Generation failed: %s", e)
             raise APIConnectionError(f"Connection failed: {e}") from e
         except Exception as e:
             if isinstance(e, LLMError):
                 raise
-            logger.error(f"Generation failed: {e}")
+            logger.error("Generation failed: %s", e)
             raise LLMError(f"Gemini error: {e}") from e
     
     async def stream_generate(
@@ -357,72 +801,53 @@ class GeminiClient(BaseLLMClient):
             request_body = self._convert_messages_to_gemini_format(messages)
             
             # 添加生成配置
-            generation_config: Dict[str, Any] = {
-                "temperature": temperature,
-                "topP": top_p
-            }
-            
-            if max_tokens:
-                generation_config["maxOutputTokens"] = max_tokens
-            
-            if stop:
-                generation_config["stopSequences"] = stop
-            
-            request_body["generationConfig"] = generation_config
+            request_body["generationConfig"] = self._generation_config(
+                temperature, top_p, max_tokens, stop
+            )
             
             # 添加其他参数
             if "safety_settings" in kwargs:
                 request_body["safetySettings"] = kwargs["safety_settings"]
             
-            logger.debug(f"Streaming generation with model {model}")
+            logger.debug("Streaming generation with model %s", model)
             
-            # 流式调用 API
-            url = f"{self.base_url}/models/{model}:streamGenerateContent?key={self.api_key}"
+            # 流式调用 API，alt=sse 让每个事件恰好是一个完整的 JSON 对象
+            url = self._url(model, "streamGenerateContent?alt=sse")
             
-            async with self.session.post(url, json=request_body) as response:
-                if response.status != 200:
-                    error_data = await response.json()
-                    error_msg = error_data.get("error", {}).get("message", "Unknown error")
-                    raise self._handle_error(response.status, error_msg)
-                
-                # 逐行读取流式响应
-                async for line in response.content:
-                    if not line:
-                        continue
+            # 只在收到响应前重试，开始输出后不再重试
+            async with self._send("POST", url, data=dumps_json(request_body), headers=self._json_headers) as response:
+                async for payload in _iter_sse_data(response.content):
+                    if payload == b"[DONE]":
+                        break
                     
-                    # 解析 JSON
-                    try:
-                        chunk_data = json.loads(line)
-                        candidates = chunk_data.get("candidates", [])
-                        
-                        if not candidates:
-                            continue
-                        
-                        candidate = candidates[0]
-                        content_parts = candidate.get("content", {}).get("parts", [])
-                        
-                        # 提取文本内容
-                        content = "".join(part.get("text", "") for part in content_parts)
-                        
-                        if content:
-                            yield StreamChunk(
-                                content=content,
-                                model=model,
-                                finish_reason=candidate.get("finishReason")
-                            )
+                    chunk_data = loads_json(payload)
+                    candidates = chunk_data.get("candidates", [])
                     
-                    except json.JSONDecodeError:
+                    if not candidates:
                         continue
+                    
+                    candidate = candidates[0]
+                    content_parts = candidate.get("content", {}).get("parts", [])
+                    
+                    # 提取文本内容
+                    content = self._extract_text(content_parts)
+                    
+                    if content:
+                        yield StreamChunk(
+                            content=content,
+                            model=model,
+                            finish_reason=candidate.get("finishReason")
+                        )
             
             logger.debug("Streaming generation completed")
             
         except aiohttp.ClientError as e:
-            logger.error(f"Streaming generation failed: {e}")
+            logger.error("Streaming generation failed: %s", e)
             raise APIConnectionError(f"Connection failed: {e}") from e
         except Exception as e:
             if isinstance(e, LLMError):
                 raise
-            logger.error(f"Streaming generation failed: {e}")
+            logger.error("Streaming generation failed: %s", e)
             raise LLMError(f"Gemini error: {e}") from e
     
     async def generate_with_tools(
@@ -471,18 +896,12 @@ class GeminiClient(BaseLLMClient):
             
             request_body["tools"] = gemini_tools
             
-            logger.debug(f"Generating with tools, model {model}")
+            logger.debug("Generating with tools, model %s", model)
             
             # 调用 API
-            url = f"{self.base_url}/models/{model}:generateContent?key={self.api_key}"
+            url = self._url(model, "generateContent")
             
-            async with self.session.post(url, json=request_body) as response:
-                if response.status != 200:
-                    error_data = await response.json()
-                    error_msg = error_data.get("error", {}).get("message", "Unknown error")
-                    raise self._handle_error(response.status, error_msg)
-                
-                data = await response.json()
+            data = await self._post_json(url, request_body)
             
             # 解析响应
             candidates = data.get("candidates", [])
@@ -493,22 +912,7 @@ class GeminiClient(BaseLLMClient):
             content_parts = candidate.get("content", {}).get("parts", [])
             
             # 提取文本和函数调用
-            content = ""
-            tool_calls = []
-            
-            for part in content_parts:
-                if "text" in part:
-                    content += part["text"]
-                elif "functionCall" in part:
-                    func_call = part["functionCall"]
-                    tool_calls.append({
-                        "id": f"call_{len(tool_calls)}",
-                        "type": "function",
-                        "function": {
-                            "name": func_call.get("name"),
-                            "arguments": json.dumps(func_call.get("args", {}))
-                        }
-                    })
+            content, tool_calls = self._extract_text_and_tools(content_parts)
             
             # 提取使用情况
             usage_metadata = data.get("usageMetadata", {})
@@ -527,29 +931,33 @@ class GeminiClient(BaseLLMClient):
                 raw_response=data
             )
             
-            logger.debug(f"Tool calling completed: {len(tool_calls)} calls")
+            logger.debug("Tool calling completed: %d calls", len(tool_calls))
             return result
             
         except aiohttp.ClientError as e:
-            logger.error(f"Tool calling failed: {e}")
+            logger.error("Tool calling failed: %s", e)
             raise APIConnectionError(f"Connection failed: {e}") from e
         except Exception as e:
             if isinstance(e, LLMError):
                 raise
-            logger.error(f"Tool calling failed: {e}")
+            logger.error("Tool calling failed: %s", e)
             raise LLMError(f"Gemini error: {e}") from e
     
     async def create_embeddings(
         self,
         texts: List[str],
         model: str = "embedding-001",
+        batch_size: int = 100,
         **kwargs
     ) -> List[List[float]]:
         """创建文本嵌入
         
+        通过 batchEmbedContents 每次请求处理 batch_size 个文本，各批次并发请求
+        
         Args:
             texts: 文本列表
             model: 模型名称
+            batch_size: 每个请求包含的文本数
             **kwargs: 其他参数
             
         Returns:
@@ -563,40 +971,48 @@ class GeminiClient(BaseLLMClient):
         assert self.session is not None
         
         try:
-            logger.debug(f"Creating embeddings for {len(texts)} texts")
+            logger.debug("Creating embeddings for %d texts", len(texts))
             
-            embeddings = []
+            url = self._url(model, "batchEmbedContents")
+            model_path = f"models/{model}"
+            # 并发数与实际使用的会话的单主机连接上限一致，避免请求在连接池中排队
+            semaphore = asyncio.Semaphore(self._connection_limit(self.session))
             
-            # Gemini 嵌入 API 每次处理一个文本
-            for text in texts:
+            async def _embed_batch(batch: List[str]) -> List[List[float]]:
                 request_body = {
-                    "content": {
-                        "parts": [{"text": text}]
-                    }
+                    "requests": [
+                        {"model": model_path, "content": {"parts": [{"text": text}]}}
+                        for text in batch
+                    ]
                 }
                 
-                url = f"{self.base_url}/models/{model}:embedContent?key={self.api_key}"
+                async with semaphore:
+                    data = await self._post_json(url, request_body)
                 
-                async with self.session.post(url, json=request_body) as response:
-                    if response.status != 200:
-                        error_data = await response.json()
-                        error_msg = error_data.get("error", {}).get("message", "Unknown error")
-                        raise self._handle_error(response.status, error_msg)
-                    
-                    data = await response.json()
-                    embedding = data.get("embedding", {}).get("values", [])
-                    embeddings.append(embedding)
+                vectors = [item.get("values", []) for item in data.get("embeddings", [])]
+                if len(vectors) != len(batch):
+                    raise InvalidResponseError(
+                        f"Expected {len(batch)} embeddings, got {len(vectors)}"
+                    )
+                return vectors
+            
+            # 按传入顺序返回各批次结果，任一批次失败时取消其余请求
+            batches = await gather_or_cancel(
+                _embed_batch(texts[i:i + batch_size])
+                for i in range(0, len(texts), batch_size)
+            )
+            embeddings = [vector for batch in batches for vector in batch]
             
-            logger.debug(f"Embeddings created: {len(embeddings)} vectors")
+            logger.debug("Embeddings created: %d vectors", len(embeddings))
             return embeddings
             
         except aiohttp.ClientError as e:
-            logger.error(f"Embeddings creation failed: {e}")
+            logger.error("Embeddings creation failed: %s", e)
             raise APIConnectionError(f"Connection failed: {e}") from e
         except Exception as e:
             if isinstance(e, LLMError):
                 raise
-            logger.error(f"Embeddings creation failed: {e}")
+            logger.error("Embeddings creation failed: %s", e)
             raise LLMError(f"Gemini error: {e}") from e
     
     async def get_model_info(self, model: str) -> ModelInfo:
@@ -616,14 +1032,13 @@ class GeminiClient(BaseLLMClient):
         assert self.session is not None
         
         try:
-            url = f"{self.base_url}/models/{model}?key={self.api_key}"
+            url = self._url(model)
             
-            async with self.session.get(url) as response:
-                if response.status != 200:
-                    # 返回默认信息
-                    return self._get_default_model_info(model)
-                
-                data = await response.json()
+            try:
+                data = await self._get_json(url)
+            except LLMError:
+                # 返回默认信息
+                return self._get_default_model_info(model)
             
             # 解析能力
             capabilities = {ModelCapability.CHAT}
@@ -650,9 +1065,13 @@ class GeminiClient(BaseLLMClient):
             )
             
         except Exception as e:
-            logger.error(f"Failed to get model info: {e}")
+            logger.error("Failed to get model info: %s", e)
             return self._get_default_model_info(model)
     
+    def _get_default_model(self) -> str:
+        """获取默认模型名称"""
+        return "gemini-pro"
+    
     def _get_default_model_info(self, model: str) -> ModelInfo:
         """获取默认模型信息"""
         capabilities = {ModelCapability.CHAT}
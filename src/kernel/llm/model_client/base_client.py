@@ -5,9 +5,219 @@ LLM Client 抽象基类
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List, AsyncIterator, Union, Set
+from typing import Dict, Any, Optional, List, AsyncIterable, AsyncIterator, Awaitable, Iterable, Mapping, Union, Set, Tuple, TypeVar, TYPE_CHECKING
 from dataclasses import dataclass
 from enum import Enum
+import asyncio
+import json
+import math
+import random
+
+if TYPE_CHECKING:
+    from ..llm_request import LLMRequest
+
+# orjson 是可选的，可用时用于更快地编码请求体
+try:
+    import orjson  # type: ignore[import-not-found]
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+    ORJSON_AVAILABLE = False
+
+T = TypeVar("T")
+
+# 直接发送 JSON 字节串时使用的请求头
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def dumps_json(obj: Any, sort_keys: bool = False) -> bytes:
+    """把请求体编码为 JSON 字节串，orjson 可用时优先使用
+    
+    Args:
+        obj: 可 JSON 序列化的对象
+        sort_keys: 是否按键排序，用于生成稳定的缓存键
+        
+    Returns:
+        bytes: UTF-8 编码的 JSON
+        
+    Raises:
+        TypeError: 对象包含无法序列化的值
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys).encode("utf-8")
+
+
+def loads_json(data: Union[bytes, str]) -> Any:
+    """解析 JSON 响应体，orjson 可用时优先使用
+    
+    Args:
+        data: JSON 字节串或字符串
+        
+    Returns:
+        Any: 解析结果
+        
+    Raises:
+        json.JSONDecodeError: 内容不是合法 JSON（orjson 的异常是其子类）
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def backoff_delay(
+    attempt: int,
+    base_delay: float,
+    retry_after: Optional[str] = None,
+    max_delay: float = 30.0
+) -> Optional[float]:
+    """计算重试前的等待时间，优先使用服务端给出的 Retry-After
+    
+    否则按指数退避（上限 max_delay）并加入最多 50% 的随机抖动，避免并发请求同时重试
+    
+    Args:
+        attempt: 已重试的次数
+        base_delay: 指数退避的基础延迟（秒）
+        retry_after: Retry-After 响应头
+        max_delay: 等待上限（秒），Retry-After 超过它时不再重试
+        
+    Returns:
+        Optional[float]: 等待秒数，服务端要求的等待超过上限时为 None，调用方应直接抛出错误
+    """
+    if retry_after:
+        try:
+            wait = max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        else:
+            return wait if wait <= max_delay else None
+    delay = min(max_delay, base_delay * 2 ** attempt)
+    return delay * (1 + random.random() * 0.5)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[int]:
+    """把 Retry-After 响应头解析为整秒数，用于 RateLimitError.retry_after
+    
+    Args:
+        value: Retry-After 响应头（秒数）
+        
+    Returns:
+        Optional[int]: 向上取整的秒数，没有或无法解析时为 None
+    """
+    if not value:
+        return None
+    try:
+        return max(0, math.ceil(float(value)))
+    except ValueError:
+        return None
+
+
+async def gather_or_cancel(aws: Iterable[Awaitable[T]]) -> List[T]:
+    """并发运行并按顺序返回结果；任一失败时取消其余任务并抛出该异常
+    
+    与 asyncio.TaskGroup 一样不会在失败后留下仍在运行的请求，
+    但抛出的是原始异常而不是 ExceptionGroup，调用方可以照常按类型捕获
+    
+    Args:
+        aws: 可等待对象
+        
+    Returns:
+        List: 按传入顺序排列的结果
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # 等待被取消的任务结束，释放它们占用的连接
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def _start_reader(source: AsyncIterable[Any], queue: "asyncio.Queue[Tuple[bool, Any]]") -> "asyncio.Future[None]":
+    """启动后台任务，把 source 的元素依次放入队列
+    
+    队列中的 (True, 元素) 为数据，(False, 异常或 None) 为结束标记
+    """
+    async def reader() -> None:
+        try:
+            async for item in source:
+                await queue.put((True, item))
+        except Exception as e:
+            await queue.put((False, e))
+        else:
+            await queue.put((False, None))
+        finally:
+            # 被取消时也要关闭异步生成器，释放其持有的连接
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+    
+    return asyncio.ensure_future(reader())
+
+
+async def prefetch(source: AsyncIterable[T], maxsize: int = 8) -> AsyncIterator[T]:
+    """在后台任务中提前读取异步可迭代对象，使网络读取与调用方的处理重叠
+    
+    最多缓冲 maxsize 个元素；读取时的异常在对应位置重新抛出。
+    调用方提前结束迭代时会取消后台任务
+    
+    Args:
+        source: 异步可迭代对象，如流式响应
+        maxsize: 最多缓冲的元素数
+        
+    Yields:
+        source 中的元素，顺序不变
+    """
+    queue: "asyncio.Queue[Tuple[bool, Any]]" = asyncio.Queue(maxsize)
+    task = _start_reader(source, queue)
+    try:
+        while True:
+            has_item, value = await queue.get()
+            if not has_item:
+                if value is not None:
+                    raise value
+                return
+            yield value
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+async def prefetch_batches(source: AsyncIterable[T], maxsize: int = 8) -> AsyncIterator[List[T]]:
+    """与 prefetch 相同，但每次返回当前已读到的全部元素
+    
+    每批至少包含一个元素，不会为了凑批而等待；
+    读取时的异常在此前的元素返回之后抛出
+    
+    Args:
+        source: 异步可迭代对象，如流式响应
+        maxsize: 最多缓冲的元素数
+        
+    Yields:
+        List: 按原顺序排列的一批元素
+    """
+    queue: "asyncio.Queue[Tuple[bool, Any]]" = asyncio.Queue(maxsize)
+    task = _start_reader(source, queue)
+    try:
+        while True:
+            has_item, value = await queue.get()
+            batch: List[T] = []
+            while has_item:
+                batch.append(value)
+                if queue.empty():
+                    break
+                has_item, value = queue.get_nowait()
+            if batch:
+                yield batch
+            if not has_item:
+                if value is not None:
+                    raise value
+                return
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
 
 
 class ModelCapability(Enum):
@@ -21,7 +231,7 @@ class ModelCapability(Enum):
     EMBEDDINGS = "embeddings"
 
 
-@dataclass
+@dataclass(slots=True)
 class ModelInfo:
     """模型信息"""
     provider: str  # 提供商：openai, gemini, bedrock等
@@ -39,7 +249,7 @@ class ModelInfo:
             self.capabilities = set(self.capabilities)
 
 
-@dataclass
+@dataclass(slots=True)
 class LLMResponse:
     """LLM响应数据类"""
     content: str  # 响应内容
@@ -52,7 +262,7 @@ class LLMResponse:
     raw_response: Optional[Any] = None  # 原始响应数据
 
 
-@dataclass
+@dataclass(slots=True)
 class StreamChunk:
     """流式响应数据块"""
     delta: Optional[str] = None  # 增量内容（可选）
@@ -262,6 +472,60 @@ class BaseLLMClient(ABC):
         except Exception:
             return False
     
+    def serialize(self, request: "LLMRequest") -> Mapping[str, Any]:
+        """把请求转换为 generate 系列方法的参数
+        
+        默认返回 OpenAI 风格的完整参数；只使用部分参数的客户端可覆盖此方法，
+        省去构建和传递用不到的字段
+        
+        Args:
+            request: LLM 请求配置
+            
+        Returns:
+            Mapping[str, Any]: 调用参数
+        """
+        return request.to_dict()
+    
+    @staticmethod
+    def _core_params(request: "LLMRequest") -> Dict[str, Any]:
+        """直接从请求字段构建通用参数（消息、采样、停止词和工具）
+        
+        Args:
+            request: LLM 请求配置
+            
+        Returns:
+            Dict[str, Any]: 调用参数
+        """
+        params: Dict[str, Any] = {
+            "messages": request.messages,
+            "model": request.model,
+            "temperature": request.temperature,
+            "top_p": request.top_p,
+        }
+        if request.max_tokens is not None:
+            params["max_tokens"] = request.max_tokens
+        if request.stop is not None:
+            params["stop"] = request.stop
+        if request.tools is not None:
+            params["tools"] = request.tools
+        if request.tool_choice is not None:
+            params["tool_choice"] = request.tool_choice
+        return params
+    
+    def bind_http_session(self, session: Any) -> bool:
+        """绑定共享的 HTTP 会话
+        
+        使用 aiohttp 的客户端应覆盖此方法，复用调用方的连接池而不是自建会话；
+        共享会话由调用方负责关闭
+        
+        Args:
+            session: aiohttp.ClientSession 实例
+            
+        Returns:
+            bool: 是否使用了该会话（默认不使用）
+        """
+        return False
+    
     @abstractmethod
     def _get_default_model(self) -> str:
         """获取默认模型名称"""
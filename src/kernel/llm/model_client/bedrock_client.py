@@ -4,11 +4,17 @@ AWS Bedrock 客户端实现
 支持 AWS Bedrock 的各种模型（Claude, Llama, Titan 等）
 """
 
-from typing import List, Dict, Any, Optional, AsyncIterator, Union, TYPE_CHECKING
-import json
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable, Callable, Tuple, TypeVar, Union, TYPE_CHECKING
+from collections import OrderedDict
+from contextlib import AsyncExitStack
+from copy import deepcopy
+from functools import lru_cache
+import hashlib
+import re
 import asyncio
+import time
 
-from .base_client import BaseLLMClient, ModelInfo, LLMResponse, StreamChunk, ModelCapability
+from .base_client import BaseLLMClient, ModelInfo, LLMResponse, StreamChunk, ModelCapability, backoff_delay, dumps_json, gather_or_cancel, loads_json, parse_retry_after, prefetch
 from ..exceptions import (
     LLMError,
     AuthenticationError,
@@ -25,22 +31,237 @@ except ImportError:
     import logging
     logger = logging.getLogger(__name__)
 
-# boto3 是可选的
+# aioboto3 是可选的
 try:
-    import boto3  # type: ignore[import-not-found]
+    import aioboto3  # type: ignore[import-not-found]
+    from botocore.config import Config  # type: ignore[import-not-found]
     from botocore.exceptions import ClientError, BotoCoreError  # type: ignore[import-not-found]
-    BOTO3_AVAILABLE = True
+    from botocore.exceptions import ConnectionError as BotoConnectionError, HTTPClientError  # type: ignore[import-not-found]
+    AIOBOTO3_AVAILABLE = True
 except ImportError:
-    boto3 = None  # type: ignore[assignment]
+    aioboto3 = None  # type: ignore[assignment]
+    Config = None  # type: ignore[assignment,misc]
     class ClientError(Exception):
         pass
     class BotoCoreError(Exception):
         pass
-    BOTO3_AVAILABLE = False
-    logger.warning("boto3 package not available. Install with: pip install boto3")
+    class BotoConnectionError(BotoCoreError):
+        pass
+    class HTTPClientError(BotoCoreError):
+        pass
+    AIOBOTO3_AVAILABLE = False
+    logger.warning("aioboto3 package not available. Install with: pip install aioboto3")
 
 if TYPE_CHECKING:
-    pass  # type: ignore[import-not-found]
+    from ..llm_request import LLMRequest
+
+
+T = TypeVar("T")
+
+# stream_generate 最多提前读取的事件数
+_STREAM_PREFETCH = 8
+
+# create_embeddings 默认的最大并发请求数
+_EMBEDDING_CONCURRENCY = 16
+
+# 模型 ID 片段 -> 模型家族，按顺序匹配
+_FAMILY_PREFIXES = (
+    ("anthropic.claude", "claude"),
+    ("meta.llama", "llama"),
+    ("amazon.titan", "titan"),
+)
+
+
+@lru_cache(maxsize=256)
+def _model_family(model: str) -> Optional[str]:
+    """识别模型所属家族，结果按模型 ID 缓存
+    
+    Args:
+        model: 模型 ID
+        
+    Returns:
+        Optional[str]: claude、llama 或 titan，无法识别时为 None
+    """
+    for prefix, family in _FAMILY_PREFIXES:
+        if prefix in model:
+            return family
+    return None
+
+
+# Bedrock 错误码 -> (异常类型, 消息模板)，未列出的错误码为 LLMError
+_ERROR_MAP = {
+    "UnrecognizedClientException": (AuthenticationError, "Authentication failed: {}"),
+    "ThrottlingException": (RateLimitError, "Rate limit exceeded: {}"),
+    "ResourceNotFoundException": (ModelNotFoundError, "Model not found: {}"),
+    "ValidationException": (InvalidRequestError, "Invalid request: {}"),
+    "ServiceUnavailableException": (APIConnectionError, "Service unavailable: {}"),
+}
+
+# 可以重试的 Bedrock 错误码：限流和服务端暂时不可用
+_RETRYABLE_ERRORS = frozenset({
+    "ThrottlingException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+})
+
+
+def _retry_after(error_response: Dict[str, Any]) -> Optional[int]:
+    """从错误响应头中读取 Retry-After（秒），没有或无法解析时为 None"""
+    return parse_retry_after(error_response.get("ResponseMetadata", {}).get("HTTPHeaders", {}).get("retry-after"))
+
+
+# 预定义的上下文窗口，按模型 ID 片段匹配
+_CONTEXT_WINDOWS = {
+    "anthropic.claude-3-opus": 200000,
+    "anthropic.claude-3-sonnet": 200000,
+    "anthropic.claude-3-haiku": 200000,
+    "anthropic.claude-v2": 100000,
+    "meta.llama3-70b": 8192,
+    "meta.llama3-8b": 8192,
+    "amazon.titan-text": 32000
+}
+
+# 一次扫描匹配全部片段；较长的片段排在前面，优先于其前缀
+_CONTEXT_WINDOW_PATTERN = re.compile("|".join(
+    re.escape(key) for key in sorted(_CONTEXT_WINDOWS, key=len, reverse=True)
+))
+
+# 达到该长度的系统提示才标记为可缓存，过短的块不满足 Claude 提示缓存的最小长度
+_CACHE_SYSTEM_MIN_CHARS = 1024
+
+_EPHEMERAL_CACHE = {"type": "ephemeral"}
+
+
+def _mark_prompt_cache(body: Dict[str, Any]) -> None:
+    """为 Claude 请求体的系统提示和工具列表添加 cache_control 标记
+    
+    缓存断点覆盖其之前的全部内容，因此只标记最后一个工具即可缓存整个工具列表
+    
+    Args:
+        body: Claude 格式的请求体，原地修改
+    """
+    system = body.get("system")
+    if isinstance(system, str) and len(system) >= _CACHE_SYSTEM_MIN_CHARS:
+        body["system"] = [{"type": "text", "text": system, "cache_control": _EPHEMERAL_CACHE}]
+    tools = body.get("tools")
+    if tools:
+        tools[-1] = {**tools[-1], "cache_control": _EPHEMERAL_CACHE}
+
+
+# Llama 提示中各角色的格式，未列出的角色忽略
+_LLAMA_FORMATS = {
+    "system": "<<SYS>>\n{}\n<</SYS>>".format,
+    "user": "[INST] {} [/INST]".format,
+    "assistant": str,
+}
+
+
+def _apply_claude_config(body: Dict[str, Any], temperature: float, max_tokens: Optional[int], top_p: float, stop: Optional[List[str]]) -> None:
+    body["max_tokens"] = max_tokens or 2048
+    body["temperature"] = temperature
+    body["top_p"] = top_p
+    if stop:
+        body["stop_sequences"] = stop
+
+
+def _apply_llama_config(body: Dict[str, Any], temperature: float, max_tokens: Optional[int], top_p: float, stop: Optional[List[str]]) -> None:
+    body["max_gen_len"] = max_tokens or 2048
+    body["temperature"] = temperature
+    body["top_p"] = top_p
+
+
+def _apply_titan_config(body: Dict[str, Any], temperature: float, max_tokens: Optional[int], top_p: float, stop: Optional[List[str]]) -> None:
+    config = {
+        "maxTokenCount": max_tokens or 2048,
+        "temperature": temperature,
+        "topP": top_p
+    }
+    if stop:
+        config["stopSequences"] = stop
+    body["textGenerationConfig"] = config
+
+
+# 模型家族 -> 生成配置写入函数，未知家族不写入
+_CONFIG_APPLIERS = {
+    "claude": _apply_claude_config,
+    "llama": _apply_llama_config,
+    "titan": _apply_titan_config,
+}
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+def _parse_claude_response(body: Dict[str, Any]) -> Tuple[str, Dict[str, int], str]:
+    usage = body.get("usage", {})
+    return (
+        body.get("content", [{}])[0].get("text", ""),
+        _usage(usage.get("input_tokens", 0), usage.get("output_tokens", 0)),
+        body.get("stop_reason", "stop")
+    )
+
+
+def _parse_llama_response(body: Dict[str, Any]) -> Tuple[str, Dict[str, int], str]:
+    return (
+        body.get("generation", ""),
+        _usage(body.get("prompt_token_count", 0), body.get("generation_token_count", 0)),
+        body.get("stop_reason", "stop")
+    )
+
+
+def _parse_titan_response(body: Dict[str, Any]) -> Tuple[str, Dict[str, int], str]:
+    results = body.get("results", [{}])
+    if not results:
+        return "", _usage(body.get("inputTextTokenCount", 0), 0), "FINISH"
+    first = results[0]
+    return (
+        first.get("outputText", ""),
+        _usage(body.get("inputTextTokenCount", 0), first.get("tokenCount", 0)),
+        first.get("completionReason", "FINISH")
+    )
+
+
+def _parse_unknown_response(body: Dict[str, Any]) -> Tuple[str, Dict[str, int], str]:
+    return str(body), _usage(0, 0), "stop"
+
+
+# 模型家族 -> 响应解析函数，返回 (内容, 用量, 结束原因)
+_RESPONSE_PARSERS = {
+    "claude": _parse_claude_response,
+    "llama": _parse_llama_response,
+    "titan": _parse_titan_response,
+}
+
+
+def _parse_claude_chunk(chunk: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    finish_reason = chunk.get("stop_reason") if chunk.get("type") == "message_stop" else None
+    return chunk.get("delta", {}).get("text", ""), finish_reason
+
+
+def _parse_llama_chunk(chunk: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    return chunk.get("generation", ""), None
+
+
+def _parse_titan_chunk(chunk: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    return chunk.get("outputText", ""), None
+
+
+def _parse_unknown_chunk(chunk: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    return "", None
+
+
+# 模型家族 -> 流式事件解析函数，返回 (内容, 结束原因)
+_CHUNK_PARSERS = {
+    "claude": _parse_claude_chunk,
+    "llama": _parse_llama_chunk,
+    "titan": _parse_titan_chunk,
+}
 
 
 class BedrockClient(BaseLLMClient):
@@ -52,8 +273,17 @@ class BedrockClient(BaseLLMClient):
     - Amazon Titan
     - AI21 Jurassic
     - Cohere Command
+    
+    使用 aioboto3 在事件循环上直接进行异步 I/O，不占用线程池
     """
     
+    # 模型家族 -> 消息转换方法名，未知家族使用 Claude 格式
+    _CONVERTERS = {
+        "claude": "_convert_to_claude_format",
+        "llama": "_convert_to_llama_format",
+        "titan": "_convert_to_titan_format",
+    }
+    
     def __init__(
         self,
         region_name: str = "us-east-1",
@@ -61,6 +291,12 @@ class BedrockClient(BaseLLMClient):
         aws_secret_access_key: Optional[str] = None,
         aws_session_token: Optional[str] = None,
         profile_name: Optional[str] = None,
+        response_cache_size: int = 0,
+        response_cache_ttl: Optional[float] = None,
+        max_pool_connections: int = 64,
+        max_retries: int = 3,
+        retry_base_delay: float = 1.0,
+        keep_raw_response: bool = True,
         **kwargs
     ):
         """初始化 Bedrock 客户端
@@ -71,18 +307,29 @@ class BedrockClient(BaseLLMClient):
             aws_secret_access_key: AWS 秘密访问密钥
             aws_session_token: AWS 会话令牌
             profile_name: AWS 配置文件名称
+            response_cache_size: temperature 为 0 的响应缓存条目数，默认 0 表示不缓存
+            response_cache_ttl: 响应缓存的存活时间（秒），None 表示不过期
+            max_pool_connections: 连接池大小，即同时进行的请求上限（botocore 默认只有 10）
+            max_retries: 限流、服务暂时不可用和连接错误的最大重试次数；
+                botocore 自身的重试已关闭，由这里统一重试
+            retry_base_delay: 指数退避的基础延迟（秒）
+            keep_raw_response: 是否在 LLMResponse.raw_response 中保留解析后的完整响应体；
+                不需要时关闭，提取内容后即可释放响应体，缓存的响应也不再占用这部分内存
             **kwargs: 其他参数
         """
-        if not BOTO3_AVAILABLE:
+        if not AIOBOTO3_AVAILABLE:
             raise ImportError(
-                "boto3 package is required for BedrockClient. "
-                "Install with: pip install boto3"
+                "aioboto3 package is required for BedrockClient. "
+                "Install with: pip install aioboto3"
             )
-        assert boto3 is not None
+        assert aioboto3 is not None
         
         super().__init__()
         
         self.region_name = region_name
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.keep_raw_response = keep_raw_response
         
         # 创建会话
         session_kwargs = {}
@@ -95,13 +342,157 @@ class BedrockClient(BaseLLMClient):
         if profile_name:
             session_kwargs["profile_name"] = profile_name
         
-        self.session = boto3.Session(**session_kwargs)
-        self.client = self.session.client(
-            service_name="bedrock-runtime",
-            region_name=region_name
+        self._session = aioboto3.Session(**session_kwargs)
+        # adaptive 模式只用于客户端限速；botocore 不再重试，重试统一由 _invoke_with_retry 负责，
+        # 避免两层重试的次数相乘
+        self._client_config = Config(
+            max_pool_connections=max_pool_connections,
+            retries={"max_attempts": 0, "mode": "adaptive"},
+            tcp_keepalive=True
+        )
+        
+        # bedrock-runtime 与 bedrock（控制面）客户端在首次使用时创建并复用，关闭时释放连接池
+        self._client: Any = None
+        self._control_client: Any = None
+        self._client_stack: Optional[AsyncExitStack] = None
+        self._client_lock = asyncio.Lock()
+        
+        # 请求参数摘要 -> (响应, 过期时间)，按最近使用排序
+        self.response_cache_size = response_cache_size
+        self.response_cache_ttl = response_cache_ttl
+        self._response_cache: "OrderedDict[str, Tuple[LLMResponse, float]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+        
+        logger.info("Bedrock client initialized for region %s", region_name)
+    
+    def _client_factory(self, service_name: str = "bedrock-runtime") -> Any:
+        """创建 aioboto3 客户端
+        
+        Args:
+            service_name: AWS 服务名称
+            
+        Returns:
+            异步上下文管理器，进入后得到客户端
+        """
+        return self._session.client(
+            service_name=service_name,
+            region_name=self.region_name,
+            config=self._client_config
         )
+    
+    async def _enter_client(self, service_name: str) -> Any:
+        """创建客户端并登记到退出栈，close 时统一释放"""
+        if self._client_stack is None:
+            self._client_stack = AsyncExitStack()
+        return await self._client_stack.enter_async_context(self._client_factory(service_name))
+    
+    async def _get_client(self) -> Any:
+        """获取复用的 bedrock-runtime 客户端，首次调用时创建"""
+        if self._client is None:
+            async with self._client_lock:
+                if self._client is None:
+                    self._client = await self._enter_client("bedrock-runtime")
+        return self._client
+    
+    async def _get_control_client(self) -> Any:
+        """获取复用的 bedrock 控制面客户端，首次调用时创建"""
+        if self._control_client is None:
+            async with self._client_lock:
+                if self._control_client is None:
+                    self._control_client = await self._enter_client("bedrock")
+        return self._control_client
+    
+    def _response_cache_key(self, **params: Any) -> Optional[str]:
+        """计算响应缓存键
+        
+        只缓存 temperature 为 0 的请求，其余请求返回 None
         
-        logger.info(f"Bedrock client initialized for region {region_name}")
+        Args:
+            **params: 影响请求体的全部参数
+            
+        Returns:
+            Optional[str]: 参数的 SHA-256 摘要
+        """
+        if self.response_cache_size <= 0 or params.get("temperature") != 0:
+            return None
+        try:
+            payload = dumps_json(params, sort_keys=True)
+        except TypeError:
+            # 含有无法序列化的参数时不缓存，交给请求本身报错
+            return None
+        return hashlib.sha256(payload).hexdigest()
+    
+    def _cached_response(self, key: Optional[str]) -> Optional[LLMResponse]:
+        """读取响应缓存，命中时刷新最近使用顺序
+        
+        返回缓存条目的副本，调用方修改响应不会影响其他调用方
+        """
+        if key is None:
+            return None
+        cached = self._response_cache.get(key)
+        if cached is None or cached[1] <= time.monotonic():
+            self.stats["misses"] += 1
+            return None
+        self._response_cache.move_to_end(key)
+        self.stats["hits"] += 1
+        return deepcopy(cached[0])
+    
+    def _cache_response(self, key: Optional[str], response: LLMResponse) -> None:
+        """写入响应缓存，超出容量时淘汰最久未使用的条目
+        
+        缓存的是副本，调用方之后修改 response 不会写入缓存
+        """
+        if key is None:
+            return
+        ttl = self.response_cache_ttl
+        self._response_cache[key] = (deepcopy(response), float("inf") if ttl is None else time.monotonic() + ttl)
+        self._response_cache.move_to_end(key)
+        while len(self._response_cache) > self.response_cache_size:
+            self._response_cache.popitem(last=False)
+    
+    async def _invoke_with_retry(self, call: Callable[..., Awaitable[T]], **kwargs: Any) -> T:
+        """调用 Bedrock 接口，遇到限流、服务暂时不可用或连接错误时退避重试
+        
+        优先按响应中的 Retry-After 等待，否则指数退避并加入随机抖动；
+        Retry-After 超过退避上限时不再等待，直接抛出
+        
+        Args:
+            call: 客户端方法，如 client.invoke_model
+            **kwargs: 调用参数
+            
+        Returns:
+            接口返回值
+        """
+        attempt = 0
+        while True:
+            try:
+                return await call(**kwargs)
+            except ClientError as e:
+                error_response = getattr(e, "response", {}) or {}
+                code = error_response.get("Error", {}).get("Code", "")
+                if code not in _RETRYABLE_ERRORS or attempt >= self.max_retries:
+                    raise
+                headers = error_response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+                delay = backoff_delay(attempt, self.retry_base_delay, headers.get("retry-after"))
+                if delay is None:
+                    # 服务端要求的等待过长，交给调用方按 retry_after 处理
+                    raise
+            except (BotoConnectionError, HTTPClientError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                code = type(e).__name__
+                delay = backoff_delay(attempt, self.retry_base_delay)
+            attempt += 1
+            logger.warning(
+                "Bedrock returned %s, retrying in %.2fs (%d/%d)",
+                code, delay, attempt, self.max_retries
+            )
+            await asyncio.sleep(delay)
+    
+    async def _read_body(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """读取并解析 invoke_model 的响应体，直接解析字节串"""
+        async with response["body"] as body:
+            return loads_json(await body.read())
     
     async def initialize(self) -> bool:
         """初始化客户端
@@ -111,19 +502,10 @@ class BedrockClient(BaseLLMClient):
         """
         try:
             # 测试连接 - 尝试列出基础模型
-            bedrock_client = self.session.client(
-                service_name="bedrock",
-                region_name=self.region_name
-            )
+            bedrock_client = await self._get_control_client()
+            response = await bedrock_client.list_foundation_models()
             
-            # 同步调用，需要在线程池中执行
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                bedrock_client.list_foundation_models
-            )
-            
-            logger.debug(f"Bedrock client initialized, {len(response.get('modelSummaries', []))} models available")
+            logger.debug("Bedrock client initialized, %d models available", len(response.get("modelSummaries", [])))
             return True
             
         except ClientError as e:
@@ -138,10 +520,19 @@ class BedrockClient(BaseLLMClient):
             return False
     
     async def close(self):
-        """关闭客户端"""
-        # boto3 客户端不需要显式关闭
+        """关闭客户端，释放 bedrock-runtime 客户端的连接池"""
+        stack, self._client_stack = self._client_stack, None
+        self._client = None
+        self._control_client = None
+        self._response_cache.clear()
+        if stack is not None:
+            await stack.aclose()
         logger.info("Bedrock client closed")
     
+    def serialize(self, request: "LLMRequest") -> Dict[str, Any]:
+        """只构建 Bedrock 会用到的参数，跳过 OpenAI 专有字段"""
+        return self._core_params(request)
+    
     def _handle_error(self, error: ClientError) -> LLMError:
         """处理错误
         
@@ -152,21 +543,12 @@ class BedrockClient(BaseLLMClient):
             LLMError: 转换后的错误
         """
         error_response = getattr(error, "response", {}) or {}
-        error_code = error_response.get("Error", {}).get("Code", "")
-        error_message = error_response.get("Error", {}).get("Message", "")
-        
-        if error_code == "UnrecognizedClientException":
-            return AuthenticationError(f"Authentication failed: {error_message}")
-        elif error_code == "ThrottlingException":
-            return RateLimitError(f"Rate limit exceeded: {error_message}")
-        elif error_code == "ResourceNotFoundException":
-            return ModelNotFoundError(f"Model not found: {error_message}")
-        elif error_code == "ValidationException":
-            return InvalidRequestError(f"Invalid request: {error_message}")
-        elif error_code == "ServiceUnavailableException":
-            return APIConnectionError(f"Service unavailable: {error_message}")
-        else:
-            return LLMError(f"Bedrock error: {error_message}")
+        error_info = error_response.get("Error", {})
+        error_type, template = _ERROR_MAP.get(error_info.get("Code", ""), (LLMError, "Bedrock error: {}"))
+        message = template.format(error_info.get("Message", ""))
+        if error_type is RateLimitError:
+            return RateLimitError(message, retry_after=_retry_after(error_response))
+        return error_type(message)
     
     def _convert_messages_to_bedrock_format(
         self,
@@ -182,33 +564,52 @@ class BedrockClient(BaseLLMClient):
         Returns:
             Dict: Bedrock 格式的请求体
         """
-        # 根据模型类型选择格式
-        if "anthropic.claude" in model_id:
-            return self._convert_to_claude_format(messages)
-        elif "meta.llama" in model_id:
-            return self._convert_to_llama_format(messages)
-        elif "amazon.titan" in model_id:
-            return self._convert_to_titan_format(messages)
-        else:
-            # 默认格式
-            return self._convert_to_claude_format(messages)
+        # 根据模型家族选择格式
+        converter = self._CONVERTERS.get(_model_family(model_id), "_convert_to_claude_format")
+        return getattr(self, converter)(messages)
+    
+    def _build_request_body(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        top_p: float,
+        stop: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """构建完整的请求体：转换消息并写入该模型家族的生成配置
+        
+        Args:
+            messages: OpenAI 风格的消息列表
+            model: 模型 ID
+            temperature: 温度参数
+            max_tokens: 最大 token 数
+            top_p: Top-p 采样
+            stop: 停止序列
+            
+        Returns:
+            Dict: Bedrock 请求体
+        """
+        request_body = self._convert_messages_to_bedrock_format(messages, model)
+        apply_config = _CONFIG_APPLIERS.get(_model_family(model))
+        if apply_config is not None:
+            apply_config(request_body, temperature, max_tokens, top_p, stop)
+        return request_body
     
     def _convert_to_claude_format(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
         """转换为 Claude 格式"""
         # Claude 使用特殊的提示格式
         system = None
-        conversation = []
+        conversation: List[Dict[str, Any]] = []
+        append = conversation.append
         
         for msg in messages:
             role = msg.get("role")
-            content = msg.get("content", "")
             
-            if role == "system":
-                system = content
-            elif role == "user":
-                conversation.append({"role": "user", "content": content})
-            elif role == "assistant":
-                conversation.append({"role": "assistant", "content": content})
+            if role == "user" or role == "assistant":
+                append({"role": role, "content": msg.get("content", "")})
+            elif role == "system":
+                system = msg.get("content", "")
         
         request_body = {"messages": conversation}
         
@@ -220,30 +621,20 @@ class BedrockClient(BaseLLMClient):
     def _convert_to_llama_format(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
         """转换为 Llama 格式"""
         # Llama 使用简单的提示格式
-        prompt_parts = []
-        
-        for msg in messages:
-            role = msg.get("role")
-            content = msg.get("content", "")
-            
-            if role == "system":
-                prompt_parts.append(f"<<SYS>>\n{content}\n<</SYS>>")
-            elif role == "user":
-                prompt_parts.append(f"[INST] {content} [/INST]")
-            elif role == "assistant":
-                prompt_parts.append(content)
-        
-        return {"prompt": "\n\n".join(prompt_parts)}
+        formats = _LLAMA_FORMATS
+        return {"prompt": "\n\n".join(
+            formats[role](msg.get("content", ""))
+            for msg in messages
+            if (role := msg.get("role")) in formats
+        )}
     
     def _convert_to_titan_format(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
         """转换为 Titan 格式"""
         # Titan 使用简单的输入格式
-        input_text = "\n\n".join(
-            f"{msg.get('role')}: {msg.get('content', '')}" 
+        return {"inputText": "\n\n".join(
+            f"{msg.get('role')}: {msg.get('content', '')}"
             for msg in messages
-        )
-        
-        return {"inputText": input_text}
+        )}
     
     async def generate(
         self,
@@ -253,6 +644,7 @@ class BedrockClient(BaseLLMClient):
         max_tokens: Optional[int] = None,
         top_p: float = 1.0,
         stop: Optional[List[str]] = None,
+        cache_system: bool = False,
         **kwargs
     ) -> LLMResponse:
         """生成文本
@@ -264,98 +656,54 @@ class BedrockClient(BaseLLMClient):
             max_tokens: 最大 token 数
             top_p: Top-p 采样
             stop: 停止序列
+            cache_system: 是否为长系统提示启用 Claude 提示缓存（需模型支持）
             **kwargs: 其他参数
             
         Returns:
             LLMResponse: 生成结果
         """
+        cache_key = self._response_cache_key(
+            model=model, messages=messages, temperature=temperature,
+            max_tokens=max_tokens, top_p=top_p, stop=stop
+        )
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # 转换消息格式
-            request_body = self._convert_messages_to_bedrock_format(messages, model)
-            
-            # 添加生成配置
-            if "anthropic.claude" in model:
-                request_body["max_tokens"] = max_tokens or 2048
-                request_body["temperature"] = temperature
-                request_body["top_p"] = top_p
-                if stop:
-                    request_body["stop_sequences"] = stop
-            
-            elif "meta.llama" in model:
-                request_body["max_gen_len"] = max_tokens or 2048
-                request_body["temperature"] = temperature
-                request_body["top_p"] = top_p
-            
-            elif "amazon.titan" in model:
-                request_body["textGenerationConfig"] = {
-                    "maxTokenCount": max_tokens or 2048,
-                    "temperature": temperature,
-                    "topP": top_p
-                }
-                if stop:
-                    request_body["textGenerationConfig"]["stopSequences"] = stop
-            
-            logger.debug(f"Generating with model {model}")
-            
-            # 调用 API（在线程池中执行同步调用）
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.client.invoke_model(
-                    modelId=model,
-                    body=json.dumps(request_body)
-                )
+            family = _model_family(model)
+            request_body = self._build_request_body(messages, model, temperature, max_tokens, top_p, stop)
+            if cache_system and family == "claude":
+                _mark_prompt_cache(request_body)
+            
+            logger.debug("Generating with model %s", model)
+            
+            # 调用 API
+            client = await self._get_client()
+            response = await self._invoke_with_retry(
+                client.invoke_model,
+                modelId=model,
+                body=dumps_json(request_body)
             )
             
             # 解析响应
-            response_body = json.loads(response["body"].read())
-            
-            # 提取内容（根据模型类型）
-            if "anthropic.claude" in model:
-                content = response_body.get("content", [{}])[0].get("text", "")
-                usage = {
-                    "prompt_tokens": response_body.get("usage", {}).get("input_tokens", 0),
-                    "completion_tokens": response_body.get("usage", {}).get("output_tokens", 0),
-                    "total_tokens": 0
-                }
-                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
-                finish_reason = response_body.get("stop_reason", "stop")
-            
-            elif "meta.llama" in model:
-                content = response_body.get("generation", "")
-                usage = {
-                    "prompt_tokens": response_body.get("prompt_token_count", 0),
-                    "completion_tokens": response_body.get("generation_token_count", 0),
-                    "total_tokens": 0
-                }
-                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
-                finish_reason = response_body.get("stop_reason", "stop")
-            
-            elif "amazon.titan" in model:
-                results = response_body.get("results", [{}])
-                content = results[0].get("outputText", "") if results else ""
-                usage = {
-                    "prompt_tokens": response_body.get("inputTextTokenCount", 0),
-                    "completion_tokens": results[0].get("tokenCount", 0) if results else 0,
-                    "total_tokens": 0
-                }
-                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
-                finish_reason = results[0].get("completionReason", "FINISH") if results else "FINISH"
-            
-            else:
-                content = str(response_body)
-                usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
-                finish_reason = "stop"
+            response_body = await self._read_body(response)
+            
+            # 提取内容（根据模型家族）
+            parse_response = _RESPONSE_PARSERS.get(family, _parse_unknown_response)
+            content, usage, finish_reason = parse_response(response_body)
             
             result = LLMResponse(
                 content=content,
                 model=model,
                 finish_reason=finish_reason,
                 usage=usage,
-                raw_response=response_body
+                raw_response=response_body if self.keep_raw_response else None
             )
             
-            logger.debug(f"Generation completed: {result.usage}")
+            self._cache_response(cache_key, result)
+            logger.debug("Generation completed: %s", result.usage)
             return result
             
         except ClientError as e:
@@ -373,6 +721,7 @@ class BedrockClient(BaseLLMClient):
         max_tokens: Optional[int] = None,
         top_p: float = 1.0,
         stop: Optional[List[str]] = None,
+        cache_system: bool = False,
         **kwargs
     ) -> AsyncIterator[StreamChunk]:
         """流式生成文本
@@ -384,6 +733,7 @@ class BedrockClient(BaseLLMClient):
             max_tokens: 最大 token 数
             top_p: Top-p 采样
             stop: 停止序列
+            cache_system: 是否为长系统提示启用 Claude 提示缓存（需模型支持）
             **kwargs: 其他参数
             
         Yields:
@@ -391,51 +741,31 @@ class BedrockClient(BaseLLMClient):
         """
         try:
             # 转换消息格式
-            request_body = self._convert_messages_to_bedrock_format(messages, model)
-            
-            # 添加生成配置（与 generate 相同）
-            if "anthropic.claude" in model:
-                request_body["max_tokens"] = max_tokens or 2048
-                request_body["temperature"] = temperature
-                request_body["top_p"] = top_p
-                if stop:
-                    request_body["stop_sequences"] = stop
+            family = _model_family(model)
+            request_body = self._build_request_body(messages, model, temperature, max_tokens, top_p, stop)
+            if cache_system and family == "claude":
+                _mark_prompt_cache(request_body)
             
-            logger.debug(f"Streaming generation with model {model}")
+            logger.debug("Streaming generation with model %s", model)
             
             # 流式调用 API
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.client.invoke_model_with_response_stream(
-                    modelId=model,
-                    body=json.dumps(request_body)
-                )
+            client = await self._get_client()
+            response = await self._invoke_with_retry(
+                client.invoke_model_with_response_stream,
+                modelId=model,
+                body=dumps_json(request_body)
             )
             
             # 读取流
+            parse_chunk = _CHUNK_PARSERS.get(family, _parse_unknown_chunk)
             stream = response.get("body")
             if stream:
-                for event in stream:
+                # 后台提前读取事件，调用方处理当前片段时网络读取不停顿
+                async for event in prefetch(stream, _STREAM_PREFETCH):
                     chunk_data = event.get("chunk")
                     if chunk_data:
-                        chunk_json = json.loads(chunk_data.get("bytes").decode())
-                        
-                        # 提取内容（根据模型类型）
-                        content = ""
-                        finish_reason = None
-                        
-                        if "anthropic.claude" in model:
-                            delta = chunk_json.get("delta", {})
-                            content = delta.get("text", "")
-                            if chunk_json.get("type") == "message_stop":
-                                finish_reason = chunk_json.get("stop_reason")
-                        
-                        elif "meta.llama" in model:
-                            content = chunk_json.get("generation", "")
-                        
-                        elif "amazon.titan" in model:
-                            content = chunk_json.get("outputText", "")
+                        # 提取内容（根据模型家族）
+                        content, finish_reason = parse_chunk(loads_json(chunk_data["bytes"]))
                         
                         if content:
                             yield StreamChunk(
@@ -470,17 +800,28 @@ class BedrockClient(BaseLLMClient):
             tools: 工具列表
             model: 模型 ID
             tool_choice: 工具选择策略
-            **kwargs: 其他参数
+            **kwargs: 其他参数，可包含 cache_system 以缓存系统提示和工具定义
             
         Returns:
             LLMResponse: 生成结果
         """
         if "anthropic.claude-3" not in model:
-            logger.warning(f"Model {model} may not support tool calling")
+            logger.warning("Model %s may not support tool calling", model)
+        
+        temperature = kwargs.get("temperature", 0.7)
+        max_tokens = kwargs.get("max_tokens")
+        top_p = kwargs.get("top_p", 1.0)
+        stop = kwargs.get("stop")
+        cache_key = self._response_cache_key(
+            model=model, messages=messages, tools=tools, tool_choice=tool_choice,
+            temperature=temperature, max_tokens=max_tokens, top_p=top_p, stop=stop
+        )
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
         
         try:
-            # 转换消息格式
-            request_body = self._convert_messages_to_bedrock_format(messages, model)
+            request_body = self._build_request_body(messages, model, temperature, max_tokens, top_p, stop)
             
             # 转换工具格式（Claude 格式）
             claude_tools = []
@@ -505,20 +846,21 @@ class BedrockClient(BaseLLMClient):
                         "name": tool_choice
                     }
             
-            logger.debug(f"Generating with tools, model {model}")
+            if kwargs.get("cache_system") and _model_family(model) == "claude":
+                _mark_prompt_cache(request_body)
+            
+            logger.debug("Generating with tools, model %s", model)
             
             # 调用 API
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.client.invoke_model(
-                    modelId=model,
-                    body=json.dumps(request_body)
-                )
+            client = await self._get_client()
+            response = await self._invoke_with_retry(
+                client.invoke_model,
+                modelId=model,
+                body=dumps_json(request_body)
             )
             
             # 解析响应
-            response_body = json.loads(response["body"].read())
+            response_body = await self._read_body(response)
             
             # 提取内容和工具调用
             content_blocks = response_body.get("content", [])
@@ -534,7 +876,7 @@ class BedrockClient(BaseLLMClient):
                         "type": "function",
                         "function": {
                             "name": block.get("name"),
-                            "arguments": json.dumps(block.get("input", {}))
+                            "arguments": dumps_json(block.get("input", {})).decode()
                         }
                     })
             
@@ -552,10 +894,11 @@ class BedrockClient(BaseLLMClient):
                 finish_reason=response_body.get("stop_reason", "stop"),
                 tool_calls=tool_calls if tool_calls else None,
                 usage=usage,
-                raw_response=response_body
+                raw_response=response_body if self.keep_raw_response else None
             )
             
-            logger.debug(f"Tool calling completed: {len(tool_calls)} calls")
+            self._cache_response(cache_key, result)
+            logger.debug("Tool calling completed: %d calls", len(tool_calls))
             return result
             
         except ClientError as e:
@@ -569,41 +912,42 @@ class BedrockClient(BaseLLMClient):
         self,
         texts: List[str],
         model: str = "amazon.titan-embed-text-v1",
+        max_concurrency: int = _EMBEDDING_CONCURRENCY,
         **kwargs
     ) -> List[List[float]]:
         """创建文本嵌入
         
+        Bedrock 嵌入 API 每次只处理一个文本，各文本的请求并发发出
+        
         Args:
             texts: 文本列表
             model: 模型 ID
+            max_concurrency: 最大并发请求数
             **kwargs: 其他参数
             
         Returns:
-            List[List[float]]: 嵌入向量列表
+            List[List[float]]: 嵌入向量列表，顺序与 texts 一致
         """
         try:
-            logger.debug(f"Creating embeddings for {len(texts)} texts")
-            
-            embeddings = []
-            loop = asyncio.get_event_loop()
-            
-            # Bedrock 嵌入 API 每次处理一个文本
-            for text in texts:
-                request_body = {"inputText": text}
-                
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: self.client.invoke_model(
+            logger.debug("Creating embeddings for %d texts", len(texts))
+            
+            client = await self._get_client()
+            semaphore = asyncio.Semaphore(max_concurrency)
+            
+            async def embed_one(text: str) -> List[float]:
+                async with semaphore:
+                    response = await self._invoke_with_retry(
+                        client.invoke_model,
                         modelId=model,
-                        body=json.dumps(request_body)
+                        body=dumps_json({"inputText": text})
                     )
-                )
-                
-                response_body = json.loads(response["body"].read())
-                embedding = response_body.get("embedding", [])
-                embeddings.append(embedding)
+                    response_body = await self._read_body(response)
+                return response_body.get("embedding", [])
+            
+            # gather 按参数顺序返回结果；任一请求失败时取消其余请求
+            embeddings = await gather_or_cancel(embed_one(text) for text in texts)
             
-            logger.debug(f"Embeddings created: {len(embeddings)} vectors")
+            logger.debug("Embeddings created: %d vectors", len(embeddings))
             return embeddings
             
         except ClientError as e:
@@ -634,22 +978,8 @@ class BedrockClient(BaseLLMClient):
         if "embed" in model:
             capabilities = {ModelCapability.EMBEDDINGS}
         
-        # 预定义的上下文窗口
-        context_windows = {
-            "anthropic.claude-3-opus": 200000,
-            "anthropic.claude-3-sonnet": 200000,
-            "anthropic.claude-3-haiku": 200000,
-            "anthropic.claude-v2": 100000,
-            "meta.llama3-70b": 8192,
-            "meta.llama3-8b": 8192,
-            "amazon.titan-text": 32000
-        }
-        
-        context_window = 8192  # 默认值
-        for key, value in context_windows.items():
-            if key in model:
-                context_window = value
-                break
+        match = _CONTEXT_WINDOW_PATTERN.search(model)
+        context_window = _CONTEXT_WINDOWS[match.group(0)] if match else 8192  # 默认值
         
         return ModelInfo(
             provider="bedrock",
@@ -658,4 +988,8 @@ class BedrockClient(BaseLLMClient):
             context_window=context_window,
             max_output_tokens=context_window // 2,
             supports_streaming=True
-        )
\ No newline at end of file
+        )
+    
+    def _get_default_model(self) -> str:
+        """获取默认模型"""
+        return "anthropic.claude-3-sonnet-20240229-v1:0"
@@ -4,9 +4,24 @@ OpenAI 客户端实现
 支持 OpenAI API 和兼容 API（如 Azure OpenAI, DeepSeek 等）
 """
 
-from typing import List, Dict, Any, Optional, AsyncIterator, Union
+from typing import List, Dict, Any, Optional, AsyncIterator, ClassVar, Set, Tuple, Union
+from dataclasses import dataclass
+import asyncio
+import hashlib
+import re
+import time
 
-from .base_client import BaseLLMClient, ModelInfo, LLMResponse, StreamChunk, ModelCapability
+from .base_client import (
+    BaseLLMClient,
+    ModelInfo,
+    LLMResponse,
+    StreamChunk,
+    ModelCapability,
+    dumps_json,
+    gather_or_cancel,
+    loads_json,
+    prefetch_batches
+)
 from ..exceptions import (
     LLMError,
     AuthenticationError,
@@ -29,11 +44,13 @@ try:
     from openai import AsyncOpenAI, OpenAIError, AuthenticationError as OpenAIAuthError
     from openai import RateLimitError as OpenAIRateLimitError
     from openai import APIConnectionError as OpenAIConnectionError
+    import httpx  # openai 的依赖
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
     # 为静态分析与类型检查提供占位符，避免未绑定名称的错误
     AsyncOpenAI = None  # type: ignore
+    httpx = None  # type: ignore
     OpenAIError = Exception  # type: ignore
     OpenAIAuthError = Exception  # type: ignore
     OpenAIRateLimitError = Exception  # type: ignore
@@ -41,12 +58,70 @@ except ImportError:
     logger.warning("openai package not available. Install with: pip install openai")
 
 
+# SDK 异常类型 -> (转换后的异常, 消息前缀)，按异常类的 MRO 查找；
+# 没有 openai 时占位符都是 Exception，表为空
+_SDK_ERRORS: Dict[type, Tuple[type, str]] = {
+    OpenAIConnectionError: (APIConnectionError, "Connection failed"),
+    OpenAIRateLimitError: (RateLimitError, "Rate limit exceeded"),
+    OpenAIAuthError: (AuthenticationError, "OpenAI authentication failed"),
+} if OPENAI_AVAILABLE else {}
+
+# 错误信息中的错误码 -> (转换后的异常, 消息前缀)；都不匹配时再检查 "invalid"
+_ERROR_CODES = {
+    "context_length_exceeded": (ContextLengthExceededError, "Context length exceeded"),
+    "model_not_found": (ModelNotFoundError, "Model not found"),
+}
+_ERROR_CODE_PATTERN = re.compile("|".join(_ERROR_CODES))
+
+# 共享 SDK 客户端的最长使用时间（秒），超过后新建的实例改用新的连接池
+_POOL_MAX_AGE = 3600.0
+
+# 无人引用的共享客户端保留的时间（秒），与 keep-alive 连接的过期时间一致
+_POOL_IDLE_TIMEOUT = 60.0
+
+# 正在后台关闭的共享客户端任务，保留引用避免任务在完成前被回收
+_CLOSING_TASKS: Set["asyncio.Task[None]"] = set()
+
+# 流式响应的预读缓冲大小，以及合并为一个 StreamChunk 的最多文本增量数
+_STREAM_PREFETCH = 32
+_STREAM_COALESCE = 16
+
+# Batch API 中不会再变化的批次状态
+_BATCH_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+@dataclass(slots=True)
+class _PooledClient:
+    """共享的 AsyncOpenAI 客户端及其引用计数
+    
+    loop 为 None 表示尚未在事件循环中使用过，首次异步使用时绑定
+    """
+    client: Any
+    created: float
+    loop: Optional[asyncio.AbstractEventLoop]
+    refs: int = 0
+    # 引用计数降为 0 的时间，仍被引用时为 None
+    idle_since: Optional[float] = None
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
 class OpenAIClient(BaseLLMClient):
     """OpenAI 客户端
     
-    支持 OpenAI API 和兼容的 API 接口
+    支持 OpenAI API 和兼容的 API 接口。
+    配置相同（base_url、组织、API 密钥等）且在同一事件循环中使用的实例共享同一个 AsyncOpenAI
+    及其连接池，重新创建客户端时可以直接复用已建立的 keep-alive 连接
     """
     
+    # (事件循环, 配置键) -> 共享客户端；配置键为 (base_url, 组织, API 密钥摘要, 超时, 重试次数, 连接数)
+    _pool: ClassVar[Dict[Tuple[Any, Tuple[Any, ...]], _PooledClient]] = {}
+    
     def __init__(
         self,
         api_key: str,
@@ -54,6 +129,7 @@ class OpenAIClient(BaseLLMClient):
         organization: Optional[str] = None,
         timeout: float = 60.0,
         max_retries: int = 3,
+        max_connections: int = 1000,
         **kwargs
     ):
         """初始化 OpenAI 客户端
@@ -64,6 +140,7 @@ class OpenAIClient(BaseLLMClient):
             organization: 组织 ID
             timeout: 超时时间（秒）
             max_retries: 最大重试次数
+            max_connections: 共享连接池的最大连接数
             **kwargs: 其他参数
         """
         if not OPENAI_AVAILABLE:
@@ -93,14 +170,159 @@ class OpenAIClient(BaseLLMClient):
         if organization:
             client_kwargs["organization"] = organization
         
-        if not OPENAI_AVAILABLE:
-            raise ImportError(
-                "openai package is required for OpenAIClient. Install with: pip install openai"
+        self._pool_key = (
+            base_url,
+            organization,
+            hashlib.sha256(api_key.encode("utf-8")).hexdigest(),
+            timeout,
+            max_retries,
+            max_connections
+        )
+        self._client_kwargs = client_kwargs
+        self._max_connections = max_connections
+        self._pooled: Optional[_PooledClient] = self._acquire_shared(
+            self._pool_key, client_kwargs, max_connections, _running_loop()
+        )
+        self._client = self._pooled.client
+        logger.info("OpenAI client initialized with base_url=%s", base_url)
+    
+    @property
+    def client(self) -> Any:
+        """当前事件循环使用的 AsyncOpenAI
+        
+        共享客户端在首次异步使用时绑定事件循环；换到其他事件循环后改用该循环的共享客户端，
+        不会把绑定在已关闭循环上的连接池交给新的请求
+        """
+        entry = self._pooled
+        if entry is not None and self._client is entry.client:
+            loop = _running_loop()
+            if loop is not None and entry.loop is not loop:
+                self._rebind(loop)
+        return self._client
+    
+    @client.setter
+    def client(self, value: Any) -> None:
+        self._client = value
+    
+    def _rebind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """把实例切换到 loop 上的共享客户端"""
+        entry = self._pooled
+        assert entry is not None
+        pool = type(self)._pool
+        if entry.loop is None and (loop, self._pool_key) not in pool:
+            # 首次异步使用：未绑定的共享客户端直接绑定到当前循环
+            if pool.get((None, self._pool_key)) is entry:
+                del pool[(None, self._pool_key)]
+            entry.loop = loop
+            pool[(loop, self._pool_key)] = entry
+            return
+        
+        self._pooled = self._acquire_shared(self._pool_key, self._client_kwargs, self._max_connections, loop)
+        self._client = self._pooled.client
+        if self._release(entry, self._pool_key):
+            self._close_later(entry)
+    
+    @classmethod
+    def _acquire_shared(
+        cls,
+        key: Tuple[Any, ...],
+        client_kwargs: Dict[str, Any],
+        max_connections: int,
+        loop: Optional[asyncio.AbstractEventLoop]
+    ) -> _PooledClient:
+        """获取配置对应的共享 AsyncOpenAI，不存在或已过期时新建
+        
+        Args:
+            key: 配置键
+            client_kwargs: AsyncOpenAI 的构造参数
+            max_connections: 连接池的最大连接数
+            loop: 当前事件循环，不在事件循环中时为 None
+            
+        Returns:
+            _PooledClient: 已增加引用计数的共享客户端
+        """
+        cls._prune()
+        entry = cls._pool.get((loop, key))
+        if entry is not None and time.monotonic() - entry.created > _POOL_MAX_AGE:
+            # 过期的客户端从池中移除，仍在使用它的实例关闭时再释放
+            del cls._pool[(loop, key)]
+            if entry.refs == 0:
+                cls._close_later(entry)
+            entry = None
+        
+        if entry is None:
+            http_client = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=_POOL_IDLE_TIMEOUT
+            ))
+            entry = _PooledClient(
+                client=AsyncOpenAI(**client_kwargs, http_client=http_client),
+                created=time.monotonic(),
+                loop=loop
             )
-        # 仅在 OpenAI 可用时创建客户端，避免静态分析误报
-        from typing import cast, Any
-        self.client = cast(Any, AsyncOpenAI)(**client_kwargs)
-        logger.info(f"OpenAI client initialized with base_url={base_url}")
+            cls._pool[(loop, key)] = entry
+        
+        entry.refs += 1
+        entry.idle_since = None
+        return entry
+    
+    @classmethod
+    def _prune(cls) -> None:
+        """移除事件循环已关闭的共享客户端，关闭空闲超时的共享客户端"""
+        now = time.monotonic()
+        for pool_key, entry in list(cls._pool.items()):
+            if entry.loop is not None and entry.loop.is_closed():
+                # 循环关闭时其连接已失效，无法也无需再关闭
+                del cls._pool[pool_key]
+            elif entry.idle_since is not None and now - entry.idle_since > _POOL_IDLE_TIMEOUT:
+                del cls._pool[pool_key]
+                cls._close_later(entry)
+    
+    @classmethod
+    def _release(cls, entry: _PooledClient, key: Tuple[Any, ...]) -> bool:
+        """释放一个引用
+        
+        仍在池中的客户端保留待复用，空闲超时后由 _prune 关闭
+        
+        Returns:
+            bool: 是否为已移出池的客户端的最后一个引用，需要由调用方关闭
+        """
+        entry.refs -= 1
+        if entry.refs > 0:
+            return False
+        if cls._pool.get((entry.loop, key)) is entry:
+            entry.idle_since = time.monotonic()
+            return False
+        return True
+    
+    @staticmethod
+    def _close_later(entry: _PooledClient) -> None:
+        """在绑定的事件循环中异步关闭不再使用的共享客户端
+        
+        未绑定循环的客户端从未发出请求，没有需要关闭的连接；循环已关闭时连接已随之失效
+        """
+        loop = entry.loop
+        if loop is None or loop.is_closed():
+            return
+        if _running_loop() is loop:
+            task = loop.create_task(entry.client.close())
+            _CLOSING_TASKS.add(task)
+            task.add_done_callback(_CLOSING_TASKS.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(entry.client.close(), loop)
+    
+    @classmethod
+    async def aclose_shared(cls) -> None:
+        """关闭全部共享客户端，通常在进程退出前调用"""
+        entries = list(cls._pool.values())
+        cls._pool.clear()
+        running = _running_loop()
+        for entry in entries:
+            if entry.loop is None or entry.loop is running:
+                await entry.client.close()
+            else:
+                cls._close_later(entry)
     
     async def initialize(self) -> bool:
         """初始化客户端
@@ -122,8 +344,19 @@ class OpenAIClient(BaseLLMClient):
             return False
     
     async def close(self):
-        """关闭客户端"""
-        await self.client.close()
+        """关闭客户端
+        
+        只释放对共享客户端的引用；过期客户端的最后一个引用释放时关闭其连接池，
+        仍在池中的客户端保持连接待复用，空闲超过 _POOL_IDLE_TIMEOUT 或调用 aclose_shared 时关闭
+        """
+        entry, self._pooled = self._pooled, None
+        if entry is None:
+            return
+        if self._release(entry, self._pool_key):
+            if entry.loop is _running_loop():
+                await entry.client.close()
+            else:
+                self._close_later(entry)
         logger.info("OpenAI client closed")
     
     def _handle_error(self, error: Exception) -> LLMError:
@@ -135,20 +368,21 @@ class OpenAIClient(BaseLLMClient):
         Returns:
             LLMError: 转换后的错误
         """
-        if isinstance(error, OpenAIAuthError):
-            return AuthenticationError(f"OpenAI authentication failed: {error}")
-        elif isinstance(error, OpenAIRateLimitError):
-            return RateLimitError(f"Rate limit exceeded: {error}")
-        elif isinstance(error, OpenAIConnectionError):
-            return APIConnectionError(f"Connection failed: {error}")
-        elif "context_length_exceeded" in str(error):
-            return ContextLengthExceededError(f"Context length exceeded: {error}")
-        elif "model_not_found" in str(error):
-            return ModelNotFoundError(f"Model not found: {error}")
-        elif "invalid" in str(error).lower():
+        for cls in type(error).__mro__:
+            mapped = _SDK_ERRORS.get(cls)
+            if mapped is not None:
+                error_class, prefix = mapped
+                return error_class(f"{prefix}: {error}")
+        
+        message = str(error).lower()
+        # 错误码优先于 "invalid"：上下文超长的错误类型本身就是 invalid_request_error
+        match = _ERROR_CODE_PATTERN.search(message)
+        if match is not None:
+            error_class, prefix = _ERROR_CODES[match.group()]
+            return error_class(f"{prefix}: {error}")
+        if "invalid" in message:
             return InvalidRequestError(f"Invalid request: {error}")
-        else:
-            return LLMError(f"OpenAI error: {error}")
+        return LLMError(f"OpenAI error: {error}")
     
     async def generate(
         self,
@@ -282,24 +516,48 @@ class OpenAIClient(BaseLLMClient):
             # 流式调用
             stream = await self.client.chat.completions.create(**params)
             
-            async for chunk in stream:
-                if chunk.choices:
-                    delta = chunk.choices[0].delta
-                    
-                    # 提取内容
-                    content = delta.content or ""
+            # 只合并已经读到的文本增量，不为凑批而等待；
+            # 带 finish_reason 的片段吸收缓冲的文本，工具调用片段不合并以保持顺序
+            async for batch in prefetch_batches(stream, _STREAM_PREFETCH):
+                buffered: List[str] = []
+                last_model = ""
+                for chunk in batch:
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    delta = choice.delta
+                    last_model = chunk.model
                     
                     # 提取工具调用
                     tool_calls = None
                     if hasattr(delta, 'tool_calls') and delta.tool_calls:
                         tool_calls = [tc.model_dump() for tc in delta.tool_calls]
                     
+                    if tool_calls is None and choice.finish_reason is None:
+                        if delta.content:
+                            buffered.append(delta.content)
+                            if len(buffered) >= _STREAM_COALESCE:
+                                yield StreamChunk(content="".join(buffered), model=last_model)
+                                buffered.clear()
+                        continue
+                    
+                    content = delta.content or ""
+                    if tool_calls is not None and buffered:
+                        yield StreamChunk(content="".join(buffered), model=last_model)
+                        buffered.clear()
+                    elif buffered:
+                        content = "".join(buffered) + content
+                        buffered.clear()
+                    
                     yield StreamChunk(
                         content=content,
                         model=chunk.model,
-                        finish_reason=chunk.choices[0].finish_reason,
+                        finish_reason=choice.finish_reason,
                         tool_calls=tool_calls
                     )
+                
+                if buffered:
+                    yield StreamChunk(content="".join(buffered), model=last_model)
             
             logger.debug("Streaming generation completed")
             
@@ -389,38 +647,159 @@ class OpenAIClient(BaseLLMClient):
         self,
         texts: List[str],
         model: str = "text-embedding-ada-002",
+        batch_size: int = 96,
+        max_concurrency: int = 8,
         **kwargs
     ) -> List[List[float]]:
         """创建文本嵌入
         
+        文本按 batch_size 分批，各批次并发请求，避免单个请求超出条目上限
+        
         Args:
             texts: 文本列表
             model: 模型名称
+            batch_size: 每个请求包含的文本数
+            max_concurrency: 最大并发请求数
             **kwargs: 其他参数
             
         Returns:
-            List[List[float]]: 嵌入向量列表
+            List[List[float]]: 嵌入向量列表，顺序与 texts 一致
         """
         try:
-            logger.debug(f"Creating embeddings for {len(texts)} texts")
+            logger.debug("Creating embeddings for %d texts", len(texts))
             
-            # 调用 API
-            response = await self.client.embeddings.create(
-                model=model,
-                input=texts,
-                **kwargs
-            )
+            semaphore = asyncio.Semaphore(max_concurrency)
+            
+            async def embed_batch(batch: List[str]) -> List[List[float]]:
+                async with semaphore:
+                    response = await self.client.embeddings.create(
+                        model=model,
+                        input=batch,
+                        **kwargs
+                    )
+                # 按 index 排序，不依赖服务端返回顺序
+                return [data.embedding for data in sorted(response.data, key=lambda d: d.index)]
             
-            # 提取嵌入向量
-            embeddings = [data.embedding for data in response.data]
+            # 任一批次失败时取消其余请求
+            batches = await gather_or_cancel(
+                embed_batch(texts[i:i + batch_size])
+                for i in range(0, len(texts), batch_size)
+            )
+            embeddings = [vector for batch in batches for vector in batch]
             
-            logger.debug(f"Embeddings created: {len(embeddings)} vectors")
+            logger.debug("Embeddings created: %d vectors", len(embeddings))
             return embeddings
             
         except Exception as e:
             logger.error(f"Embeddings creation failed: {e}")
             raise self._handle_error(e)
     
+    async def generate_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        endpoint: str = "/v1/chat/completions",
+        completion_window: str = "24h"
+    ) -> str:
+        """通过 Batch API 提交一批离线请求
+        
+        Batch API 价格约为同步接口的一半、速率上限更高，适合没有实时性要求的批量任务。
+        第 i 个请求的 custom_id 为 str(i)，poll_batch 返回的结果按它对应
+        
+        Args:
+            requests: 请求参数列表，每项与 chat.completions.create 的参数相同
+            endpoint: 批量调用的接口
+            completion_window: 完成时限
+            
+        Returns:
+            str: 批次 ID
+        """
+        try:
+            lines = b"\n".join(
+                dumps_json({"custom_id": str(i), "method": "POST", "url": endpoint, "body": body})
+                for i, body in enumerate(requests)
+            )
+            input_file = await self.client.files.create(file=("batch.jsonl", lines), purpose="batch")
+            batch = await self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=endpoint,
+                completion_window=completion_window
+            )
+            
+            logger.info("Batch %s submitted with %d requests", batch.id, len(requests))
+            return batch.id
+            
+        except Exception as e:
+            logger.error("Batch submission failed: %s", e)
+            raise self._handle_error(e)
+    
+    async def poll_batch(
+        self,
+        batch_id: str,
+        poll_interval: float = 5.0,
+        max_interval: float = 300.0
+    ) -> AsyncIterator[Tuple[str, LLMResponse]]:
+        """等待批次结束并逐条返回结果
+        
+        轮询间隔从 poll_interval 开始按指数增长，不超过 max_interval。
+        批次过期或被取消时仍返回已完成的部分；失败的单个请求记录日志后跳过
+        
+        Args:
+            batch_id: generate_batch 返回的批次 ID
+            poll_interval: 初始轮询间隔（秒）
+            max_interval: 最大轮询间隔（秒）
+            
+        Yields:
+            Tuple[str, LLMResponse]: (custom_id, 生成结果)
+        """
+        try:
+            delay = poll_interval
+            while True:
+                batch = await self.client.batches.retrieve(batch_id)
+                if batch.status in _BATCH_TERMINAL_STATUSES:
+                    break
+                await asyncio.sleep(delay)
+                delay = min(max_interval, delay * 2)
+            
+            if not batch.output_file_id:
+                raise LLMError(f"Batch {batch_id} {batch.status} without output")
+            
+            output = await self.client.files.content(batch.output_file_id)
+        except LLMError:
+            raise
+        except Exception as e:
+            logger.error("Batch polling failed: %s", e)
+            raise self._handle_error(e)
+        
+        logger.debug("Batch %s %s, reading results", batch_id, batch.status)
+        for line in output.content.splitlines():
+            if not line:
+                continue
+            item = loads_json(line)
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                logger.warning("Batch request %s failed: %s", item.get("custom_id"), item.get("error") or response)
+                continue
+            yield item["custom_id"], self._response_from_dict(response["body"])
+    
+    @staticmethod
+    def _response_from_dict(body: Dict[str, Any]) -> LLMResponse:
+        """把 chat.completions 的 JSON 响应转换为 LLMResponse"""
+        choice = body["choices"][0]
+        message = choice.get("message") or {}
+        usage = body.get("usage") or {}
+        return LLMResponse(
+            content=message.get("content") or "",
+            model=body.get("model", ""),
+            finish_reason=choice.get("finish_reason"),
+            tool_calls=message.get("tool_calls") or None,
+            usage={
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "completion_tokens": usage.get("completion_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0)
+            },
+            raw_response=body
+        )
+    
     async def get_model_info(self, model: str) -> ModelInfo:
         """获取模型信息
         
@@ -484,3 +863,7 @@ class OpenAIClient(BaseLLMClient):
         """获取最大输出 token 数"""
         # 通常是上下文窗口的一部分
         return self._get_context_window(model) // 2
+    
+    def _get_default_model(self) -> str:
+        """获取默认模型"""
+        return "gpt-3.5-turbo"
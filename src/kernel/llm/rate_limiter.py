@@ -0,0 +1,83 @@
+"""
+客户端限流
+
+在请求发出前按速率限制，避免并发请求超出提供商配额后集中收到 429
+"""
+
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """异步令牌桶
+
+    令牌按固定速率补充，取用时按经过的时间惰性计算，不需要后台任务。
+    等待的调用方按到达顺序依次获得令牌。
+    收到 429 时可以调用 penalize 临时降低速率，之后逐渐恢复
+    """
+
+    # 每次惩罚的速率倍数、速率下限（相对初始速率）、每秒恢复的比例
+    PENALTY_FACTOR = 0.9
+    MIN_RATE_RATIO = 0.1
+    RECOVERY_PER_SECOND = 0.01
+
+    def __init__(self, rate: float, capacity: float):
+        """初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量，即允许的最大突发请求数
+        """
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        # asyncio.Lock 按等待顺序唤醒，保证先到先得
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, rpm: float) -> "AsyncTokenBucket":
+        """按每分钟请求数创建令牌桶，容量为一分钟的配额"""
+        return cls(rate=rpm / 60.0, capacity=rpm)
+
+    def _refill(self) -> None:
+        """按经过的时间补充令牌，并逐渐恢复被降低的速率"""
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        if self.rate < self.base_rate:
+            self.rate = min(
+                self.base_rate,
+                self.rate + self.base_rate * self.RECOVERY_PER_SECOND * elapsed
+            )
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """取用令牌，不足时等待
+
+        Args:
+            tokens: 需要的令牌数
+
+        Raises:
+            ValueError: tokens 超过桶容量，永远无法满足
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}")
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def penalize(self) -> None:
+        """服务端限流时调用：清空令牌并降低速率，避免等待中的请求同时重试"""
+        self._refill()
+        self._tokens = 0.0
+        self.rate = max(self.base_rate * self.MIN_RATE_RATIO, self.rate * self.PENALTY_FACTOR)
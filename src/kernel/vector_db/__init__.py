@@ -98,17 +98,14 @@ def create_vector_db(
     if auto_initialize:
         import asyncio
         try:
-            # 尝试在现有事件循环中初始化
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # 如果循环正在运行，创建一个任务
-                asyncio.create_task(db_instance.initialize())
-            else:
-                # 如果循环未运行，同步执行
-                loop.run_until_complete(db_instance.initialize())
+            # 只检查正在运行的循环，不经过事件循环策略，也不会隐式创建新循环
+            asyncio.get_running_loop()
         except RuntimeError:
-            # 没有事件循环，创建一个新的
+            # 没有运行中的事件循环，同步执行
             asyncio.run(db_instance.initialize())
+        else:
+            # 如果循环正在运行，创建一个任务
+            asyncio.create_task(db_instance.initialize())
     
     return db_instance
 
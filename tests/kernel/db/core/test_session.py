@@ -1,6 +1,7 @@
 import pytest
 from sqlalchemy import text
 
+from kernel.db.core.exceptions import SessionError
 from kernel.db.core.session import SessionManager
 
 
@@ -28,3 +29,41 @@ def test_session_scope_commits_and_rolls_back(sqlite_engine):
         values = session.execute(text("SELECT body FROM notes ORDER BY id"))
         bodies = values.scalars().all()
     assert bodies == ["hello"]
+
+
+@pytest.mark.asyncio
+async def test_async_session_scope_commits_and_rolls_back(tmp_path):
+    pytest.importorskip("aiosqlite")
+    asyncio_ext = pytest.importorskip("sqlalchemy.ext.asyncio")
+
+    engine = asyncio_ext.create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)"))
+
+        session_manager = SessionManager(engine)
+        assert session_manager.is_async
+
+        async with session_manager.async_session_scope() as session:
+            await session.execute(text("INSERT INTO notes (body) VALUES (:body)"), {"body": "hello"})
+
+        with pytest.raises(RuntimeError):
+            async with session_manager.async_session_scope() as session:
+                await session.execute(text("INSERT INTO notes (body) VALUES (:body)"), {"body": "fail"})
+                raise RuntimeError("force rollback")
+
+        async with session_manager.async_session_scope() as session:
+            values = await session.execute(text("SELECT body FROM notes ORDER BY id"))
+            bodies = values.scalars().all()
+        assert bodies == ["hello"]
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_async_session_scope_rejects_sync_engine(sqlite_engine):
+    session_manager = SessionManager(sqlite_engine)
+
+    with pytest.raises(SessionError):
+        async with session_manager.async_session_scope():
+            pass
@@ -0,0 +1,228 @@
+from pathlib import Path
+import sys
+import threading
+import time
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+MOFOX_SRC_PATH = PROJECT_ROOT / "src"
+if str(MOFOX_SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(MOFOX_SRC_PATH))
+
+from kernel.db.optimization import CacheManager, LocalCache, create_local_cache_manager
+
+
+def test_get_or_set_runs_factory_once_for_concurrent_misses():
+    manager = CacheManager()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(manager.get_or_set("key", factory)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+    assert manager.get("key") == "value"
+
+
+def test_get_or_set_propagates_factory_error():
+    manager = CacheManager()
+
+    def factory():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        manager.get_or_set("key", factory)
+    assert manager._inflight == {}
+    assert manager.get_or_set("key", lambda: 1) == 1
+
+
+def test_cached_decorator_with_prefix():
+    manager = create_local_cache_manager(key_prefix="app")
+    calls = []
+
+    @manager.cached(ttl=60)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert square(3) == 9
+    assert square(3) == 9
+    assert calls == [3]
+
+
+@pytest.mark.parametrize("prefix", ["", "app"])
+def test_batch_operations_round_trip_keys(prefix):
+    manager = create_local_cache_manager(key_prefix=prefix)
+
+    assert manager.set_many({"a": 1, "b": 2})
+    assert manager.get_many(["a", "b", "missing"]) == {"a": 1, "b": 2}
+    assert manager.delete_many(["a", "missing"]) == 1
+    assert manager.get_many(["a", "b"]) == {"b": 2}
+
+
+def test_generated_key_is_stable_and_type_aware():
+    manager = CacheManager()
+
+    def func(*args, **kwargs):
+        return None
+
+    prefix, hasher = manager._key_hasher(func)
+    key = manager._generate_cache_key(prefix, hasher, (1, "a"), {"x": 1, "y": {2}})
+    assert key == manager._generate_cache_key(prefix, hasher, (1, "a"), {"y": {2}, "x": 1})
+    assert key.startswith(f"func:{func.__module__}.{func.__qualname__}:")
+    assert len(key.rsplit(":", 1)[1]) == 22
+    assert manager._generate_cache_key(prefix, hasher, ((1, 2),), {}) != manager._generate_cache_key(
+        prefix, hasher, ([1, 2],), {}
+    )
+    # 不可 pickle 的参数也能生成键
+    manager._generate_cache_key(prefix, hasher, (lambda: None,), {})
+
+
+def test_generated_key_ignores_dict_and_set_order():
+    manager = CacheManager()
+    prefix, hasher = manager._key_hasher(test_generated_key_ignores_dict_and_set_order)
+
+    def key(*args, **kwargs):
+        return manager._generate_cache_key(prefix, hasher, args, kwargs)
+
+    assert key({"a": 1, "b": 2}) == key({"b": 2, "a": 1})
+    assert key(filter={"tags": ["x"], "ids": {3, 1, 2}}) == key(filter={"ids": {2, 3, 1}, "tags": ["x"]})
+    assert key({1: "a", "b": 2}) == key({"b": 2, 1: "a"})
+    assert key({"a": 1}) != key([("a", 1)])
+    assert key({1, 2}) != key((1, 2))
+
+
+def test_generated_key_ignores_object_identity():
+    manager = CacheManager()
+    prefix, hasher = manager._key_hasher(test_generated_key_ignores_object_identity)
+
+    def key(*args, **kwargs):
+        return manager._generate_cache_key(prefix, hasher, args, kwargs)
+
+    s = "x" * 10
+    copy_of_s = "".join(["x"] * 10)
+    assert copy_of_s is not s
+    assert key(s, s) == key(s, copy_of_s)
+    items = [1, 2]
+    assert key(items, items) == key(items, [1, 2])
+    # 自引用的参数退回 repr
+    loop = []
+    loop.append(loop)
+    key(loop)
+
+
+def test_cached_memoized_keys_match_generated_keys():
+    manager = CacheManager()
+    calls = []
+
+    @manager.cached()
+    def echo(value, flag=None):
+        calls.append(value)
+        return value
+
+    assert echo(1) == 1
+    assert echo(True) is True
+    assert echo("a", flag=2) == "a"
+    assert echo(1) == 1
+    assert calls == [1, True, "a"]
+    key = manager._generate_cache_key(*manager._key_hasher(echo.__wrapped__), ("a",), {"flag": 2})
+    assert manager.exists(key)
+
+
+def test_get_or_set_delegates_to_native_backend():
+    class AtomicCache(LocalCache):
+        def __init__(self):
+            super().__init__()
+            self.calls = []
+
+        def get_or_set(self, key, factory, ttl=None):
+            self.calls.append((key, ttl))
+            return super().get_or_set(key, factory, ttl)
+
+    backend = AtomicCache()
+    manager = CacheManager(backend=backend, default_ttl=30, key_prefix="app")
+
+    assert manager.get_or_set("key", lambda: "value") == "value"
+    assert backend.calls == [("app:key", 30)]
+    assert manager.get("key") == "value"
+
+
+def test_cached_batch_only_computes_misses():
+    manager = create_local_cache_manager(key_prefix="app")
+    batches = []
+
+    @manager.cached_batch()
+    def double(values, factor=2):
+        batches.append(list(values))
+        return [value * factor for value in values]
+
+    assert double([1, 2]) == [2, 4]
+    assert double([2, 3, 3, 1]) == [4, 6, 6, 2]
+    assert batches == [[1, 2], [3]]
+    assert double([1], factor=3) == [3]
+
+
+def test_cached_batch_rejects_mismatched_results():
+    manager = CacheManager()
+
+    @manager.cached_batch()
+    def broken(values):
+        return values[:-1]
+
+    with pytest.raises(ValueError):
+        broken(["a", "b"])
+
+
+def test_none_results_are_cached():
+    manager = CacheManager()
+    calls = []
+
+    @manager.cached()
+    def lookup(key):
+        calls.append(key)
+        return None
+
+    assert lookup("a") is None
+    assert lookup("a") is None
+    assert calls == ["a"]
+
+    assert manager.get_or_set("empty", lambda: None) is None
+    assert manager.get_or_set("empty", lambda: "recomputed") is None
+    assert manager.get("empty", "default") is None
+    assert manager.get("absent", "default") == "default"
+    assert manager.get_many(["empty", "absent"]) == {"empty": None}
+
+
+def test_backend_with_legacy_get_signature():
+    class LegacyCache(LocalCache):
+        def get(self, key):
+            return super().get(key)
+
+    backend = LegacyCache()
+    manager = CacheManager(backend=backend)
+    calls = []
+
+    @manager.cached()
+    def square(value):
+        calls.append(value)
+        return value * value
+
+    assert square(3) == 9
+    assert square(3) == 9
+    assert calls == [3]
+    assert manager.get("absent", "default") == "default"
+    assert manager.get_or_set("key", lambda: "value") == "value"
+    assert backend.get_or_set("key", lambda: "other") == "value"
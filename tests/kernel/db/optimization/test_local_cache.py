@@ -0,0 +1,153 @@
+from pathlib import Path
+import sys
+import time
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+MOFOX_SRC_PATH = PROJECT_ROOT / "src"
+if str(MOFOX_SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(MOFOX_SRC_PATH))
+
+from kernel.db.optimization.backends.local_cache import LocalCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LocalCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.exists("a")
+    assert not cache.exists("b")
+    assert cache.get("c") == 3
+
+
+def test_sampled_lru_evicts_oldest_candidate():
+    # sample_size 不小于容量时采样覆盖全部键，结果是确定的
+    cache = LocalCache(max_size=3, policy="sampled_lru", sample_size=3)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    cache.get("a")
+    cache.get("b")
+
+    cache.set("d", "d")
+
+    assert cache.size() == 3
+    assert not cache.exists("c")
+    assert cache.get("a") == "a"
+
+
+def test_sampled_lru_delete_keeps_sampling_slots_consistent():
+    cache = LocalCache(max_size=10, policy="sampled_lru")
+    for i in range(5):
+        cache.set(f"k{i}", i)
+    assert cache.delete("k1")
+    assert cache.delete("k4")
+
+    assert sorted(cache._keys) == ["k0", "k2", "k3"]
+    assert all(cache._keys[slot] == key for key, slot in cache._slot_of.items())
+
+
+def test_tinylfu_rejects_cold_newcomer():
+    cache = LocalCache(max_size=1, policy="tinylfu")
+    cache.set("hot", 1)
+    for _ in range(3):
+        cache.get("hot")
+
+    assert cache.set("cold", 2) is False
+    assert cache.get("hot") == 1
+    assert cache.get("cold") is None
+
+
+def test_tinylfu_admits_new_counters():
+    cache = LocalCache(max_size=1, policy="tinylfu")
+    cache.set("hot", 1)
+    for _ in range(3):
+        cache.get("hot")
+
+    assert cache.increment("new") == 1
+    assert cache.exists("new")
+    assert cache.increment("new") == 2
+
+
+def test_increment_does_not_deadlock():
+    cache = LocalCache()
+    assert cache.increment("counter") == 1
+    assert cache.increment("counter", 4) == 5
+    assert cache.decrement("counter", 2) == 3
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        LocalCache(policy="fifo")
+
+
+def test_background_cleanup_purges_expired_entries():
+    cache = LocalCache(cleanup_interval=0.01)
+    try:
+        cache.set("short", 1, ttl=1)
+        cache.set("long", 2, ttl=60)
+        cache._cache["short"].expires_at = 0  # 强制过期
+
+        deadline = time.time() + 2
+        while cache.size() > 1 and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert cache.size() == 1
+        assert cache.get("long") == 2
+    finally:
+        cache.close()
+
+
+def test_increment_keeps_existing_expiry():
+    cache = LocalCache()
+    cache.set("counter", 1, ttl=10)
+    expires_at = cache._cache["counter"].expires_at
+
+    assert cache.increment("counter") == 2
+    assert cache._cache["counter"].expires_at == expires_at
+
+
+@pytest.mark.parametrize("policy", ["lru", "sampled_lru"])
+def test_set_many_evicts_overflow_up_front(policy):
+    cache = LocalCache(max_size=4, policy=policy, sample_size=10)
+    cache.set_many({"a": 1, "b": 2, "c": 3})
+
+    cache.set_many({"b": 20, "d": 4, "e": 5})
+
+    assert cache.size() == 4
+    assert not cache.exists("a")
+    assert cache.get_many(["b", "c", "d", "e"]) == {"b": 20, "c": 3, "d": 4, "e": 5}
+
+
+@pytest.mark.parametrize("policy", ["lru", "sampled_lru", "tinylfu"])
+def test_set_many_with_zero_capacity_terminates(policy):
+    cache = LocalCache(max_size=0, policy=policy)
+    cache.set("a", 1)
+
+    cache.set_many({"a": 1, "b": 2})
+
+    assert cache.size() == 1
+    assert cache.get("b") == 2
+
+
+def test_sampled_victim_falls_back_when_samples_are_excluded():
+    cache = LocalCache(max_size=10, policy="sampled_lru", sample_size=1)
+    cache.set_many({str(i): i for i in range(10)})
+
+    victim = cache._select_victim(exclude={str(i) for i in range(9)})
+
+    assert victim == "9"
+
+
+def test_get_distinguishes_cached_none_from_miss():
+    cache = LocalCache()
+    marker = object()
+    cache.set("none", None)
+
+    assert cache.get("none", marker) is None
+    assert cache.get("absent", marker) is marker
+    assert cache.get_many(["none", "absent"]) == {"none": None}
@@ -0,0 +1,160 @@
+"""
+base_client 数据类测试
+"""
+
+import asyncio
+import pickle
+
+import pytest
+
+from kernel.llm.model_client import base_client
+from kernel.llm.model_client.base_client import (
+    LLMResponse,
+    ModelCapability,
+    ModelInfo,
+    StreamChunk,
+    gather_or_cancel,
+)
+
+
+@pytest.mark.parametrize("instance", [
+    LLMResponse("hi", "m", usage={"total_tokens": 1}),
+    StreamChunk(content="hi", model="m"),
+    ModelInfo("p", "m", [ModelCapability.CHAT], 8),
+])
+def test_response_types_are_slotted_and_picklable(instance):
+    assert not hasattr(instance, "__dict__")
+    assert pickle.loads(pickle.dumps(instance)) == instance
+
+
+def test_model_info_normalizes_capabilities_to_set():
+    info = ModelInfo("p", "m", [ModelCapability.CHAT, ModelCapability.CHAT], 8)
+
+    assert info.capabilities == {ModelCapability.CHAT}
+
+
+class TestGatherOrCancel:
+    """测试失败即取消的并发执行"""
+
+    @pytest.mark.asyncio
+    async def test_results_keep_input_order(self):
+        async def delayed(value, delay):
+            await asyncio.sleep(delay)
+            return value
+
+        assert await gather_or_cancel([delayed(1, 0.02), delayed(2, 0)]) == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_failure_cancels_siblings_and_keeps_error_type(self):
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def fail():
+            raise KeyError("boom")
+
+        with pytest.raises(KeyError):
+            await gather_or_cancel([slow(), fail()])
+
+        assert cancelled.is_set()
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_json_sort_keys(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(base_client, "orjson", None)
+
+    assert base_client.dumps_json({"b": 1, "a": "é"}, sort_keys=True) == '{"a":"é","b":1}'.encode()
+    assert base_client.dumps_json({"b": 1, "a": 2}) == b'{"b":1,"a":2}'
+
+
+def test_backoff_delay_prefers_retry_after():
+    assert base_client.backoff_delay(0, 1.0, "2.5") == 2.5
+    assert 4.0 <= base_client.backoff_delay(2, 1.0, None) <= 6.0
+    assert 30.0 <= base_client.backoff_delay(10, 1.0, "soon") <= 45.0
+
+
+def test_backoff_delay_caps_retry_after():
+    assert base_client.backoff_delay(0, 1.0, "30") == 30.0
+    assert base_client.backoff_delay(0, 1.0, "120") is None
+    assert base_client.backoff_delay(0, 1.0, "5", max_delay=2.0) is None
+    assert 2.0 <= base_client.backoff_delay(10, 1.0, None, max_delay=2.0) <= 3.0
+
+
+class TestPrefetch:
+    """测试后台预读取"""
+
+    @staticmethod
+    async def numbers(count, error=None, log=None):
+        for i in range(count):
+            if log is not None:
+                log.append(i)
+            yield i
+        if error is not None:
+            raise error
+
+    @pytest.mark.asyncio
+    async def test_yields_items_in_order(self):
+        assert [i async for i in base_client.prefetch(self.numbers(20), maxsize=3)] == list(range(20))
+
+    @pytest.mark.asyncio
+    async def test_reads_ahead_up_to_maxsize(self):
+        log = []
+        items = base_client.prefetch(self.numbers(20, log=log), maxsize=3)
+
+        assert await items.__anext__() == 0
+        await asyncio.sleep(0.01)
+
+        # 已取出 1 个，队列中 3 个，reader 正阻塞在第 5 个的 put 上
+        assert log == [0, 1, 2, 3, 4]
+        await items.aclose()
+
+    @pytest.mark.asyncio
+    async def test_reader_errors_are_raised_after_buffered_items(self):
+        received = []
+
+        with pytest.raises(ValueError):
+            async for i in base_client.prefetch(self.numbers(2, error=ValueError("boom"))):
+                received.append(i)
+
+        assert received == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_early_exit_cancels_reader(self):
+        closed = asyncio.Event()
+
+        async def endless():
+            try:
+                while True:
+                    yield 1
+            finally:
+                closed.set()
+
+        items = base_client.prefetch(endless(), maxsize=2)
+        assert await items.__anext__() == 1
+        await items.aclose()
+
+        assert closed.is_set()
+
+    @pytest.mark.asyncio
+    async def test_batches_contain_already_buffered_items(self):
+        batches = [batch async for batch in base_client.prefetch_batches(self.numbers(20), maxsize=4)]
+
+        assert [i for batch in batches for i in batch] == list(range(20))
+        assert all(1 <= len(batch) <= 5 for batch in batches)
+        assert len(batches) < 20
+
+    @pytest.mark.asyncio
+    async def test_batch_errors_are_raised_after_buffered_items(self):
+        received = []
+
+        with pytest.raises(ValueError):
+            async for batch in base_client.prefetch_batches(self.numbers(3, error=ValueError("boom"))):
+                received.extend(batch)
+
+        assert received == [0, 1, 2]
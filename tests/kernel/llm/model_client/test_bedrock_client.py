@@ -0,0 +1,565 @@
+"""
+BedrockClient 测试
+
+用假的 bedrock-runtime 客户端替换 aioboto3 客户端，不访问 AWS
+"""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aioboto3")
+
+from kernel.llm.exceptions import InvalidRequestError, LLMError, RateLimitError
+from kernel.llm.model_client.bedrock_client import BedrockClient, ClientError
+
+
+class FakeBody:
+    """模拟 aiobotocore 的 StreamingBody"""
+
+    def __init__(self, payload: dict):
+        self._data = json.dumps(payload).encode()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def read(self) -> bytes:
+        return self._data
+
+
+class FakeEventStream:
+    """模拟 invoke_model_with_response_stream 返回的事件流"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            yield {"chunk": {"bytes": json.dumps(chunk).encode()}}
+
+
+class FakeRuntime:
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def invoke_model(self, modelId, body):
+        request = json.loads(body)
+        self.calls.append((modelId, request))
+        if "inputText" in request and "embed" in modelId:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            # 文本越长返回越快，打乱完成顺序
+            await asyncio.sleep(0.01 / len(request["inputText"]))
+            self.in_flight -= 1
+            return {"body": FakeBody({"embedding": [float(len(request["inputText"]))]})}
+        if "tools" in request:
+            return {"body": FakeBody({
+                "content": [
+                    {"type": "text", "text": "calling"},
+                    {"type": "tool_use", "id": "t1", "name": "lookup", "input": {"q": "x"}},
+                ],
+                "usage": {"input_tokens": 3, "output_tokens": 2},
+                "stop_reason": "tool_use",
+            })}
+        return {"body": FakeBody({
+            "content": [{"text": "hello"}],
+            "usage": {"input_tokens": 3, "output_tokens": 2},
+            "stop_reason": "end_turn",
+        })}
+
+    async def invoke_model_with_response_stream(self, modelId, body):
+        self.calls.append((modelId, json.loads(body)))
+        return {"body": FakeEventStream([
+            {"type": "content_block_delta", "delta": {"text": "he"}},
+            {"type": "content_block_delta", "delta": {"text": "llo"}},
+        ])}
+
+
+@pytest.fixture
+def client():
+    client = BedrockClient(
+        region_name="us-east-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test"
+    )
+    client._client = FakeRuntime()
+    return client
+
+
+CLAUDE = "anthropic.claude-3-sonnet-20240229-v1:0"
+
+
+class TestBedrockClient:
+    @pytest.mark.asyncio
+    async def test_generate_reads_async_body(self, client):
+        response = await client.generate(
+            [{"role": "system", "content": "sys"}, {"role": "user", "content": "hi"}],
+            model=CLAUDE
+        )
+
+        assert response.content == "hello"
+        assert response.usage["total_tokens"] == 5
+        model, body = client._client.calls[0]
+        assert model == CLAUDE
+        assert body["system"] == "sys"
+        assert body["max_tokens"] == 2048
+
+    @pytest.mark.asyncio
+    async def test_stream_generate_iterates_async_events(self, client):
+        chunks = [c.content async for c in client.stream_generate([{"role": "user", "content": "hi"}], model=CLAUDE)]
+
+        assert chunks == ["he", "llo"]
+
+    @pytest.mark.asyncio
+    async def test_generate_with_tools(self, client):
+        tools = [{"type": "function", "function": {"name": "lookup", "description": "d", "parameters": {}}}]
+
+        response = await client.generate_with_tools([{"role": "user", "content": "hi"}], tools, model=CLAUDE)
+
+        assert response.content == "calling"
+        assert response.tool_calls[0]["function"]["name"] == "lookup"
+        assert json.loads(response.tool_calls[0]["function"]["arguments"]) == {"q": "x"}
+
+    @pytest.mark.asyncio
+    async def test_create_embeddings_preserves_order(self, client):
+        embeddings = await client.create_embeddings(["a", "bbb", "cc"])
+
+        assert embeddings == [[1.0], [3.0], [2.0]]
+
+    @pytest.mark.asyncio
+    async def test_create_embeddings_respects_max_concurrency(self, client):
+        embeddings = await client.create_embeddings(["a"] * 10, max_concurrency=3)
+
+        assert len(embeddings) == 10
+        assert client._client.max_in_flight == 3
+
+    @pytest.mark.asyncio
+    async def test_close_releases_runtime_client(self, client):
+        await client.close()
+
+        assert client._client is None
+
+
+class TestResponseCache:
+    MESSAGES = [{"role": "user", "content": "hi"}]
+
+    @pytest.fixture(autouse=True)
+    def enable_cache(self, client):
+        client.response_cache_size = 1024
+
+    @pytest.mark.asyncio
+    async def test_deterministic_generate_is_cached(self, client):
+        first = await client.generate(self.MESSAGES, model=CLAUDE, temperature=0)
+        second = await client.generate(self.MESSAGES, model=CLAUDE, temperature=0)
+
+        assert second == first
+        assert len(client._client.calls) == 1
+        assert client.stats == {"hits": 1, "misses": 1}
+
+    @pytest.mark.asyncio
+    async def test_cache_is_disabled_by_default(self):
+        client = BedrockClient(region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test")
+        client._client = FakeRuntime()
+
+        await client.generate(self.MESSAGES, model=CLAUDE, temperature=0)
+        await client.generate(self.MESSAGES, model=CLAUDE, temperature=0)
+
+        assert len(client._client.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_callers_cannot_corrupt_cached_responses(self, client):
+        first = await client.generate(self.MESSAGES, model=CLAUDE, temperature=0)
+        first.usage["total_tokens"] = -1
+        first.content = "changed"
+
+        second = await client.generate(self.MESSAGES, model=CLAUDE, temperature=0)
+        second.usage.clear()
+        third = await client.generate(self.MESSAGES, model=CLAUDE, temperature=0)
+
+        assert second.content == third.content == "hello"
+        assert third.usage["total_tokens"] == 5
+
+    @pytest.mark.asyncio
+    async def test_sampled_generate_is_not_cached(self, client):
+        await client.generate(self.MESSAGES, model=CLAUDE, temperature=0.7)
+        await client.generate(self.MESSAGES, model=CLAUDE, temperature=0.7)
+
+        assert len(client._client.calls) == 2
+        assert client.stats == {"hits": 0, "misses": 0}
+
+    @pytest.mark.asyncio
+    async def test_parameters_are_part_of_the_key(self, client):
+        await client.generate(self.MESSAGES, model=CLAUDE, temperature=0, max_tokens=10)
+        await client.generate(self.MESSAGES, model=CLAUDE, temperature=0, max_tokens=20)
+
+        assert len(client._client.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, client):
+        client.response_cache_size = 1
+        await client.generate([{"role": "user", "content": "a"}], model=CLAUDE, temperature=0)
+        await client.generate([{"role": "user", "content": "b"}], model=CLAUDE, temperature=0)
+        await client.generate([{"role": "user", "content": "a"}], model=CLAUDE, temperature=0)
+
+        assert len(client._client.calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_refetched(self, client):
+        client.response_cache_ttl = 0
+        await client.generate(self.MESSAGES, model=CLAUDE, temperature=0)
+        await client.generate(self.MESSAGES, model=CLAUDE, temperature=0)
+
+        assert len(client._client.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_tool_calls_are_cached(self, client):
+        tools = [{"type": "function", "function": {"name": "lookup", "description": "d", "parameters": {}}}]
+
+        await client.generate_with_tools(self.MESSAGES, tools, model=CLAUDE, temperature=0)
+        await client.generate_with_tools(self.MESSAGES, tools, model=CLAUDE, temperature=0)
+
+        assert len(client._client.calls) == 1
+        assert client._client.calls[0][1]["temperature"] == 0
+
+
+class TestModelFamilyDispatch:
+    LLAMA = "meta.llama3-8b-instruct-v1:0"
+    TITAN = "amazon.titan-text-express-v1"
+
+    @pytest.mark.asyncio
+    async def test_llama_config_and_parsing(self, client):
+        async def invoke_model(modelId, body):
+            client._client.calls.append((modelId, json.loads(body)))
+            return {"body": FakeBody({"generation": "hey", "prompt_token_count": 4, "generation_token_count": 1})}
+
+        client._client.invoke_model = invoke_model
+
+        response = await client.generate([{"role": "user", "content": "hi"}], model=self.LLAMA, max_tokens=5)
+
+        body = client._client.calls[0][1]
+        assert body["prompt"] == "[INST] hi [/INST]"
+        assert body["max_gen_len"] == 5
+        assert response.content == "hey"
+        assert response.usage == {"prompt_tokens": 4, "completion_tokens": 1, "total_tokens": 5}
+
+    @pytest.mark.asyncio
+    async def test_titan_config_and_parsing(self, client):
+        async def invoke_model(modelId, body):
+            client._client.calls.append((modelId, json.loads(body)))
+            return {"body": FakeBody({
+                "inputTextTokenCount": 2,
+                "results": [{"outputText": "ok", "tokenCount": 1, "completionReason": "FINISH"}],
+            })}
+
+        client._client.invoke_model = invoke_model
+
+        response = await client.generate([{"role": "user", "content": "hi"}], model=self.TITAN, stop=["\n"])
+
+        body = client._client.calls[0][1]
+        assert body["inputText"] == "user: hi"
+        assert body["textGenerationConfig"]["stopSequences"] == ["\n"]
+        assert (response.content, response.finish_reason) == ("ok", "FINISH")
+
+    @pytest.mark.asyncio
+    async def test_unknown_model_uses_claude_messages_without_config(self, client):
+        async def invoke_model(modelId, body):
+            client._client.calls.append((modelId, json.loads(body)))
+            return {"body": FakeBody({"answer": 42})}
+
+        client._client.invoke_model = invoke_model
+
+        response = await client.generate([{"role": "user", "content": "hi"}], model="cohere.command-r")
+
+        assert client._client.calls[0][1] == {"messages": [{"role": "user", "content": "hi"}]}
+        assert response.content == str({"answer": 42})
+
+
+class TestMessageConversion:
+    MESSAGES = [
+        {"role": "system", "content": "be brief"},
+        {"role": "user", "content": "hi"},
+        {"role": "tool", "content": "ignored"},
+        {"role": "assistant", "content": "hello"},
+    ]
+
+    def test_llama_prompt(self, client):
+        prompt = client._convert_to_llama_format(self.MESSAGES)["prompt"]
+
+        assert prompt == "<<SYS>>\nbe brief\n<</SYS>>\n\n[INST] hi [/INST]\n\nhello"
+
+    def test_titan_input_text(self, client):
+        text = client._convert_to_titan_format(self.MESSAGES[:2])["inputText"]
+
+        assert text == "system: be brief\n\nuser: hi"
+
+    def test_claude_format_keeps_last_system_prompt(self, client):
+        body = client._convert_to_claude_format([
+            {"role": "system", "content": "first"},
+            {"role": "user", "content": "hi"},
+            {"role": "tool", "content": "ignored"},
+            {"role": "system", "content": "second"},
+            {"role": "assistant", "content": "hello"},
+        ])
+
+        assert body == {
+            "system": "second",
+            "messages": [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}],
+        }
+
+
+class TestClientLifecycle:
+    @pytest.fixture
+    def factory_calls(self, client, monkeypatch):
+        calls = []
+
+        class FakeControl:
+            async def list_foundation_models(self):
+                return {"modelSummaries": [{}, {}]}
+
+        class Context:
+            def __init__(self, service_name):
+                self.service_name = service_name
+                self.closed = False
+
+            async def __aenter__(self):
+                return FakeControl()
+
+            async def __aexit__(self, *exc):
+                self.closed = True
+                return False
+
+        def factory(service_name="bedrock-runtime"):
+            context = Context(service_name)
+            calls.append(context)
+            return context
+
+        client._client = None
+        monkeypatch.setattr(client, "_client_factory", factory)
+        return calls
+
+    def test_pool_configuration(self, client):
+        assert client._client_config.max_pool_connections == 64
+        # botocore 只做客户端限速，重试由 _invoke_with_retry 统一负责
+        assert client._client_config.retries == {"max_attempts": 0, "mode": "adaptive"}
+
+    @pytest.mark.asyncio
+    async def test_clients_are_created_once_and_released_on_close(self, client, factory_calls):
+        assert await client.initialize()
+        assert await client.initialize()
+        await client._get_client()
+        await client._get_client()
+
+        assert [c.service_name for c in factory_calls] == ["bedrock", "bedrock-runtime"]
+
+        await client.close()
+
+        assert all(c.closed for c in factory_calls)
+        assert client._control_client is None
+
+
+class TestRequestBody:
+    @pytest.mark.asyncio
+    async def test_tool_calls_share_generation_config(self, client):
+        tools = [{"type": "function", "function": {"name": "lookup", "description": "d", "parameters": {}}}]
+
+        await client.generate_with_tools([{"role": "user", "content": "hi"}], tools, model=CLAUDE, max_tokens=64)
+
+        body = client._client.calls[0][1]
+        assert body["max_tokens"] == 64
+        assert body["temperature"] == 0.7
+        assert body["tools"][0]["name"] == "lookup"
+
+    @pytest.mark.asyncio
+    async def test_stream_and_generate_send_the_same_body(self, client):
+        messages = [{"role": "user", "content": "hi"}]
+
+        await client.generate(messages, model=CLAUDE, stop=["x"])
+        [c async for c in client.stream_generate(messages, model=CLAUDE, stop=["x"])]
+
+        assert client._client.calls[0] == client._client.calls[1]
+
+
+class TestGetModelInfo:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("model, context_window", [
+        ("anthropic.claude-3-opus-20240229-v1:0", 200000),
+        ("anthropic.claude-v2:1", 100000),
+        ("meta.llama3-70b-instruct-v1:0", 8192),
+        ("amazon.titan-text-express-v1", 32000),
+        ("cohere.command-r-v1:0", 8192),
+    ])
+    async def test_context_window(self, client, model, context_window):
+        info = await client.get_model_info(model)
+
+        assert info.context_window == context_window
+        assert info.max_output_tokens == context_window // 2
+
+
+class TestHandleError:
+    @pytest.mark.parametrize("code, error_type, prefix", [
+        ("ThrottlingException", RateLimitError, "Rate limit exceeded"),
+        ("ValidationException", InvalidRequestError, "Invalid request"),
+        ("SomethingNew", LLMError, "Bedrock error"),
+    ])
+    def test_error_codes(self, client, code, error_type, prefix):
+        error = ClientError({"Error": {"Code": code, "Message": "boom"}}, "InvokeModel")
+
+        result = client._handle_error(error)
+
+        assert type(result) is error_type
+        assert str(result) == f"{prefix}: boom"
+
+
+class TestPromptCache:
+    LONG_SYSTEM = "s" * 2048
+
+    @pytest.mark.asyncio
+    async def test_long_system_prompt_is_marked(self, client):
+        messages = [{"role": "system", "content": self.LONG_SYSTEM}, {"role": "user", "content": "hi"}]
+
+        await client.generate(messages, model=CLAUDE, cache_system=True)
+
+        assert client._client.calls[0][1]["system"] == [
+            {"type": "text", "text": self.LONG_SYSTEM, "cache_control": {"type": "ephemeral"}}
+        ]
+
+    @pytest.mark.asyncio
+    async def test_short_or_disabled_system_prompt_is_plain(self, client):
+        await client.generate([{"role": "system", "content": "short"}], model=CLAUDE, cache_system=True)
+        await client.generate([{"role": "system", "content": self.LONG_SYSTEM}], model=CLAUDE)
+
+        assert client._client.calls[0][1]["system"] == "short"
+        assert client._client.calls[1][1]["system"] == self.LONG_SYSTEM
+
+    @pytest.mark.asyncio
+    async def test_last_tool_is_marked(self, client):
+        tools = [
+            {"type": "function", "function": {"name": name, "description": "d", "parameters": {}}}
+            for name in ("a", "b")
+        ]
+
+        await client.generate_with_tools([{"role": "user", "content": "hi"}], tools, model=CLAUDE, cache_system=True)
+
+        sent = client._client.calls[0][1]["tools"]
+        assert "cache_control" not in sent[0]
+        assert sent[1]["cache_control"] == {"type": "ephemeral"}
+
+
+class TestRetry:
+    @staticmethod
+    def _throttle(retry_after=None):
+        headers = {"retry-after": retry_after} if retry_after is not None else {}
+        return ClientError({
+            "Error": {"Code": "ThrottlingException", "Message": "slow down"},
+            "ResponseMetadata": {"HTTPHeaders": headers},
+        }, "InvokeModel")
+
+    @pytest.fixture
+    def flaky(self, client):
+        invoke_model = client._client.invoke_model
+        failures = []
+
+        async def flaky_invoke(**kwargs):
+            if failures:
+                raise failures.pop(0)
+            return await invoke_model(**kwargs)
+
+        client._client.invoke_model = flaky_invoke
+        client.retry_base_delay = 0
+        return failures
+
+    @pytest.mark.asyncio
+    async def test_throttling_is_retried_after_retry_after(self, client, flaky, monkeypatch):
+        delays = []
+
+        async def fake_sleep(delay):
+            delays.append(delay)
+
+        monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+        flaky.extend([self._throttle("2"), self._throttle()])
+
+        response = await client.generate([{"role": "user", "content": "hi"}], model=CLAUDE)
+
+        assert response.content == "hello"
+        assert delays == [2.0, 0.0]
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, client, flaky):
+        client.max_retries = 1
+        flaky.extend([self._throttle(), self._throttle()])
+
+        with pytest.raises(RateLimitError):
+            await client.generate([{"role": "user", "content": "hi"}], model=CLAUDE)
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_error_carries_retry_after(self, client, flaky):
+        client.max_retries = 0
+        flaky.append(self._throttle("1.5"))
+
+        with pytest.raises(RateLimitError) as excinfo:
+            await client.generate([{"role": "user", "content": "hi"}], model=CLAUDE)
+
+        assert excinfo.value.retry_after == 2
+
+    @pytest.mark.asyncio
+    async def test_long_retry_after_is_not_waited_for(self, client, flaky, monkeypatch):
+        delays = []
+
+        async def fake_sleep(delay):
+            delays.append(delay)
+
+        monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+        flaky.append(self._throttle("120"))
+
+        with pytest.raises(RateLimitError) as excinfo:
+            await client.generate([{"role": "user", "content": "hi"}], model=CLAUDE)
+
+        assert excinfo.value.retry_after == 120
+        assert delays == []
+
+    @pytest.mark.asyncio
+    async def test_connection_errors_are_retried(self, client, flaky):
+        from botocore.exceptions import ConnectionError as BotoConnectionError
+
+        flaky.append(BotoConnectionError(error="connection reset"))
+
+        response = await client.generate([{"role": "user", "content": "hi"}], model=CLAUDE)
+
+        assert response.content == "hello"
+        assert flaky == []
+
+    @pytest.mark.asyncio
+    async def test_validation_errors_are_not_retried(self, client, flaky):
+        flaky.append(ClientError({"Error": {"Code": "ValidationException", "Message": "bad"}}, "InvokeModel"))
+
+        with pytest.raises(InvalidRequestError):
+            await client.generate([{"role": "user", "content": "hi"}], model=CLAUDE)
+
+        assert flaky == []
+        assert client._client.calls == []
+
+
+class TestRawResponse:
+    @pytest.mark.asyncio
+    async def test_raw_response_is_kept_by_default(self, client):
+        response = await client.generate([{"role": "user", "content": "hi"}], model=CLAUDE)
+
+        assert response.raw_response["stop_reason"] == "end_turn"
+
+    @pytest.mark.asyncio
+    async def test_raw_response_can_be_dropped(self, client):
+        client.keep_raw_response = False
+        tools = [{"type": "function", "function": {"name": "lookup", "description": "d", "parameters": {}}}]
+
+        response = await client.generate([{"role": "user", "content": "hi"}], model=CLAUDE)
+        tool_response = await client.generate_with_tools([{"role": "user", "content": "hi"}], tools, model=CLAUDE)
+
+        assert response.content == "hello"
+        assert response.raw_response is None
+        assert tool_response.tool_calls and tool_response.raw_response is None
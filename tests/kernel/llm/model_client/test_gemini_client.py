@@ -0,0 +1,403 @@
+"""
+GeminiClient 测试
+
+使用本地 aiohttp 测试服务器模拟 Gemini API
+"""
+
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from kernel.llm.exceptions import InvalidRequestError, RateLimitError
+from kernel.llm.model_client.aiohttp_gemini_clinet import GeminiClient, _iter_sse_data
+
+
+def _text_response(text: str) -> dict:
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}]}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": 1, "candidatesTokenCount": 1, "totalTokenCount": 2},
+    }
+
+
+@pytest_asyncio.fixture
+async def server():
+    requests = []
+
+    async def list_models(request):
+        return web.json_response({"models": []})
+
+    failures = {}
+
+    async def model_action(request):
+        body = await request.json()
+        action = request.match_info["action"]
+        model = request.match_info["model"]
+        requests.append((action, body))
+        # flaky-<状态码>-<次数>[-<Retry-After>]：先返回若干次错误再成功
+        if model.startswith("flaky-"):
+            _, status, times, *retry_after = model.split("-")
+            failures[model] = failures.get(model, 0) + 1
+            if failures[model] <= int(times):
+                return web.json_response(
+                    {"error": {"message": "try later"}},
+                    status=int(status),
+                    headers={"Retry-After": retry_after[0] if retry_after else "0"},
+                )
+        if action == "batchEmbedContents":
+            texts = [item["content"]["parts"][0]["text"] for item in body["requests"]]
+            # 短批次延迟更久，结果顺序不能依赖完成顺序
+            await asyncio.sleep(0.01 / len(texts))
+            return web.json_response({"embeddings": [{"values": [float(len(text))]} for text in texts]})
+        if "tools" in body:
+            return web.json_response({"candidates": [{"content": {"parts": [
+                {"functionCall": {"name": "lookup", "args": {"city": "北京"}}}
+            ]}}]})
+        return web.json_response(_text_response("hello"))
+
+    async def stream(request):
+        requests.append(("streamGenerateContent", await request.json()))
+        assert request.query["alt"] == "sse"
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        events = [_text_response("你好 "), _text_response('say "}]"\n\ndata: x')]
+        body = b"".join(b"data: " + json.dumps(event).encode() + b"\r\n\r\n" for event in events)
+        # 按任意位置切块发送，事件跨越多个网络块
+        for i in range(0, len(body), 7):
+            await response.write(body[i:i + 7])
+            await asyncio.sleep(0)
+        await response.write_eof()
+        return response
+
+    @web.middleware
+    async def require_key_header(request, handler):
+        # 密钥只能通过请求头传递，不能出现在 URL 中
+        if request.headers.get("x-goog-api-key") != "test" or "key" in request.query:
+            return web.json_response({"error": {"message": "bad key"}}, status=401)
+        return await handler(request)
+
+    app = web.Application(middlewares=[require_key_header])
+    app.router.add_post("/models/{model}:streamGenerateContent", stream)
+    app.router.add_get("/models", list_models)
+    app.router.add_post("/models/{model}:{action}", model_action)
+
+    server = TestServer(app)
+    await server.start_server()
+    server.requests = requests
+    yield server
+    await server.close()
+    await GeminiClient.aclose_shared()
+
+
+def make_client(server, **kwargs) -> GeminiClient:
+    return GeminiClient(api_key="test", base_url=str(server.make_url("")).rstrip("/"), **kwargs)
+
+
+class TestSharedSession:
+    """测试类级共享会话"""
+
+    @pytest.mark.asyncio
+    async def test_clients_share_one_session(self, server):
+        first, second = make_client(server), make_client(server)
+
+        assert await first.initialize() and await second.initialize()
+
+        assert first.session is second.session is GeminiClient._shared_session
+
+    @pytest.mark.asyncio
+    async def test_close_keeps_shared_session_open(self, server):
+        client = make_client(server)
+        await client.initialize()
+        session = client.session
+
+        await client.close()
+
+        assert client.session is None and not session.closed
+        await GeminiClient.aclose_shared()
+        assert session.closed
+
+    @pytest.mark.asyncio
+    async def test_generate_uses_shared_session(self, server):
+        client = make_client(server)
+
+        response = await client.generate([{"role": "user", "content": "hi"}], model="gemini-pro")
+
+        assert response.content == "hello"
+        assert server.requests[0][0] == "generateContent"
+
+
+class TestRetry:
+    """测试 429 和 5xx 重试"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("model", ["flaky-429-2", "flaky-503-1"])
+    async def test_transient_statuses_are_retried(self, server, model):
+        client = make_client(server)
+
+        response = await client.generate([{"role": "user", "content": "hi"}], model=model)
+
+        assert response.content == "hello"
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, server):
+        client = make_client(server, max_retries=1)
+
+        with pytest.raises(RateLimitError) as excinfo:
+            await client.generate([{"role": "user", "content": "hi"}], model="flaky-429-5")
+
+        assert len(server.requests) == 2
+        assert excinfo.value.retry_after == 0
+
+    @pytest.mark.asyncio
+    async def test_long_retry_after_is_not_waited_for(self, server):
+        client = make_client(server)
+
+        with pytest.raises(RateLimitError) as excinfo:
+            await client.generate([{"role": "user", "content": "hi"}], model="flaky-429-1-120")
+
+        assert len(server.requests) == 1
+        assert excinfo.value.retry_after == 120
+
+    @pytest.mark.asyncio
+    async def test_close_during_retry_does_not_break_request(self, server):
+        client = make_client(server)
+        client._retry_delay = lambda attempt, retry_after: 0.05
+
+        task = asyncio.create_task(client.generate([{"role": "user", "content": "hi"}], model="flaky-503-1"))
+        while not server.requests:
+            await asyncio.sleep(0.001)
+        await client.close()
+
+        assert (await task).content == "hello"
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self, server):
+        client = make_client(server)
+
+        with pytest.raises(InvalidRequestError):
+            await client.generate([{"role": "user", "content": "hi"}], model="flaky-400-5")
+
+        assert len(server.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_response_slows_client_limiter(self, server):
+        client = make_client(server, rpm=6000)
+
+        await client.generate([{"role": "user", "content": "hi"}], model="flaky-429-1")
+
+        assert client._limiter.rate < client._limiter.base_rate
+
+    @pytest.mark.parametrize("raw, message", [
+        (b'{"error": {"message": "quota"}}', "quota"),
+        (b"<html>Bad Gateway</html>", "<html>Bad Gateway</html>"),
+        (b"", "Unknown error"),
+        (b"[1]", "Unknown error"),
+    ])
+    def test_error_message_tolerates_non_json_bodies(self, raw, message):
+        assert GeminiClient._error_message(raw) == message
+
+    def test_backoff_prefers_retry_after(self):
+        client = GeminiClient(api_key="test", retry_base_delay=1.0)
+
+        assert client._retry_delay(0, "2.5") == 2.5
+        assert 4.0 <= client._retry_delay(2, None) <= 6.0
+        assert client._retry_delay(10, "soon") <= 45.0
+        assert client._retry_delay(0, "120") is None
+
+
+class TestGenerationConfig:
+    """测试生成配置缓存"""
+
+    def test_same_parameters_share_one_config(self):
+        client = GeminiClient(api_key="test")
+        stop = ["END"]
+
+        config = client._generation_config(0.5, 0.9, 100, stop)
+        stop.append("MORE")
+
+        assert client._generation_config(0.5, 0.9, 100, ["END"]) is config
+        assert config == {"temperature": 0.5, "topP": 0.9, "maxOutputTokens": 100, "stopSequences": ["END"]}
+        assert client._generation_config(0.5, 0.9, None, None) == {"temperature": 0.5, "topP": 0.9}
+
+    @pytest.mark.asyncio
+    async def test_generate_sends_config(self, server):
+        client = make_client(server)
+
+        await client.generate([{"role": "user", "content": "hi"}], model="gemini-pro", max_tokens=5)
+
+        assert server.requests[0][1]["generationConfig"] == {"temperature": 0.7, "topP": 1.0, "maxOutputTokens": 5}
+
+
+class TestRequestUrls:
+    """测试接口 URL"""
+
+    def test_urls_are_built_once_without_api_key(self):
+        client = GeminiClient(api_key="secret", base_url="https://example.com/v1")
+
+        url = client._url("gemini-pro", "generateContent")
+
+        assert client._url("gemini-pro", "generateContent") is url
+        assert str(url) == "https://example.com/v1/models/gemini-pro:generateContent"
+        assert str(client._url("gemini-pro")) == "https://example.com/v1/models/gemini-pro"
+
+
+class TestCreateEmbeddings:
+    """测试嵌入请求"""
+
+    @pytest.mark.asyncio
+    async def test_batches_keep_input_order(self, server):
+        client = make_client(server)
+        texts = ["a", "bbb", "cc", "dddd", "e"]
+
+        embeddings = await client.create_embeddings(texts, batch_size=2)
+
+        assert embeddings == [[1.0], [3.0], [2.0], [4.0], [1.0]]
+        assert sorted(len(body["requests"]) for _, body in server.requests) == [1, 2, 2]
+        assert server.requests[0][1]["requests"][0]["model"] == "models/embedding-001"
+
+    @pytest.mark.asyncio
+    async def test_concurrency_follows_bound_session(self, server):
+        client = make_client(server, limit_per_host=64)
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=100, limit_per_host=20))
+        try:
+            client.bind_http_session(session)
+
+            assert client._connection_limit(session) == 20
+        finally:
+            await session.close()
+
+        unlimited = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+        try:
+            assert client._connection_limit(unlimited) == 64
+        finally:
+            await unlimited.close()
+
+
+class TestGenerateWithTools:
+    """测试工具调用"""
+
+    @pytest.mark.asyncio
+    async def test_function_call_arguments_are_json(self, server):
+        client = make_client(server)
+        tools = [{"type": "function", "function": {"name": "lookup", "parameters": {}}}]
+
+        response = await client.generate_with_tools(
+            [{"role": "user", "content": "weather?"}], tools, model="gemini-pro"
+        )
+
+        call = response.tool_calls[0]["function"]
+        assert call["name"] == "lookup"
+        assert json.loads(call["arguments"]) == {"city": "北京"}
+
+    def test_interleaved_parts_are_split_in_one_pass(self):
+        parts = [
+            {"text": "a"},
+            {"functionCall": {"name": "f", "args": {}}},
+            {"text": "b"},
+            {"functionCall": {"name": "g"}},
+        ]
+
+        text, tool_calls = GeminiClient._extract_text_and_tools(parts)
+
+        assert text == "ab"
+        assert [(c["id"], c["function"]["name"]) for c in tool_calls] == [("call_0", "f"), ("call_1", "g")]
+
+
+class TestStreamGenerate:
+    """测试流式生成"""
+
+    @pytest.mark.asyncio
+    async def test_sse_parser_joins_multiline_data_and_ignores_other_fields(self):
+        class Stream:
+            async def iter_any(self):
+                for block in (b": ping\n\nevent: x\nda", b"ta: {\"a\":\ndata: 1}\n\n", b"data: [DONE]"):
+                    yield block
+
+        events = [event async for event in _iter_sse_data(Stream())]
+
+        assert events == [b'{"a":\n1}', b"[DONE]"]
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_every_event(self, server):
+        client = make_client(server)
+
+        chunks = [
+            chunk.content
+            async for chunk in client.stream_generate([{"role": "user", "content": "hi"}], model="gemini-pro")
+        ]
+
+        assert chunks == ["你好 ", 'say "}]"\n\ndata: x']
+
+    def test_extract_text_single_part_is_returned_as_is(self):
+        text = "".join(["str", "eam"])
+
+        assert GeminiClient._extract_text([{"text": text}]) is text
+        assert GeminiClient._extract_text([{"text": "a"}, {"functionCall": {}}, {"text": "b"}]) == "ab"
+
+
+class TestConvertMessages:
+    """测试消息格式转换"""
+
+    def test_prefix_cache_reuses_converted_history(self):
+        client = GeminiClient(api_key="test")
+        history = [
+            {"role": "system", "content": "be brief"},
+            {"role": "user", "content": "hi"},
+            {"role": "assistant", "content": "hello"},
+        ]
+        first = client._convert_messages_to_gemini_format(history)
+
+        second = client._convert_messages_to_gemini_format(
+            history + [{"role": "user", "content": "again"}]
+        )
+
+        assert second["contents"][:2] == first["contents"]
+        assert second["contents"][0] is first["contents"][0]
+        assert second["contents"][2] == {"role": "user", "parts": [{"text": "again"}]}
+        assert second["system_instruction"] == {"parts": [{"text": "be brief"}]}
+
+    def test_changed_history_is_not_reused(self):
+        client = GeminiClient(api_key="test")
+        client._convert_messages_to_gemini_format([{"role": "user", "content": "a"}])
+
+        result = client._convert_messages_to_gemini_format(
+            [{"role": "user", "content": "b"}, {"role": "user", "content": "c"}]
+        )
+
+        assert [c["parts"][0]["text"] for c in result["contents"]] == ["b", "c"]
+
+    def test_roles_are_mapped_to_gemini_roles(self):
+        client = GeminiClient(api_key="test")
+        roles = ["user", "assistant", "function", "tool", "other"]
+
+        result = client._convert_messages_to_gemini_format(
+            [{"role": role, "content": role} for role in roles]
+        )
+
+        assert [c["role"] for c in result["contents"]] == ["user", "model", "user", "user", "model"]
+
+    @pytest.mark.parametrize("url, expected", [
+        ("data:image/png;base64,AAAA", {"mime_type": "image/png", "data": "AAAA"}),
+        ("data:image/jpeg,AA;AA", {"mime_type": "image/jpeg", "data": "AA;AA"}),
+        ("data:image/png;base64", {}),
+        ("https://example.com/a.png", {}),
+    ])
+    def test_parse_data_url(self, url, expected):
+        assert GeminiClient(api_key="test")._parse_data_url(url) == expected
+
+    def test_multimodal_messages_bypass_cache(self):
+        client = GeminiClient(api_key="test")
+        content = [
+            {"type": "text", "text": "look"},
+            {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
+        ]
+
+        result = client._convert_messages_to_gemini_format([{"role": "user", "content": content}])
+
+        assert result["contents"][0]["parts"][1] == {"inline_data": {"mime_type": "image/png", "data": "AAAA"}}
+        assert not client._prefix_cache
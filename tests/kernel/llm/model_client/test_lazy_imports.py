@@ -0,0 +1,52 @@
+"""
+model_client 按需导入测试
+"""
+
+import importlib.util
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import kernel.llm.model_client as model_client
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+
+
+def test_importing_package_does_not_load_client_backends():
+    code = (
+        "import sys\n"
+        "import kernel.llm.model_client\n"
+        "loaded = [m for m in ('openai_client', 'aiohttp_gemini_clinet', 'bedrock_client')\n"
+        "          if f'kernel.llm.model_client.{m}' in sys.modules]\n"
+        "print(','.join(loaded))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        env={"PYTHONPATH": str(PROJECT_ROOT / "src")},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip() == ""
+
+
+def test_clients_and_flags_resolve_on_access():
+    from kernel.llm.model_client.aiohttp_gemini_clinet import GeminiClient
+
+    assert model_client.GeminiClient is GeminiClient
+    assert model_client.BEDROCK_CLIENT_AVAILABLE == (importlib.util.find_spec("aioboto3") is not None)
+    assert "OpenAIClient" in dir(model_client)
+
+
+def test_unimportable_client_raises_on_construction(monkeypatch):
+    monkeypatch.setitem(model_client._LAZY_CLIENTS, "BrokenClient", ".missing_client")
+
+    broken = getattr(model_client, "BrokenClient")
+
+    with pytest.raises(ImportError, match="BrokenClient is unavailable"):
+        broken()
+    vars(model_client).pop("BrokenClient", None)
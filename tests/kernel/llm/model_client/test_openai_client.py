@@ -0,0 +1,302 @@
+"""
+OpenAIClient 测试
+
+用假的 SDK 客户端替换 AsyncOpenAI，不访问网络
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+
+from kernel.llm.model_client.openai_client import OpenAIClient
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, model, input, **kwargs):
+        self.calls.append(list(input))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001 * len(input))
+        self.in_flight -= 1
+        if "boom" in input:
+            raise ValueError("invalid input")
+        # 故意倒序返回，由 index 还原顺序
+        data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=data[::-1])
+
+
+@pytest.fixture
+def client():
+    client = OpenAIClient(api_key="test")
+    client.client = SimpleNamespace(embeddings=FakeEmbeddings())
+    return client
+
+
+class TestCreateEmbeddings:
+    @pytest.mark.asyncio
+    async def test_batches_preserve_order(self, client):
+        texts = ["x" * n for n in range(1, 11)]
+
+        embeddings = await client.create_embeddings(texts, batch_size=3)
+
+        assert embeddings == [[float(n)] for n in range(1, 11)]
+        assert [len(batch) for batch in client.client.embeddings.calls] == [3, 3, 3, 1]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, client):
+        await client.create_embeddings(["a"] * 20, batch_size=1, max_concurrency=4)
+
+        assert client.client.embeddings.max_in_flight == 4
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_raises_mapped_error(self, client):
+        from kernel.llm.exceptions import InvalidRequestError
+
+        with pytest.raises(InvalidRequestError):
+            await client.create_embeddings(["a", "boom", "c"], batch_size=1)
+
+
+def _stream_chunk(content=None, finish_reason=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(model="gpt", choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)])
+
+
+class FakeToolCall:
+    def __init__(self, name):
+        self.name = name
+
+    def model_dump(self):
+        return {"name": self.name}
+
+
+class FakeCompletions:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def create(self, **params):
+        async def stream():
+            for chunk in self.chunks:
+                yield chunk
+        return stream()
+
+
+class TestStreamGenerate:
+    @pytest.mark.asyncio
+    async def test_text_deltas_are_coalesced(self, client):
+        chunks = [_stream_chunk(str(i % 10)) for i in range(20)] + [_stream_chunk("!", finish_reason="stop")]
+        client.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(chunks)))
+
+        result = [chunk async for chunk in client.stream_generate([], model="gpt")]
+
+        assert "".join(chunk.content for chunk in result) == "01234567890123456789!"
+        assert len(result) < len(chunks)
+        assert all(len(chunk.content) <= 16 for chunk in result[:-1])
+        assert result[-1].finish_reason == "stop"
+
+    @pytest.mark.asyncio
+    async def test_tool_calls_keep_their_position(self, client):
+        chunks = [
+            _stream_chunk("a"),
+            _stream_chunk("b"),
+            _stream_chunk(tool_calls=[FakeToolCall("search")]),
+            _stream_chunk("c"),
+            _stream_chunk(finish_reason="tool_calls"),
+        ]
+        client.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(chunks)))
+
+        result = [chunk async for chunk in client.stream_generate([], model="gpt")]
+
+        assert [(chunk.content, chunk.tool_calls, chunk.finish_reason) for chunk in result] == [
+            ("ab", None, None),
+            ("", [{"name": "search"}], None),
+            ("c", None, "tool_calls"),
+        ]
+
+
+class FakeBatchApi:
+    """模拟 files 与 batches 接口，第三次查询时批次完成"""
+
+    def __init__(self, status="completed"):
+        self.uploaded = None
+        self.final_status = status
+        self.polls = 0
+
+    async def create_file(self, file, purpose):
+        assert purpose == "batch"
+        self.uploaded = file[1]
+        return SimpleNamespace(id="file-in")
+
+    async def create_batch(self, input_file_id, endpoint, completion_window):
+        assert input_file_id == "file-in"
+        return SimpleNamespace(id="batch-1")
+
+    async def retrieve(self, batch_id):
+        self.polls += 1
+        status = self.final_status if self.polls >= 3 else "in_progress"
+        output = "file-out" if status in ("completed", "expired") else None
+        return SimpleNamespace(id=batch_id, status=status, output_file_id=output)
+
+    async def content(self, file_id):
+        lines = []
+        for line in self.uploaded.splitlines():
+            request = json.loads(line)
+            text = request["body"]["messages"][0]["content"]
+            if text == "bad":
+                lines.append({"custom_id": request["custom_id"], "response": {"status_code": 400, "body": {}}})
+                continue
+            lines.append({"custom_id": request["custom_id"], "response": {"status_code": 200, "body": {
+                "model": request["body"]["model"],
+                "choices": [{"message": {"content": text.upper()}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            }}})
+        return SimpleNamespace(content="\n".join(json.dumps(line) for line in lines).encode())
+
+
+class TestBatchApi:
+    @pytest.fixture
+    def api(self, client):
+        api = FakeBatchApi()
+        client.client = SimpleNamespace(
+            files=SimpleNamespace(create=api.create_file, content=api.content),
+            batches=SimpleNamespace(create=api.create_batch, retrieve=api.retrieve),
+        )
+        return api
+
+    @staticmethod
+    def _requests(*texts):
+        return [{"model": "gpt-4o-mini", "messages": [{"role": "user", "content": t}]} for t in texts]
+
+    @pytest.mark.asyncio
+    async def test_submit_and_collect_results(self, client, api):
+        batch_id = await client.generate_batch(self._requests("a", "bad", "c"))
+        results = {cid: r async for cid, r in client.poll_batch(batch_id, poll_interval=0)}
+
+        first = json.loads(api.uploaded.splitlines()[0])
+        assert first == {
+            "custom_id": "0",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": self._requests("a")[0],
+        }
+        assert api.polls == 3
+        assert {cid: r.content for cid, r in results.items()} == {"0": "A", "2": "C"}
+        assert results["0"].usage["total_tokens"] == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_raises(self, client, api):
+        from kernel.llm.exceptions import LLMError
+
+        api.final_status = "failed"
+
+        with pytest.raises(LLMError, match="failed"):
+            async for _ in client.poll_batch("batch-1", poll_interval=0):
+                pass
+
+
+class TestSharedPool:
+    @pytest.fixture(autouse=True)
+    def empty_pool(self, monkeypatch):
+        monkeypatch.setattr(OpenAIClient, "_pool", {})
+
+    def test_same_configuration_shares_sdk_client(self):
+        first = OpenAIClient(api_key="key", base_url="https://a.example/v1")
+        second = OpenAIClient(api_key="key", base_url="https://a.example/v1")
+        other = OpenAIClient(api_key="other", base_url="https://a.example/v1")
+
+        assert first.client is second.client
+        assert other.client is not first.client
+        assert first._pooled.refs == 2
+
+    @pytest.mark.asyncio
+    async def test_close_keeps_pooled_client_open(self):
+        first = OpenAIClient(api_key="key")
+        sdk_client = first.client
+
+        await first.close()
+        await first.close()
+        second = OpenAIClient(api_key="key")
+
+        assert second.client is sdk_client
+        assert second._pooled.refs == 1
+        assert not sdk_client.is_closed()
+
+    @pytest.mark.asyncio
+    async def test_expired_client_is_replaced_and_closed_after_last_user(self, monkeypatch):
+        from kernel.llm.model_client import openai_client
+
+        first = OpenAIClient(api_key="key")
+        monkeypatch.setattr(openai_client, "_POOL_MAX_AGE", -1.0)
+        second = OpenAIClient(api_key="key")
+
+        assert second.client is not first.client
+        old = first.client
+        await first.close()
+        assert old.is_closed()
+
+    def test_client_is_bound_to_the_loop_that_first_uses_it(self):
+        client = OpenAIClient(api_key="key")
+
+        async def current():
+            return client.client
+
+        first = asyncio.run(current())
+        assert client._pooled.loop is not None
+        second = asyncio.run(current())
+
+        assert second is not first
+        assert client._pooled.refs == 1
+        assert len(OpenAIClient._pool) == 1
+
+    @pytest.mark.asyncio
+    async def test_idle_clients_are_released(self, monkeypatch):
+        from kernel.llm.model_client import openai_client
+
+        first = OpenAIClient(api_key="key")
+        sdk_client = first.client
+        await first.close()
+        monkeypatch.setattr(openai_client, "_POOL_IDLE_TIMEOUT", -1.0)
+
+        second = OpenAIClient(api_key="other")
+        await asyncio.sleep(0)
+
+        assert sdk_client.is_closed()
+        assert list(OpenAIClient._pool.values()) == [second._pooled]
+
+    @pytest.mark.asyncio
+    async def test_aclose_shared(self):
+        client = OpenAIClient(api_key="key")
+
+        await OpenAIClient.aclose_shared()
+
+        assert client.client.is_closed()
+        assert OpenAIClient._pool == {}
+
+
+class TestHandleError:
+    @pytest.mark.parametrize("message, expected", [
+        ("invalid_request_error: context_length_exceeded", "ContextLengthExceededError"),
+        ("Error code: MODEL_NOT_FOUND", "ModelNotFoundError"),
+        ("Invalid value for 'temperature'", "InvalidRequestError"),
+        ("server exploded", "LLMError"),
+    ])
+    def test_message_codes(self, client, message, expected):
+        assert type(client._handle_error(ValueError(message))).__name__ == expected
+
+    def test_sdk_error_subclasses_are_mapped(self, client):
+        import openai
+        from kernel.llm.exceptions import APIConnectionError
+
+        class TimeoutError(openai.APIConnectionError):
+            def __init__(self, message):
+                Exception.__init__(self, message)
+
+        assert isinstance(client._handle_error(TimeoutError("invalid")), APIConnectionError)
@@ -0,0 +1,123 @@
+"""
+ClientRegistry 测试
+"""
+
+import pytest
+
+from kernel.llm.client_registry import ClientRegistry
+from kernel.llm.model_client.base_client import BaseLLMClient, LLMResponse, ModelInfo
+
+
+class DummyClient(BaseLLMClient):
+    """测试用客户端"""
+
+    closed = 0
+
+    async def initialize(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        DummyClient.closed += 1
+
+    async def get_model_info(self, model: str) -> ModelInfo:
+        return ModelInfo(provider="dummy", model=model, capabilities=set(), context_window=1)
+
+    async def generate(self, messages, model, **kwargs) -> LLMResponse:
+        return LLMResponse(content="ok", model=model)
+
+    async def stream_generate(self, messages, model, **kwargs):
+        yield
+
+    def _get_default_model(self) -> str:
+        return "dummy"
+
+
+@pytest.fixture
+def registry():
+    registry = ClientRegistry()
+    registry.register("dummy", DummyClient)
+    return registry
+
+
+class TestInstanceCache:
+    """测试实例缓存"""
+
+    def test_same_config_reuses_instance(self, registry):
+        first = registry.create_client("dummy", api_key="k", config={"a": 1, "b": 2})
+        second = registry.create_client("dummy", api_key="k", config={"b": 2, "a": 1})
+        assert first is second
+
+    def test_different_config_or_key_creates_new_instance(self, registry):
+        base = registry.create_client("dummy", api_key="k", config={"a": 1})
+        assert registry.create_client("dummy", api_key="k", config={"a": 2}) is not base
+        assert registry.create_client("dummy", api_key="other", config={"a": 1}) is not base
+
+    def test_clear_cache_by_name(self, registry):
+        registry.create_client("dummy", config={"a": 1})
+        registry.create_client("dummy", config={"a": 2})
+        assert registry.get_client_info("dummy")["has_instance"]
+
+        registry.clear_cache("dummy")
+
+        assert not registry.get_client_info("dummy")["has_instance"]
+
+
+class TestCloseAll:
+    """测试批量关闭"""
+
+    @pytest.mark.asyncio
+    async def test_close_all_closes_every_instance(self, registry):
+        DummyClient.closed = 0
+        registry.create_client("dummy", config={"a": 1})
+        registry.create_client("dummy", config={"a": 2})
+
+        await registry.close_all()
+
+        assert DummyClient.closed == 2
+        assert not registry.get_client_info("dummy")["has_instance"]
+
+
+class TestUnregister:
+    """测试注销"""
+
+    @pytest.mark.asyncio
+    async def test_unregister_awaits_close(self, registry):
+        DummyClient.closed = 0
+        registry.create_client("dummy")
+
+        await registry.unregister("dummy")
+
+        assert DummyClient.closed == 1
+        assert not registry.is_registered("dummy")
+
+    def test_unregister_sync_drops_instances(self, registry):
+        registry.create_client("dummy")
+
+        registry.unregister_sync("dummy")
+
+        assert not registry.is_registered("dummy")
+        with pytest.raises(KeyError):
+            registry.unregister_sync("dummy")
+
+
+class TestRegister:
+    """测试注册"""
+
+    def test_rejects_non_client_class(self):
+        with pytest.raises(TypeError):
+            ClientRegistry().register("bad", dict)
+
+    def test_lazy_spec_resolves_on_first_use(self):
+        registry = ClientRegistry()
+        registry.register("lazy", (__name__, "DummyClient"))
+
+        assert registry.is_registered("lazy")
+        assert isinstance(registry.create_client("lazy"), DummyClient)
+        assert registry.get_client_class("lazy") is DummyClient
+
+    def test_lazy_spec_checked_on_first_use(self):
+        registry = ClientRegistry()
+        registry.register("lazy", ("kernel.llm.client_registry", "ClientRegistry"))
+
+        with pytest.raises(TypeError):
+            registry.create_client("lazy")
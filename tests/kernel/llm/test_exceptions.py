@@ -0,0 +1,32 @@
+"""
+LLM 异常类测试
+"""
+
+import pickle
+
+from kernel.llm.exceptions import (
+    ContextLengthExceededError,
+    ModelNotFoundError,
+    RateLimitError,
+    ServerError,
+)
+
+
+class TestSlottedExceptions:
+    """测试使用 __slots__ 的异常"""
+
+    def test_extra_attributes_do_not_allocate_dict(self):
+        error = RateLimitError("limited", retry_after=5)
+        assert error.retry_after == 5
+        assert "retry_after" not in vars(error)
+
+    def test_pickle_round_trip_keeps_slot_attributes(self):
+        error = pickle.loads(pickle.dumps(ContextLengthExceededError("too long", 10, 20)))
+        assert (error.max_tokens, error.actual_tokens) == (10, 20)
+
+        error = pickle.loads(pickle.dumps(ServerError("bad gateway", status_code=502)))
+        assert error.status_code == 502
+
+        error = pickle.loads(pickle.dumps(ModelNotFoundError("gpt-x")))
+        assert error.model_name == "gpt-x"
+        assert str(error) == "Model 'gpt-x' not found or not available"
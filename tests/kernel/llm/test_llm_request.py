@@ -0,0 +1,629 @@
+"""
+LLMRequestManager 测试
+"""
+
+import asyncio
+import json
+import logging
+import sys
+
+import pytest
+
+from kernel.llm.client_registry import ClientRegistry
+from kernel.llm.exceptions import (
+    InvalidRequestError,
+    ModelNotFoundError,
+    RateLimitError,
+    ServerError,
+    ValidationError,
+)
+from kernel.llm.llm_request import AIOHTTP_AVAILABLE, LLMRequest, LLMRequestManager
+from kernel.llm.model_client.base_client import BaseLLMClient, LLMResponse, ModelInfo, StreamChunk
+from kernel.logger import LogMetadata, MetadataContext
+
+
+class FakeClient(BaseLLMClient):
+    """测试用客户端，记录调用并统计并发度"""
+
+    def __init__(self, api_key=None, config=None):
+        super().__init__(api_key=api_key, config=config)
+        self.embedding_calls = []
+        self.active = 0
+        self.peak = 0
+        self.session = None
+        self.closed = False
+        self.failures = []
+
+    async def initialize(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        self.closed = True
+
+    async def get_model_info(self, model: str) -> ModelInfo:
+        return ModelInfo(provider="fake", model=model, capabilities=set(), context_window=1)
+
+    async def generate(self, messages, model, **kwargs) -> LLMResponse:
+        if self.failures:
+            raise self.failures.pop(0)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        if messages[0]["content"] == "fail":
+            raise RuntimeError("boom")
+        return LLMResponse(content=messages[0]["content"], model=model)
+
+    async def stream_generate(self, messages, model, **kwargs):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.streamed = 0
+        for part in messages[0]["content"].split():
+            if part == "fail":
+                raise RuntimeError("stream broke")
+            self.streamed += 1
+            yield StreamChunk(content=part, model=model)
+
+    async def create_embeddings(self, texts, model, **kwargs):
+        self.embedding_calls.append(list(texts))
+        await asyncio.sleep(0)
+        return [[float(len(text))] for text in texts]
+
+    def bind_http_session(self, session) -> bool:
+        self.session = session
+        return True
+
+    def _get_default_model(self) -> str:
+        return "fake"
+
+
+@pytest.fixture
+def manager():
+    manager = LLMRequestManager(retry_base_delay=0)
+    client = FakeClient()
+
+    async def get_client(provider=None, model=None):
+        return client
+
+    manager._get_client = get_client
+    manager.client = client
+    return manager
+
+
+def make_request(content: str) -> LLMRequest:
+    return LLMRequest(model="fake", messages=[{"role": "user", "content": content}])
+
+
+class TestGenerateBatch:
+    """测试批量生成"""
+
+    @pytest.mark.asyncio
+    async def test_results_keep_order_and_capture_errors(self, manager):
+        results = await manager.generate_batch(
+            [make_request("a"), make_request("fail"), make_request("c")]
+        )
+
+        assert [results[0].content, results[2].content] == ["a", "c"]
+        assert isinstance(results[1], RuntimeError)
+
+    @pytest.mark.asyncio
+    async def test_respects_max_concurrency(self, manager):
+        await manager.generate_batch([make_request(str(i)) for i in range(10)], max_concurrency=3)
+
+        assert manager.client.peak == 3
+
+
+class TestCreateEmbeddings:
+    """测试嵌入分批"""
+
+    @pytest.mark.asyncio
+    async def test_large_inputs_are_sharded_in_order(self, manager):
+        texts = ["x" * i for i in range(1, 8)]
+
+        embeddings = await manager.create_embeddings(texts, "fake", batch_size=3)
+
+        assert embeddings == [[float(i)] for i in range(1, 8)]
+        assert [len(call) for call in manager.client.embedding_calls] == [3, 3, 1]
+
+    @pytest.mark.asyncio
+    async def test_small_inputs_use_single_call(self, manager):
+        await manager.create_embeddings(["a", "b"], "fake")
+
+        assert manager.client.embedding_calls == [["a", "b"]]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_share_one_call(self, manager):
+        first, second = await asyncio.gather(
+            manager.create_embeddings(["a", "bb", "a"], "fake"),
+            manager.create_embeddings(["bb", "ccc"], "fake"),
+        )
+
+        assert first == [[1.0], [2.0], [1.0]]
+        assert second == [[2.0], [3.0]]
+        assert manager.client.embedding_calls == [["a", "bb"], ["ccc"]]
+        assert not manager._inflight_embeddings
+
+    @pytest.mark.asyncio
+    async def test_failure_reaches_waiting_callers(self, manager):
+        async def create_embeddings(texts, model, **kwargs):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("embed failed")
+
+        manager.client.create_embeddings = create_embeddings
+
+        results = await asyncio.gather(
+            manager.create_embeddings(["a"], "fake"),
+            manager.create_embeddings(["a"], "fake"),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert not manager._inflight_embeddings
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_hands_over_to_waiting_callers(self, manager):
+        original = manager.client.create_embeddings
+
+        async def create_embeddings(texts, model, **kwargs):
+            await asyncio.sleep(0.01)
+            return await original(texts, model, **kwargs)
+
+        manager.client.create_embeddings = create_embeddings
+
+        leader = asyncio.create_task(manager.create_embeddings(["a"], "fake"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(manager.create_embeddings(["a", "bb"], "fake"))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == [[1.0], [2.0]]
+        assert leader.cancelled()
+        assert not manager._inflight_embeddings
+
+    @pytest.mark.asyncio
+    async def test_cache_serves_repeated_texts(self, manager):
+        manager.embedding_cache_size = 10
+        await manager.create_embeddings(["a", "b"], "fake")
+
+        embeddings = await manager.create_embeddings(["b", "c"], "fake")
+
+        assert embeddings == [[1.0], [1.0]]
+        assert manager.client.embedding_calls == [["a", "b"], ["c"]]
+
+    @pytest.mark.asyncio
+    async def test_extra_kwargs_bypass_dedup(self, manager):
+        manager.embedding_cache_size = 10
+        await manager.create_embeddings(["a"], "fake")
+        await manager.create_embeddings(["a"], "fake", dimensions=8)
+
+        assert manager.client.embedding_calls == [["a"], ["a"]]
+
+
+@pytest.fixture
+def registry():
+    registry = ClientRegistry()
+    registry.register("fake", FakeClient)
+    return registry
+
+
+class TestClientCache:
+    """测试管理器的客户端缓存"""
+
+    @pytest.mark.asyncio
+    async def test_evicts_and_closes_least_recently_used(self, registry):
+        manager = LLMRequestManager(registry, max_clients=2)
+        first = await manager._get_client("fake", "a")
+        second = await manager._get_client("fake", "b")
+        assert await manager._get_client("fake", "a") is first
+
+        await manager._get_client("fake", "c")
+
+        assert second.closed and not first.closed
+        assert await manager._get_client("fake", "a") is first
+        await manager.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_expired_lookups_create_one_client(self, registry):
+        manager = LLMRequestManager(registry, client_ttl=0)
+        created = []
+        original = registry.create_client
+
+        def counting_create(*args, **kwargs):
+            created.append(1)
+            return original(*args, **kwargs)
+
+        registry.create_client = counting_create
+        await manager._get_client("fake", "a")
+        manager.client_ttl = 600
+
+        clients = await asyncio.gather(*(manager._get_client("fake", "a") for _ in range(5)))
+
+        assert len(created) == 2
+        assert all(client is clients[0] for client in clients)
+        assert not manager._creation_locks
+        await manager.close()
+
+    @pytest.mark.asyncio
+    async def test_warmup_creates_and_initializes_clients(self, registry):
+        manager = LLMRequestManager(registry)
+
+        results = await manager.warmup([("fake", "a"), ("missing", "b")])
+
+        assert results[0]._initialized
+        assert await manager._get_client("fake", "a") is results[0]
+        assert isinstance(results[1], ModelNotFoundError)
+        await manager.close()
+
+    @pytest.mark.asyncio
+    async def test_close_runs_concurrently_and_tolerates_failures(self, registry):
+        manager = LLMRequestManager(registry)
+        clients = [await manager._get_client("fake", name) for name in "abc"]
+        active = []
+
+        async def slow_close(client):
+            active.append(client)
+            await asyncio.sleep(0.01)
+            assert len(active) == 3
+            client.closed = True
+
+        async def failing_close():
+            raise RuntimeError("close failed")
+
+        for client in clients[:2]:
+            client.close = lambda client=client: slow_close(client)
+        clients[2].close = failing_close
+        active.append(clients[2])
+
+        await manager.close()
+
+        assert clients[0].closed and clients[1].closed
+        assert not manager._clients
+
+    @pytest.mark.asyncio
+    async def test_expired_client_is_closed_and_recreated(self, registry):
+        manager = LLMRequestManager(registry, client_ttl=0)
+        first = await manager._get_client("fake", "a")
+
+        second = await manager._get_client("fake", "a")
+
+        assert second is not first
+        assert first.closed
+        await manager.close()
+
+    @pytest.mark.asyncio
+    async def test_client_in_use_is_closed_after_the_call(self, registry):
+        manager = LLMRequestManager(registry, max_clients=1)
+        first = await manager._get_client("fake", "a")
+        release = asyncio.Event()
+        closed_during_call = []
+
+        async def generate(**params):
+            await release.wait()
+            closed_during_call.append(first.closed)
+            return LLMResponse(content="ok", model="a")
+
+        first.generate = generate
+        call = asyncio.create_task(manager.generate(
+            LLMRequest(model="a", provider="fake", messages=[{"role": "user", "content": "hi"}])
+        ))
+        await asyncio.sleep(0)
+
+        await manager._get_client("fake", "b")
+        release.set()
+        await call
+
+        assert closed_during_call == [False]
+        assert first.closed
+        assert not manager._leases and not manager._retired
+        await manager.close()
+
+
+@pytest.mark.skipif(not AIOHTTP_AVAILABLE, reason="aiohttp not installed")
+class TestSharedSession:
+    """测试共享 HTTP 会话"""
+
+    @pytest.mark.asyncio
+    async def test_clients_share_one_session_closed_by_manager(self):
+        registry = ClientRegistry()
+        registry.register("fake", FakeClient)
+        registry.register("other", FakeClient)
+        manager = LLMRequestManager(registry)
+
+        first = await manager._get_client("fake", "a")
+        second = await manager._get_client("other", "b")
+        session = first.session
+
+        assert session is not None and second.session is session
+
+        await manager.close()
+
+        assert session.closed
+
+    def test_session_rebuilt_on_new_event_loop(self):
+        registry = ClientRegistry()
+        registry.register("fake", FakeClient)
+        manager = LLMRequestManager(registry)
+
+        async def get_session():
+            client = await manager._get_client("fake", "a")
+            return client, client.session
+
+        first_client, first_session = asyncio.run(get_session())
+        second_client, second_session = asyncio.run(get_session())
+        asyncio.run(manager.close())
+
+        assert second_client is first_client
+        assert second_session is not first_session
+        assert second_session.closed and not first_session.closed
+
+
+class TestLLMRequestPayload:
+    """测试请求字典缓存"""
+
+    def test_to_dict_is_cached_until_field_changes(self):
+        request = make_request("hi")
+        first = request.to_dict()
+
+        assert request.to_dict() is first
+        with pytest.raises(TypeError):
+            first["temperature"] = 0.1
+
+        request.temperature = 0.2
+
+        second = request.to_dict()
+        assert second is not first
+        assert second["temperature"] == 0.2
+
+    def test_json_bytes_are_cached_until_field_changes(self):
+        request = make_request("hi")
+        body = request.to_json_bytes()
+
+        assert json.loads(body) == dict(request.to_dict())
+        assert request.to_json_bytes() is body
+
+        request.seed = 7
+
+        assert json.loads(request.to_json_bytes())["seed"] == 7
+
+    def test_invalidate_after_in_place_mutation(self):
+        request = make_request("hi")
+        request.to_dict()
+        request.messages.append({"role": "user", "content": "more"})
+        request.invalidate()
+
+        assert len(request.to_dict()["messages"]) == 2
+        assert not hasattr(request, "__dict__")
+
+    def test_fields_are_keyword_only(self):
+        with pytest.raises(TypeError):
+            LLMRequest("fake", [{"role": "user", "content": "hi"}])
+
+    def test_invalid_request_rejected_at_construction(self):
+        with pytest.raises(ValidationError):
+            LLMRequest(model="fake", messages=[{"role": "user", "content": "hi"}], temperature=3)
+
+    def test_roles_and_model_are_interned(self):
+        role = "".join(["us", "er"])
+        model = "".join(["fa", "ke"])
+        request = LLMRequest(model=model, messages=[{"role": role, "content": "hi"}])
+
+        assert request.messages[0]["role"] is sys.intern("user")
+        assert request.model is sys.intern("fake")
+
+    def test_field_change_triggers_revalidation(self):
+        request = make_request("hi")
+        request.top_p = 2
+
+        with pytest.raises(ValidationError):
+            request.validate()
+
+    @pytest.mark.asyncio
+    async def test_kwargs_do_not_leak_into_cached_dict(self, manager):
+        request = make_request("hi")
+
+        await manager.generate(request, extra=1, temperature=0.1)
+
+        assert "extra" not in request.to_dict()
+
+
+class TestStreamGenerate:
+    """测试流式生成"""
+
+    @pytest.mark.asyncio
+    async def test_yields_chunks_in_order(self, manager):
+        chunks = [chunk.content async for chunk in manager.stream_generate(make_request("a b c"))]
+
+        assert chunks == ["a", "b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_request_is_not_mutated(self, manager):
+        seen = []
+        original = manager.client.stream_generate
+
+        def stream_generate(**params):
+            seen.append(params["stream"])
+            return original(**params)
+
+        manager.client.stream_generate = stream_generate
+        request = make_request("a")
+        payload = request.to_dict()
+
+        [chunk async for chunk in manager.stream_generate(request)]
+
+        assert seen == [True]
+        assert request.stream is False
+        assert request.to_dict() is payload
+
+    @pytest.mark.asyncio
+    async def test_producer_error_reaches_consumer(self, manager):
+        received = []
+        with pytest.raises(RuntimeError, match="stream broke"):
+            async for chunk in manager.stream_generate(make_request("a fail")):
+                received.append(chunk.content)
+
+        assert received == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_early_exit_stops_producer(self, manager):
+        words = " ".join(str(i) for i in range(500))
+        stream = manager.stream_generate(make_request(words))
+
+        assert (await stream.__anext__()).content == "0"
+        await stream.aclose()
+        await asyncio.sleep(0)
+
+        assert manager.client.streamed < 500
+
+    @pytest.mark.asyncio
+    async def test_early_exit_waits_for_producer(self, manager):
+        words = " ".join(str(i) for i in range(500))
+        stream = manager.stream_generate(make_request(words))
+
+        await stream.__anext__()
+        await stream.aclose()
+
+        assert all(task.done() for task in asyncio.all_tasks() if task is not asyncio.current_task())
+
+
+class TestRetry:
+    """测试瞬时错误重试"""
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried(self, manager):
+        manager.client.failures = [asyncio.TimeoutError(), asyncio.TimeoutError()]
+
+        response = await manager.generate(make_request("ok"))
+
+        assert response.content == "ok"
+        assert manager.client.failures == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not AIOHTTP_AVAILABLE, reason="aiohttp not installed")
+    async def test_connection_errors_are_retried(self, manager):
+        import aiohttp
+
+        manager.client.failures = [aiohttp.ClientConnectionError("reset")]
+
+        response = await manager.generate(make_request("ok"))
+
+        assert response.content == "ok"
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, manager):
+        manager.max_retries = 1
+        manager.client.failures = [asyncio.TimeoutError(), asyncio.TimeoutError()]
+
+        with pytest.raises(asyncio.TimeoutError):
+            await manager.generate(make_request("ok"))
+
+    @pytest.mark.asyncio
+    async def test_request_errors_are_not_retried(self, manager):
+        manager.client.failures = [InvalidRequestError("bad"), asyncio.TimeoutError()]
+
+        with pytest.raises(InvalidRequestError):
+            await manager.generate(make_request("ok"))
+
+        assert len(manager.client.failures) == 1
+
+    @pytest.mark.asyncio
+    async def test_errors_retried_by_clients_are_not_retried_again(self, manager):
+        manager.client.failures = [RateLimitError("slow down"), ServerError("bad gateway", 502)]
+
+        with pytest.raises(RateLimitError):
+            await manager.generate(make_request("ok"))
+
+        assert len(manager.client.failures) == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_retries_before_first_chunk(self, manager):
+        manager.client.failures = [asyncio.TimeoutError()]
+
+        chunks = [chunk.content async for chunk in manager.stream_generate(make_request("a b"))]
+
+        assert chunks == ["a", "b"]
+
+
+class TestSerialize:
+    """测试客户端参数序列化"""
+
+    @pytest.mark.asyncio
+    async def test_manager_uses_client_serializer(self, manager):
+        seen = []
+        client = manager.client
+
+        async def generate(**params):
+            seen.append(params)
+            return LLMResponse(content="ok", model=params["model"])
+
+        client.serialize = client._core_params
+        client.generate = generate
+        request = LLMRequest(
+            model="fake",
+            messages=[{"role": "user", "content": "hi"}],
+            max_tokens=5,
+            seed=1,
+        )
+
+        await manager.generate(request)
+
+        assert seen[0] == {
+            "messages": request.messages,
+            "model": "fake",
+            "temperature": 0.7,
+            "top_p": 1.0,
+            "max_tokens": 5,
+        }
+
+
+class TestRequestContext:
+    """测试调用期间绑定的 request_id"""
+
+    @pytest.fixture
+    def seen_ids(self, manager):
+        seen = []
+        original = manager.client.generate
+
+        async def generate(**params):
+            seen.append(LogMetadata.get_request_id())
+            return await original(**params)
+
+        manager.client.generate = generate
+        return seen
+
+    @pytest.fixture(autouse=True)
+    def info_logging(self):
+        llm_logger = logging.getLogger("kernel.llm.llm_request")
+        level = llm_logger.level
+        llm_logger.setLevel(logging.INFO)
+        yield
+        llm_logger.setLevel(level)
+
+    @pytest.mark.asyncio
+    async def test_each_call_gets_its_own_request_id(self, manager, seen_ids):
+        await manager.generate_batch([make_request("a"), make_request("b")])
+
+        assert all(seen_ids) and seen_ids[0] != seen_ids[1]
+        assert LogMetadata.get_request_id() is None
+
+    @pytest.mark.asyncio
+    async def test_stream_reads_carry_request_id(self, manager):
+        seen = []
+        original = manager.client.stream_generate
+
+        def stream_generate(**params):
+            seen.append(LogMetadata.get_request_id())
+            return original(**params)
+
+        manager.client.stream_generate = stream_generate
+
+        async for _ in manager.stream_generate(make_request("a b")):
+            assert LogMetadata.get_request_id() is None
+
+        assert seen and seen[0] is not None
+
+    @pytest.mark.asyncio
+    async def test_existing_request_id_is_kept(self, manager, seen_ids):
+        with MetadataContext(request_id="outer"):
+            await manager.generate(make_request("a"))
+
+        assert seen_ids == ["outer"]
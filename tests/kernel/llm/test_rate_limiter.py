@@ -0,0 +1,71 @@
+"""
+AsyncTokenBucket 测试
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from kernel.llm.rate_limiter import AsyncTokenBucket
+
+
+class TestAsyncTokenBucket:
+    """测试令牌桶限流"""
+
+    @pytest.mark.asyncio
+    async def test_burst_up_to_capacity_does_not_wait(self):
+        bucket = AsyncTokenBucket(rate=1, capacity=5)
+        start = time.monotonic()
+
+        for _ in range(5):
+            await bucket.acquire()
+
+        assert time.monotonic() - start < 0.05
+
+    @pytest.mark.asyncio
+    async def test_waits_for_refill_when_empty(self):
+        bucket = AsyncTokenBucket(rate=50, capacity=1)
+        await bucket.acquire()
+        start = time.monotonic()
+
+        await bucket.acquire()
+
+        assert time.monotonic() - start >= 0.015
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_served_in_arrival_order(self):
+        bucket = AsyncTokenBucket(rate=200, capacity=1)
+        await bucket.acquire()
+        order = []
+
+        async def take(i):
+            await bucket.acquire()
+            order.append(i)
+
+        await asyncio.gather(*(take(i) for i in range(5)))
+
+        assert order == [0, 1, 2, 3, 4]
+
+    def test_penalize_lowers_rate_with_floor(self):
+        bucket = AsyncTokenBucket.per_minute(600)
+
+        bucket.penalize()
+
+        assert bucket.rate == pytest.approx(9.0, rel=0.01)
+        for _ in range(100):
+            bucket.penalize()
+        assert bucket.rate == pytest.approx(1.0, rel=0.01)
+
+    def test_rejects_non_positive_rate(self):
+        with pytest.raises(ValueError):
+            AsyncTokenBucket(rate=0, capacity=1)
+
+    @pytest.mark.asyncio
+    async def test_request_above_capacity_is_rejected(self):
+        bucket = AsyncTokenBucket(rate=1, capacity=2)
+
+        with pytest.raises(ValueError):
+            await bucket.acquire(3)
+
+        await asyncio.wait_for(bucket.acquire(2), timeout=0.05)